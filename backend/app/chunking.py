@@ -0,0 +1,88 @@
+"""
+Offset-preserving chunking of loaded pages.
+
+Each page is split on its own, so every chunk inherits the metadata of the
+page it came from (source, page number, document id). On top of that each
+chunk records where it sits in the page text (start_index/end_index) and its
+ordinal within the document (chunk_index). Offsets are found with a cursor
+that only moves forward, so chunking is a single linear pass over the text.
+"""
+from typing import Dict, Iterable, List, Optional
+
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+# Use smaller chunks for faster retrieval
+CHUNK_SIZE = 500
+CHUNK_OVERLAP = 50
+
+_text_splitter = RecursiveCharacterTextSplitter(
+    chunk_size=CHUNK_SIZE,  # Smaller chunks = faster processing
+    chunk_overlap=CHUNK_OVERLAP,
+    length_function=len,
+)
+
+def _document_key(metadata: dict, fallback: str):
+    """Key that identifies which document a page belongs to (for chunk ordinals)."""
+    if metadata.get('document_id') is not None:
+        return metadata['document_id']
+    return metadata.get('source', fallback)
+
+def _chunk_offsets(text: str, chunks: List[str]):
+    """
+    Yield (chunk, start, end) character offsets of consecutive chunks in text.
+    
+    Chunks come out of the splitter in order and overlap by at most
+    CHUNK_OVERLAP characters, so the search for the next chunk starts just
+    before the end of the previous one.
+    """
+    previous_start = -1
+    previous_end = 0
+    for chunk in chunks:
+        start = text.find(chunk, max(previous_start + 1, previous_end - CHUNK_OVERLAP))
+        if start == -1:
+            # Overlap was larger than expected - search from the previous chunk
+            start = text.find(chunk, previous_start + 1)
+        if start == -1:
+            yield chunk, None, None
+            continue
+        previous_start, previous_end = start, start + len(chunk)
+        yield chunk, previous_start, previous_end
+
+def chunk_documents(docs: Iterable[Document], chunk_ordinals: Optional[Dict] = None) -> List[Document]:
+    """
+    Split loaded pages into retrieval chunks, keeping source metadata for citations.
+    
+    Args:
+        docs: Pages to split (from loaders.iter_file / load_file); chunks that
+            already carry a chunk_index are passed through unchanged
+        chunk_ordinals: Next chunk_index per document; pass the same dict when a
+            document is chunked in several batches so the ordinals keep counting
+    
+    Returns:
+        Chunks with the page's metadata plus start_index, end_index and chunk_index
+    """
+    if chunk_ordinals is None:
+        chunk_ordinals = {}
+    
+    split_docs = []
+    for page_number, page in enumerate(docs):
+        metadata = dict(page.metadata) if getattr(page, 'metadata', None) else {}
+        if 'chunk_index' in metadata:
+            # Already a chunk (e.g. read back from the chunk store) - keep it as it is
+            split_docs.append(page)
+            continue
+        # Preserve source information
+        metadata.setdefault('source', f'Document_{page_number + 1}')
+        key = _document_key(metadata, metadata['source'])
+        
+        text = page.page_content or ""
+        for chunk, start, end in _chunk_offsets(text, _text_splitter.split_text(text)):
+            ordinal = chunk_ordinals.get(key, 0)
+            chunk_ordinals[key] = ordinal + 1
+            split_docs.append(Document(
+                page_content=chunk,
+                metadata={**metadata, 'start_index': start, 'end_index': end, 'chunk_index': ordinal},
+            ))
+    
+    return split_docs
@@ -35,6 +35,8 @@ def extract_citations(documents: List[Document], current_filename: str = None) -
                 "id": len(citations) + 1,
                 "source": source,
                 "page": page,
+                "document_id": metadata.get('document_id'),  # With chunk_index: key into the chunk store
+                "chunk_index": metadata.get('chunk_index'),
                 "snippet": doc.page_content[:200] if hasattr(doc, 'page_content') else "",  # First 200 chars
                 "full_content": doc.page_content if hasattr(doc, 'page_content') else ""
             }
@@ -120,6 +122,8 @@ def get_citation_references(citations: List[Dict[str, Any]]) -> List[Dict[str, A
             "id": cit["id"],
             "source": cit["source"],
             "page": cit.get("page"),
+            "document_id": cit.get("document_id"),
+            "chunk_index": cit.get("chunk_index"),
             "snippet": cit.get("snippet", "")[:100]  # First 100 chars
         }
         for cit in citations
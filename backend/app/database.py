@@ -89,10 +89,32 @@ class Document(Base):
     uploaded_at = Column(DateTime, default=datetime.utcnow)
     processed = Column(Boolean, default=False)
     supabase_path = Column(String(500), nullable=True)  # Supabase Storage path (bucket/path)
+    content_hash = Column(String(64), nullable=True, index=True)  # SHA-256 of file content (for deduplication)
     
     # Relationship
     user = relationship("User", back_populates="documents")
 
+class DocumentPage(Base):
+    __tablename__ = "document_pages"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    document_id = Column(Integer, ForeignKey("documents.id", ondelete="CASCADE"), nullable=False, index=True)
+    page_index = Column(Integer, nullable=False)  # Position of the page in the document
+    content = Column(Text, nullable=False)  # Extracted page text
+    metadata_json = Column(Text, nullable=True)  # JSON string of page metadata (source, page, ...)
+
+class DocumentChunk(Base):
+    __tablename__ = "document_chunks"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    document_id = Column(Integer, ForeignKey("documents.id", ondelete="CASCADE"), nullable=False, index=True)
+    chunk_index = Column(Integer, nullable=False)  # Ordinal of the chunk in the document
+    page = Column(Integer, nullable=True)  # Source page (PDFs)
+    start_index = Column(Integer, nullable=True)  # Character offsets of the chunk in the page text
+    end_index = Column(Integer, nullable=True)
+    content = Column(Text, nullable=False)
+    metadata_json = Column(Text, nullable=True)  # JSON string of the full chunk metadata
+
 class KeywordSearch(Base):
     __tablename__ = "keyword_searches"
     
@@ -231,8 +253,16 @@ def init_db():
                 cursor.execute("UPDATE documents SET file_size = 0 WHERE file_size IS NULL")
                 conn.commit()
                 print("file_size column added to documents table!")
-                
-                conn.close()
+            
+            # Migration 5: Add content_hash column to documents if it doesn't exist
+            if 'content_hash' not in doc_columns:
+                print("Adding content_hash column to documents table...")
+                cursor.execute("ALTER TABLE documents ADD COLUMN content_hash VARCHAR(64)")
+                cursor.execute("CREATE INDEX IF NOT EXISTS ix_documents_content_hash ON documents(content_hash)")
+                conn.commit()
+                print("content_hash column added to documents table!")
+            
+            conn.close()
         except Exception as e:
             print(f"Migration note: {e}")
     
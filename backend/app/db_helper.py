@@ -1,7 +1,8 @@
 """Unified database helper that works with both Supabase and SQLAlchemy."""
 from typing import Optional, List, Dict, Any, Union
 from sqlalchemy.orm import Session
-from .database import Document, ChatHistory, User
+from .database import Document, ChatHistory, User, DocumentPage, DocumentChunk
+import json
 import os
 
 def get_user_id(current_user: Any) -> int:
@@ -44,6 +45,156 @@ def get_document_by_id(document_id: int, user_id: int, db: Optional[Session] = N
             return db.query(Document).filter(Document.id == document_id, Document.user_id == user_id).first()
         return None
 
+def get_document_by_hash(user_id: int, content_hash: str, db: Optional[Session] = None) -> Optional[Union[Document, Dict]]:
+    """Get a processed document of the user with identical content."""
+    if is_using_supabase():
+        from .supabase_db import get_document_by_hash as supabase_get_by_hash
+        return supabase_get_by_hash(user_id, content_hash)
+    else:
+        if db:
+            return db.query(Document).filter(
+                Document.user_id == user_id,
+                Document.content_hash == content_hash,
+                Document.processed == True
+            ).first()
+        return None
+
+def set_document_processed(document_id: int, user_id: int, processed: bool, db: Optional[Session] = None) -> None:
+    """Update the processed flag of a document."""
+    if is_using_supabase():
+        from .supabase_db import update_document
+        update_document(document_id, user_id, processed=processed)
+    else:
+        if db:
+            db.query(Document).filter(Document.id == document_id, Document.user_id == user_id).update({"processed": processed})
+            db.commit()
+    # The keyword index covers processed documents only - rebuild it on the next query
+    from .hybrid_search import invalidate_keyword_index
+    invalidate_keyword_index(user_id)
+
+def _content_row(document_id: int, doc, **fields) -> Dict[str, Any]:
+    """Row for the chunk store from a page or chunk (LangChain Document)."""
+    metadata = dict(doc.metadata or {})
+    metadata['document_id'] = document_id
+    return {
+        "document_id": document_id,
+        "content": doc.page_content,
+        "metadata_json": json.dumps(metadata),
+        **fields
+    }
+
+def _row_to_langchain_document(row: Union[DocumentPage, DocumentChunk, Dict]):
+    """Rebuild a LangChain Document from a chunk store row."""
+    from langchain_core.documents import Document as LangchainDocument
+    if isinstance(row, dict):
+        content, metadata_json = row.get("content"), row.get("metadata_json")
+    else:
+        content, metadata_json = row.content, row.metadata_json
+    return LangchainDocument(page_content=content or "", metadata=json.loads(metadata_json) if metadata_json else {})
+
+def save_document_content(document_id: int, pages: List, chunks: List, first_page_index: int = 0,
+                          db: Optional[Session] = None) -> None:
+    """
+    Store extracted pages and split chunks of a document in the chunk store.
+    
+    Args:
+        document_id: Document the content belongs to
+        pages: Extracted pages (LangChain Documents)
+        chunks: Chunks of those pages from chunking.chunk_documents()
+        first_page_index: Position of the first page in the document (when saving in batches)
+        db: SQLAlchemy session (not used with Supabase)
+    """
+    page_rows = [_content_row(document_id, page, page_index=first_page_index + i) for i, page in enumerate(pages)]
+    chunk_rows = [
+        _content_row(
+            document_id, chunk,
+            chunk_index=chunk.metadata.get('chunk_index', i),
+            page=chunk.metadata.get('page'),
+            start_index=chunk.metadata.get('start_index'),
+            end_index=chunk.metadata.get('end_index')
+        )
+        for i, chunk in enumerate(chunks)
+    ]
+    if is_using_supabase():
+        from .supabase_db import insert_document_content
+        insert_document_content("document_pages", page_rows)
+        insert_document_content("document_chunks", chunk_rows)
+    else:
+        if db:
+            db.add_all([DocumentPage(**row) for row in page_rows])
+            db.add_all([DocumentChunk(**row) for row in chunk_rows])
+            db.commit()
+
+def _get_stored_content(model, order_column: str, document_ids: List[int], db: Optional[Session] = None) -> Dict[int, List]:
+    """Stored pages or chunks grouped by document ID, in document order."""
+    if not document_ids:
+        return {}
+    if is_using_supabase():
+        from .supabase_db import get_document_content
+        rows = get_document_content(model.__tablename__, document_ids, order_column)
+    else:
+        if not db:
+            return {}
+        rows = db.query(model).filter(model.document_id.in_(document_ids)).order_by(
+            model.document_id, getattr(model, order_column)
+        ).all()
+    
+    grouped = {}
+    for row in rows:
+        document_id = row["document_id"] if isinstance(row, dict) else row.document_id
+        grouped.setdefault(document_id, []).append(_row_to_langchain_document(row))
+    return grouped
+
+def get_stored_pages(document_ids: List[int], db: Optional[Session] = None) -> Dict[int, List]:
+    """Get extracted pages of documents from the chunk store (documents without stored pages are left out)."""
+    return _get_stored_content(DocumentPage, "page_index", document_ids, db)
+
+def get_stored_chunks(document_ids: List[int], db: Optional[Session] = None) -> Dict[int, List]:
+    """Get split chunks of documents from the chunk store (documents without stored chunks are left out)."""
+    return _get_stored_content(DocumentChunk, "chunk_index", document_ids, db)
+
+def get_stored_chunk(document_id: int, chunk_index: int, db: Optional[Session] = None):
+    """Get a single stored chunk of a document (e.g. to show the full text behind a citation)."""
+    if is_using_supabase():
+        from .supabase_db import get_document_chunk
+        row = get_document_chunk(document_id, chunk_index)
+        return _row_to_langchain_document(row) if row else None
+    else:
+        if db:
+            row = db.query(DocumentChunk).filter(
+                DocumentChunk.document_id == document_id,
+                DocumentChunk.chunk_index == chunk_index
+            ).first()
+            return _row_to_langchain_document(row) if row else None
+        return None
+
+def copy_document_content(source_document_id: int, document_id: int, source: str, db: Optional[Session] = None) -> bool:
+    """
+    Copy the stored pages and chunks of a document to another document (duplicate uploads).
+    
+    Returns:
+        True if there was content to copy
+    """
+    pages = get_stored_pages([source_document_id], db).get(source_document_id)
+    chunks = get_stored_chunks([source_document_id], db).get(source_document_id)
+    if not pages or not chunks:
+        return False
+    for doc in pages + chunks:
+        doc.metadata['source'] = source
+    save_document_content(document_id, pages, chunks, db=db)
+    return True
+
+def delete_document_content(document_id: int, db: Optional[Session] = None) -> None:
+    """Remove a document's pages and chunks from the chunk store."""
+    if is_using_supabase():
+        from .supabase_db import delete_document_content as supabase_delete_content
+        supabase_delete_content(document_id)
+    else:
+        if db:
+            db.query(DocumentChunk).filter(DocumentChunk.document_id == document_id).delete()
+            db.query(DocumentPage).filter(DocumentPage.document_id == document_id).delete()
+            db.commit()
+
 def create_chat_history_entry(user_id: int, query: str, response: str, mode: str = "rag",
                               pdf_generated: bool = False, pdf_url: Optional[str] = None,
                               citations: Optional[str] = None, db: Optional[Session] = None) -> Optional[Union[ChatHistory, Dict]]:
@@ -0,0 +1,274 @@
+"""
+Caches in front of the embedding model.
+
+CachedEmbeddings: persistent on-disk cache for document embeddings. Vectors
+are stored in SQLite keyed by (model name, SHA-256 of the chunk text), so
+rebuilding a vault only runs the embedding model on text it has not seen
+before. The cache is size-bounded and evicts least recently used entries.
+
+QueryCachedEmbeddings: bounded in-memory LRU of query vectors, so repeated
+questions (and frontend retries) skip the transformer forward pass.
+"""
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "embedding_cache/embeddings.sqlite3")
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "200000"))
+# Query vectors kept in memory (384 floats each, ~3 KB as Python lists); 0 disables the query cache
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "1024"))
+
+# SQLite limits the number of bound parameters per statement
+_LOOKUP_BATCH_SIZE = 500
+
+def text_hash(text: str) -> str:
+    """Stable content hash of a chunk of text."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that serves document vectors from a persistent cache."""
+    
+    def __init__(self, embeddings: Embeddings, model_name: str,
+                 path: str = EMBEDDING_CACHE_PATH, max_entries: int = EMBEDDING_CACHE_MAX_ENTRIES):
+        """
+        Args:
+            embeddings: Underlying embeddings used for cache misses
+            model_name: Part of the cache key, so switching models never returns stale vectors
+            path: SQLite database file
+            max_entries: Entries kept before least recently used ones are evicted
+        """
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = None
+        # Running row count (exact when opened; other processes' inserts are picked up when it
+        # next passes max_entries and is recounted), so inserts don't scan the table
+        self._entries = 0
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Open the cache database on first use."""
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    model TEXT NOT NULL,
+                    text_hash TEXT NOT NULL,
+                    vector BLOB NOT NULL,
+                    last_used REAL NOT NULL,
+                    PRIMARY KEY (model, text_hash)
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_embeddings_last_used ON embeddings(last_used)")
+            conn.commit()
+            self._entries = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            self._conn = conn
+        return self._conn
+    
+    def _lookup(self, conn: sqlite3.Connection, hashes: List[str]) -> Dict[str, List[float]]:
+        """Fetch cached vectors for the given text hashes."""
+        found = {}
+        for start in range(0, len(hashes), _LOOKUP_BATCH_SIZE):
+            batch = hashes[start:start + _LOOKUP_BATCH_SIZE]
+            placeholders = ",".join("?" * len(batch))
+            rows = conn.execute(
+                f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                [self.model_name, *batch],
+            ).fetchall()
+            for key, blob in rows:
+                vector = array("f")
+                vector.frombytes(blob)
+                found[key] = vector.tolist()
+        return found
+    
+    def _evict(self, conn: sqlite3.Connection):
+        """Trim the cache to 90% of max_entries, dropping least recently used vectors."""
+        if self._entries <= self.max_entries:
+            return
+        # The running count can overshoot (replaced rows, other processes) - recount before deleting
+        count = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        self._entries = count
+        if count <= self.max_entries:
+            return
+        excess = count - int(self.max_entries * 0.9)
+        conn.execute(
+            "DELETE FROM embeddings WHERE rowid IN (SELECT rowid FROM embeddings ORDER BY last_used LIMIT ?)",
+            (excess,),
+        )
+        self._entries -= excess
+        print(f"Embedding cache: evicted {excess} least recently used entries")
+    
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed documents, computing vectors only for text not already cached."""
+        if not texts:
+            return []
+        hashes = [text_hash(text) for text in texts]
+        
+        with self._lock:
+            conn = self._connect()
+            cached = self._lookup(conn, list(set(hashes)))
+        
+        # Embed each missing text once, even if it appears several times in the batch
+        missing = {}
+        for key, text in zip(hashes, texts):
+            if key not in cached and key not in missing:
+                missing[key] = text
+        computed = {}
+        if missing:
+            vectors = self.embeddings.embed_documents(list(missing.values()))
+            computed = dict(zip(missing.keys(), vectors))
+        
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            if cached:
+                conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE model = ? AND text_hash = ?",
+                    [(now, self.model_name, key) for key in cached],
+                )
+            if computed:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (model, text_hash, vector, last_used) VALUES (?, ?, ?, ?)",
+                    [(self.model_name, key, array("f", vector).tobytes(), now) for key, vector in computed.items()],
+                )
+                # Upper bound - a key another process added meanwhile is replaced, not added
+                self._entries += len(computed)
+                self._evict(conn)
+            conn.commit()
+            hits = sum(1 for key in hashes if key in cached)
+            self.hits += hits
+            self.misses += len(hashes) - hits
+        
+        return [cached[key] if key in cached else computed[key] for key in hashes]
+    
+    def embed_query(self, text: str) -> List[float]:
+        """Queries are embedded directly - they rarely repeat the stored chunk text."""
+        return self.embeddings.embed_query(text)
+    
+    def stats(self) -> Dict[str, Optional[float]]:
+        """Hit/miss counters of this process and the current cache size (running count, no table scan)."""
+        with self._lock:
+            self._connect()
+            entries = self._entries
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else None,
+            "entries": entries,
+            "max_entries": self.max_entries,
+        }
+
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_query(text: str, lowercase: bool = False) -> str:
+    """
+    Cache key of a query: whitespace-collapsed, and lowercased for uncased models.
+    
+    Args:
+        text: Query as sent by the user
+        lowercase: Only when the model's tokenizer lowercases its input anyway
+    """
+    key = _WHITESPACE.sub(" ", text or "").strip()
+    return key.lower() if lowercase else key
+
+def _find_tokenizer(embeddings):
+    """Tokenizer of the model behind (possibly wrapped) embeddings, None if unknown or not loaded yet."""
+    while embeddings is not None:
+        # OnnxEmbeddings loads its tokenizer on first use
+        tokenizer = getattr(embeddings, "_tokenizer", None)
+        if tokenizer is None:
+            # HuggingFaceEmbeddings wraps a SentenceTransformer
+            client = getattr(embeddings, "_client", None) or getattr(embeddings, "client", None)
+            tokenizer = getattr(client, "tokenizer", None)
+        if tokenizer is not None:
+            return tokenizer
+        # Unwrap CachedEmbeddings and similar wrappers
+        embeddings = getattr(embeddings, "__dict__", {}).get("embeddings")
+    return None
+
+class QueryCachedEmbeddings(Embeddings):
+    """Embeddings wrapper that keeps recent query vectors in a bounded LRU cache."""
+    
+    def __init__(self, embeddings: Embeddings, max_entries: int = QUERY_EMBEDDING_CACHE_SIZE):
+        """
+        Args:
+            embeddings: Underlying embeddings (document calls always go straight to them)
+            max_entries: Query vectors kept before the least recently used one is dropped
+        """
+        self.embeddings = embeddings
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._cache: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Whether the model lowercases its input (None until its tokenizer is loaded)
+        self._lowercase = None
+    
+    def __getattr__(self, name):
+        # Expose the wrapped embeddings' attributes (e.g. the document cache's stats())
+        if name == "embeddings":
+            raise AttributeError(name)
+        return getattr(self.embeddings, name)
+    
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+    
+    def _key(self, text: str) -> str:
+        """Cache key - case is only folded once the tokenizer is known to lowercase."""
+        if self._lowercase is None:
+            tokenizer = _find_tokenizer(self.embeddings)
+            if tokenizer is not None:
+                self._lowercase = bool(getattr(tokenizer, "do_lower_case", False))
+        return normalize_query(text, bool(self._lowercase))
+    
+    def embed_query(self, text: str) -> List[float]:
+        """Serve the query vector from the cache, embedding the original text on a miss."""
+        key = self._key(text)
+        with self._lock:
+            vector = self._cache.get(key)
+            if vector is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return list(vector)
+            self.misses += 1
+        # Embed outside the lock so concurrent misses don't queue behind each other
+        vector = self.embeddings.embed_query(text)
+        with self._lock:
+            self._cache[key] = vector
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return list(vector)
+    
+    def query_cache_stats(self) -> Dict[str, Optional[float]]:
+        """Hit/miss counters of this process and the current cache size."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else None,
+                "entries": len(self._cache),
+                "max_entries": self.max_entries,
+            }
+    
+    def clear(self):
+        """Drop all cached query vectors (counters are kept)."""
+        with self._lock:
+            self._cache.clear()
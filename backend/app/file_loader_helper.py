@@ -1,10 +1,16 @@
 """Helper function to load files from Supabase Storage or local filesystem."""
 import os
-import tempfile
-from typing import List
+import threading
+from typing import Dict, List, Tuple
 from .loaders import load_file
 from .database import Document
 
+# Worker processes used to parse documents in parallel during rebuilds (0 = one per CPU)
+LOADER_WORKERS = int(os.getenv("LOADER_WORKERS", "0")) or os.cpu_count() or 1
+
+_loader_pool = None
+_loader_pool_lock = threading.Lock()
+
 def load_document_content(doc) -> List:
     """
     Load document content from Supabase Storage or local filesystem.
@@ -23,28 +29,34 @@ def load_document_content(doc) -> List:
         filepath = doc.get("filepath")
         file_type = doc.get("file_type")
         filename = doc.get("filename")  # Original filename from database
+        document_id = doc.get("id")
     else:
         supabase_path = getattr(doc, 'supabase_path', None)
         filepath = getattr(doc, 'filepath', None)
         file_type = getattr(doc, 'file_type', None)
         filename = getattr(doc, 'filename', None)  # Original filename from database
+        document_id = getattr(doc, 'id', None)
     
     # Get original filename for metadata (important for citations)
     original_filename = filename or (os.path.basename(filepath) if filepath else "unknown")
     
+    docs = _load_document_pages(supabase_path, filepath, file_type, filename, original_filename, use_supabase)
+    
+    # Tag every page with its document so its vectors can be targeted later
+    if document_id is not None:
+        for page in docs:
+            page.metadata['document_id'] = document_id
+    return docs
+
+def _load_document_pages(supabase_path, filepath, file_type, filename, original_filename, use_supabase) -> List:
+    """Load raw pages from Supabase Storage or the local filesystem."""
     if use_supabase and supabase_path:
         # Download from Supabase Storage
         from .supabase_storage import download_file_from_supabase
         try:
             file_content = download_file_from_supabase(supabase_path)
-            suffix = f".{file_type}" if file_type else ""
-            with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp_file:
-                tmp_file.write(file_content)
-                tmp_file_path = tmp_file.name
-            # Load file and update metadata with original filename
-            docs = load_file(tmp_file_path, original_filename=original_filename)
-            os.unlink(tmp_file_path)  # Clean up
-            return docs
+            # Parse the downloaded bytes directly and update metadata with original filename
+            return load_file(file_content, original_filename=original_filename, file_type=file_type)
         except Exception as e:
             print(f"Error loading from Supabase Storage: {e}, trying local path...")
             # Fallback to local path if Supabase fails
@@ -58,6 +70,148 @@ def load_document_content(doc) -> List:
         file_display = filename or filepath or "unknown"
         raise FileNotFoundError(f"File not found: {file_display}")
 
+def _document_info(doc) -> Dict:
+    """Plain dict copy of a document row so it can be sent to a worker process."""
+    if isinstance(doc, dict):
+        return dict(doc)
+    return {
+        "id": getattr(doc, 'id', None),
+        "filename": getattr(doc, 'filename', None),
+        "filepath": getattr(doc, 'filepath', None),
+        "file_type": getattr(doc, 'file_type', None),
+        "supabase_path": getattr(doc, 'supabase_path', None),
+    }
+
+def _get_loader_pool():
+    """Get the shared process pool for document parsing (created on first use)."""
+    global _loader_pool
+    with _loader_pool_lock:
+        if _loader_pool is None:
+            from concurrent.futures import ProcessPoolExecutor
+            import multiprocessing
+            # spawn: forking a process that already holds model threads is unsafe
+            _loader_pool = ProcessPoolExecutor(
+                max_workers=LOADER_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _loader_pool
+
+def _reset_loader_pool():
+    """Drop a broken pool so the next call starts a fresh one."""
+    global _loader_pool
+    with _loader_pool_lock:
+        if _loader_pool is not None:
+            _loader_pool.shutdown(wait=False, cancel_futures=True)
+        _loader_pool = None
+
+def _store_document_content(info: Dict, pages: List, chunks: List, db) -> None:
+    """Save freshly parsed content to the chunk store so later rebuilds can skip parsing."""
+    from .db_helper import delete_document_content, save_document_content
+    document_id = info.get("id")
+    if document_id is None:
+        return
+    try:
+        delete_document_content(document_id, db)
+        save_document_content(document_id, pages, chunks, db=db)
+    except Exception as e:
+        print(f"Error saving document {info.get('filename')} to chunk store: {e}")
+        # Never leave a partial copy behind - it would be read back as the whole document
+        if db is not None:
+            db.rollback()
+        try:
+            delete_document_content(document_id, db)
+        except Exception:
+            pass
+
+def load_documents_parallel(docs, max_workers: int = None, db=None, on_document=None) -> Tuple[List, List[str], List[Dict]]:
+    """
+    Load the chunks of many documents.
+    
+    Documents already in the chunk store are read from it without downloading
+    or parsing the file. The rest are parsed across a process pool, chunked,
+    and written to the chunk store for next time.
+    
+    Args:
+        docs: Document database objects (SQLAlchemy) or dicts (Supabase)
+        max_workers: Parse in-process when 1 (defaults to LOADER_WORKERS)
+        db: SQLAlchemy session for the chunk store (not used with Supabase)
+        on_document: Optional callback on_document(filename, chunks, error, from_store)
+            called as each document finishes loading (chunks is a count)
+        
+    Returns:
+        Tuple of (chunks of all documents, successful filenames,
+        failed files as {"filename", "error"} dicts)
+    """
+    from concurrent.futures.process import BrokenProcessPool
+    from .chunking import chunk_documents
+    from .db_helper import get_stored_chunks
+    infos = [_document_info(doc) for doc in docs]
+    workers = max_workers or LOADER_WORKERS
+    
+    all_docs = []
+    successful_files = []
+    failed_files = []
+    
+    try:
+        stored_chunks = get_stored_chunks([info["id"] for info in infos if info.get("id") is not None], db)
+    except Exception as e:
+        print(f"Error reading chunk store, parsing all documents: {e}")
+        stored_chunks = {}
+    
+    def collect(info, load_result):
+        filename = info.get("filename") or "unknown"
+        try:
+            loaded_docs = load_result()
+        except BrokenProcessPool:
+            raise
+        except Exception as e:
+            failed_files.append({"filename": filename, "error": str(e)})
+            print(f"Error loading document {filename}: {e}")
+            if on_document:
+                on_document(filename, 0, str(e), False)
+            return
+        chunks = chunk_documents(loaded_docs)
+        _store_document_content(info, loaded_docs, chunks, db)
+        all_docs.extend(chunks)
+        successful_files.append(filename)
+        print(f"Successfully loaded {len(loaded_docs)} pages from {filename}")
+        if on_document:
+            on_document(filename, len(chunks), None, False)
+    
+    # Documents in the chunk store need no download or parsing
+    remaining = []
+    for info in infos:
+        chunks = stored_chunks.get(info.get("id"))
+        if chunks:
+            all_docs.extend(chunks)
+            successful_files.append(info.get("filename") or "unknown")
+            if on_document:
+                on_document(info.get("filename") or "unknown", len(chunks), None, True)
+        else:
+            remaining.append(info)
+    if stored_chunks:
+        print(f"Loaded {len(all_docs)} chunks of {len(successful_files)} documents from the chunk store")
+    
+    to_parse = remaining
+    if workers > 1 and len(to_parse) > 1:
+        try:
+            pool = _get_loader_pool()
+            futures = [pool.submit(load_document_content, info) for info in to_parse]
+            # Collect in submission order so the vectorstore gets a stable document order
+            for index, (info, future) in enumerate(zip(to_parse, futures)):
+                remaining = to_parse[index:]
+                collect(info, future.result)
+            remaining = []
+        except BrokenProcessPool as e:
+            # A worker died (e.g. out of memory) - parse whatever is left in-process
+            print(f"Document loader pool broke ({e}), loading remaining documents in-process")
+            _reset_loader_pool()
+    
+    for info in remaining:
+        collect(info, lambda: load_document_content(info))
+    
+    return all_docs, successful_files, failed_files
+
 def load_file_by_path(filepath: str, file_type: str = None) -> List:
     """
     Load file by path (for legacy endpoints).
@@ -1,9 +1,9 @@
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import StrOutputParser
 from .llm import get_llm
 
 def get_direct_generation_chain():
     """Get a chain for direct content generation without RAG."""
+    from langchain_core.prompts import ChatPromptTemplate
+    from langchain_core.output_parsers import StrOutputParser
     llm = get_llm()
     
     # Ultra-short prompt for maximum speed
@@ -0,0 +1,191 @@
+"""
+Hybrid retrieval: dense vector search fused with BM25 keyword search.
+
+Dense search finds paraphrases but often misses exact names, IDs and numbers;
+BM25 over the same chunks finds exactly those. Each user gets an in-memory
+BM25 index built from the chunk store on first use. Both searches run at the
+same time and their rankings are merged with reciprocal rank fusion (RRF),
+so the prompt still gets only k chunks.
+
+The BM25 index is dropped whenever the user's vectors change (see
+invalidate_keyword_index) and rebuilt lazily on the next query. At most
+HYBRID_INDEX_CACHE_SIZE users' indexes are kept; the least recently used
+one is dropped when another user's index is built.
+"""
+import math
+import os
+import re
+import threading
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from langchain_core.documents import Document
+
+HYBRID_SEARCH_ENABLED = os.getenv("HYBRID_SEARCH_ENABLED", "true").lower() == "true"
+# Candidates taken from each ranking before fusion
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "10"))
+# RRF damping constant - 60 is the value from the original RRF paper
+RRF_K = int(os.getenv("RRF_K", "60"))
+# Users whose BM25 index (all chunk texts + postings) is kept in memory
+HYBRID_INDEX_CACHE_SIZE = int(os.getenv("HYBRID_INDEX_CACHE_SIZE", "100"))
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens - digits and IDs are kept as they are."""
+    return _TOKEN_PATTERN.findall((text or "").lower())
+
+class BM25Index:
+    """Okapi BM25 over a fixed list of chunks, with an inverted index for fast scoring."""
+    
+    def __init__(self, docs: List[Document]):
+        self.docs = docs
+        self._postings: Dict[str, List] = {}
+        self._lengths = []
+        for position, doc in enumerate(docs):
+            counts = Counter(tokenize(doc.page_content))
+            self._lengths.append(sum(counts.values()))
+            for term, frequency in counts.items():
+                self._postings.setdefault(term, []).append((position, frequency))
+        self._average_length = (sum(self._lengths) / len(self._lengths)) if self._lengths else 0.0
+    
+    def __len__(self):
+        return len(self.docs)
+    
+    def search(self, query: str, k: int) -> List[Document]:
+        """The k best-scoring chunks for the query (chunks sharing no term are never returned)."""
+        scores: Dict[int, float] = {}
+        total = len(self.docs)
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+            for position, frequency in postings:
+                length_norm = 1 - BM25_B + BM25_B * self._lengths[position] / (self._average_length or 1)
+                scores[position] = scores.get(position, 0.0) + idf * frequency * (BM25_K1 + 1) / (frequency + BM25_K1 * length_norm)
+        best = sorted(scores, key=scores.get, reverse=True)[:k]
+        return [self.docs[position] for position in best]
+
+# user_id -> index, least recently used first
+_indexes: "OrderedDict[int, Optional[BM25Index]]" = OrderedDict()
+_indexes_lock = threading.Lock()
+_build_locks: Dict[int, threading.Lock] = {}
+# Bumped on every invalidation, so a build that raced with a write is not cached
+_generations: Dict[int, int] = {}
+
+# Runs the keyword search while the dense search waits on the vector store
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="hybrid-search")
+
+def invalidate_keyword_index(user_id: int):
+    """Drop the user's BM25 index (called whenever their vectors change)."""
+    with _indexes_lock:
+        _indexes.pop(user_id, None)
+        _generations[user_id] = _generations.get(user_id, 0) + 1
+
+def _load_user_chunks(user_id: int) -> List[Document]:
+    """All stored chunks of the user's processed documents."""
+    from .database import SessionLocal
+    from .db_helper import get_processed_documents, get_stored_chunks
+    db = SessionLocal() if SessionLocal is not None else None
+    try:
+        documents = get_processed_documents(user_id, db)
+        document_ids = [doc.get("id") if isinstance(doc, dict) else doc.id for doc in documents]
+        stored = get_stored_chunks(document_ids, db)
+        return [chunk for document_id in document_ids for chunk in stored.get(document_id, [])]
+    finally:
+        if db is not None:
+            db.close()
+
+def get_keyword_index(user_id: int) -> Optional[BM25Index]:
+    """The user's BM25 index, built from the chunk store on first use (None if there is nothing to index)."""
+    with _indexes_lock:
+        if user_id in _indexes:
+            _indexes.move_to_end(user_id)
+            return _indexes[user_id]
+        build_lock = _build_locks.setdefault(user_id, threading.Lock())
+    
+    # One build per user at a time; concurrent queries wait for it instead of building again
+    with build_lock:
+        with _indexes_lock:
+            if user_id in _indexes:
+                return _indexes[user_id]
+            generation = _generations.get(user_id, 0)
+        try:
+            chunks = _load_user_chunks(user_id)
+        except Exception as e:
+            print(f"Error loading chunks for the keyword index of user {user_id}: {e}")
+            return None
+        index = BM25Index(chunks) if chunks else None
+        with _indexes_lock:
+            if _generations.get(user_id, 0) == generation:
+                _indexes[user_id] = index
+                _evict_indexes()
+        print(f"Built keyword index for user {user_id}: {len(chunks)} chunks")
+        return index
+
+def _evict_indexes():
+    """Drop least recently used indexes (and their bookkeeping) beyond HYBRID_INDEX_CACHE_SIZE; caller holds _indexes_lock."""
+    while len(_indexes) > max(HYBRID_INDEX_CACHE_SIZE, 1):
+        evicted, _ = _indexes.popitem(last=False)
+        _build_locks.pop(evicted, None)
+        _generations.pop(evicted, None)
+
+def _keyword_search(user_id: int, query: str, k: int) -> List[Document]:
+    index = get_keyword_index(user_id)
+    return index.search(query, k) if index else []
+
+def _doc_key(doc: Document):
+    """Identity of a chunk across the dense and keyword rankings."""
+    metadata = doc.metadata or {}
+    if metadata.get("document_id") is not None and metadata.get("chunk_index") is not None:
+        return (metadata["document_id"], metadata["chunk_index"])
+    return doc.page_content
+
+def reciprocal_rank_fusion(rankings: List[List[Document]], k: int, rrf_k: int = RRF_K) -> List[Document]:
+    """
+    Merge rankings by summing 1 / (rrf_k + rank) per chunk.
+    
+    Args:
+        rankings: Ranked chunk lists, best first (earlier lists win ties)
+        k: Number of chunks to return
+        rrf_k: Damping constant; larger values flatten the rank weights
+    """
+    scores = {}
+    docs = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking, 1):
+            key = _doc_key(doc)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank)
+            docs.setdefault(key, doc)
+    # sorted() is stable, so equal scores keep first-seen order (dense ranking first)
+    return [docs[key] for key in sorted(scores, key=scores.get, reverse=True)[:k]]
+
+def hybrid_search(vectorstore, user_id: int, query: str, k: int = 3, candidates: int = HYBRID_CANDIDATES) -> List[Document]:
+    """
+    Dense and BM25 search at the same time, fused with RRF.
+    
+    Falls back to the dense ranking alone when the user has no keyword index
+    (e.g. documents indexed before the chunk store existed).
+    
+    Args:
+        vectorstore: The user's vector store
+        user_id: Owner of the chunks
+        query: User's question
+        k: Chunks to return
+        candidates: Chunks taken from each ranking before fusion
+    """
+    keyword_future = _executor.submit(_keyword_search, user_id, query, candidates)
+    dense = vectorstore.similarity_search(query, k=max(k, candidates))
+    try:
+        keyword = keyword_future.result()
+    except Exception as e:
+        print(f"Keyword search failed for user {user_id}, using dense results only: {e}")
+        keyword = []
+    if not keyword:
+        return dense[:k]
+    return reciprocal_rank_fusion([dense, keyword], k)
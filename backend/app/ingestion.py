@@ -0,0 +1,155 @@
+"""
+In-process background ingestion queue for vault uploads.
+
+Uploads are handed to an asyncio queue and processed by worker tasks, so the
+request handler can return immediately with a job id. Progress is tracked per
+stage and exposed through the job registry.
+
+Job records are written by worker threads while requests read them, so every
+write holds _jobs_lock and readers get a copy taken under it (get_job).
+"""
+import asyncio
+import copy
+import os
+import threading
+import time
+import traceback
+import uuid
+from typing import Callable, Dict, List, Optional
+
+# Pipeline stages in the order they run
+STAGES = ["download", "parse", "chunk", "embed", "upsert"]
+
+# Number of concurrent ingestion workers (each runs the blocking pipeline in a thread)
+INGESTION_WORKERS = int(os.getenv("INGESTION_WORKERS", "1"))
+
+# Finished jobs kept in memory for status lookups
+MAX_FINISHED_JOBS = int(os.getenv("INGESTION_MAX_FINISHED_JOBS", "500"))
+
+_jobs: Dict[str, dict] = {}
+_jobs_lock = threading.Lock()
+_tasks: Dict[str, Callable] = {}
+_queue: Optional[asyncio.Queue] = None
+_workers: List[asyncio.Task] = []
+
+def create_job(user_id: int, document_id: Optional[int], filename: str) -> dict:
+    """Register a new queued job and return its status record."""
+    job_id = uuid.uuid4().hex
+    job = {
+        "id": job_id,
+        "user_id": user_id,
+        "document_id": document_id,
+        "filename": filename,
+        "status": "queued",
+        "stage": None,
+        "stages": {stage: {"status": "pending", "done": 0, "total": None} for stage in STAGES},
+        "error": None,
+        "created_at": time.time(),
+        "started_at": None,
+        "finished_at": None,
+    }
+    with _jobs_lock:
+        _jobs[job_id] = job
+        _prune_finished_jobs()
+    return job
+
+def get_job(job_id: str) -> Optional[dict]:
+    """Get a snapshot of a job status record by id (safe to serialize while the job runs)."""
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        return copy.deepcopy(job) if job is not None else None
+
+def update_job(job: Optional[dict], **fields):
+    """Set extra fields on a job record (e.g. failed_files) from pipeline code."""
+    if job is None:
+        return
+    with _jobs_lock:
+        job.update(fields)
+
+def report_progress(job: Optional[dict], stage: str, done: Optional[int] = None, total: Optional[int] = None):
+    """
+    Record progress for a pipeline stage.
+    
+    Marks earlier stages as done when a later stage starts. Safe to call with
+    job=None so pipeline code can report progress unconditionally.
+    """
+    if job is None or stage not in job["stages"]:
+        return
+    stage_index = STAGES.index(stage)
+    with _jobs_lock:
+        for earlier in STAGES[:stage_index]:
+            if job["stages"][earlier]["status"] == "running":
+                job["stages"][earlier]["status"] = "done"
+        
+        info = job["stages"][stage]
+        if total is not None:
+            info["total"] = total
+        if done is not None:
+            info["done"] = done
+        info["status"] = "done" if info["total"] is not None and info["done"] >= info["total"] else "running"
+        job["stage"] = stage
+
+def skip_stage(job: Optional[dict], stage: str):
+    """Mark a stage that does not apply to this job (e.g. no download needed)."""
+    if job is not None and stage in job["stages"]:
+        with _jobs_lock:
+            job["stages"][stage]["status"] = "skipped"
+
+async def submit_job(job: dict, task: Callable[[dict], None]):
+    """
+    Queue a job for background processing.
+    
+    Args:
+        job: Job record from create_job()
+        task: Blocking callable run in a worker thread; receives the job record
+    """
+    _ensure_workers()
+    _tasks[job["id"]] = task
+    await _queue.put(job["id"])
+
+def _ensure_workers():
+    """Start the queue and worker tasks on first use (needs a running event loop)."""
+    global _queue
+    if _queue is None:
+        _queue = asyncio.Queue()
+    _workers[:] = [worker for worker in _workers if not worker.done()]
+    while len(_workers) < max(1, INGESTION_WORKERS):
+        _workers.append(asyncio.create_task(_worker()))
+
+async def _worker():
+    """Take jobs off the queue and run them one at a time."""
+    while True:
+        job_id = await _queue.get()
+        job = _jobs.get(job_id)
+        task = _tasks.pop(job_id, None)
+        try:
+            if job is not None and task is not None:
+                with _jobs_lock:
+                    job["status"] = "running"
+                    job["started_at"] = time.time()
+                await asyncio.to_thread(task, job)
+                with _jobs_lock:
+                    for info in job["stages"].values():
+                        if info["status"] in ("pending", "running"):
+                            info["status"] = "done"
+                    job["status"] = "completed"
+        except Exception as e:
+            print(f"Ingestion job {job_id} failed: {e}")
+            traceback.print_exc()
+            with _jobs_lock:
+                job["status"] = "failed"
+                job["error"] = str(e)
+        finally:
+            if job is not None:
+                with _jobs_lock:
+                    job["finished_at"] = time.time()
+            _queue.task_done()
+
+def _prune_finished_jobs():
+    """Drop the oldest finished jobs once the registry grows past the limit (caller holds _jobs_lock)."""
+    finished = [job for job in _jobs.values() if job["finished_at"] is not None]
+    if len(finished) <= MAX_FINISHED_JOBS:
+        return
+    finished.sort(key=lambda job: job["finished_at"])
+    for job in finished[:len(finished) - MAX_FINISHED_JOBS]:
+        _jobs.pop(job["id"], None)
@@ -1,17 +1,29 @@
 """
 Module to search for keywords in uploaded documents.
 """
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Tuple
 import re
-from .loaders import load_file
+from .loaders import iter_file
 
-def search_keyword_in_document(filepath: str, keyword: str) -> Dict:
+def _document_pages(filepath: str, document_id: Optional[int] = None, db=None):
+    """Extracted pages from the chunk store, or parsed from the file if they aren't stored."""
+    if document_id is not None:
+        from .db_helper import get_stored_pages
+        pages = get_stored_pages([document_id], db).get(document_id)
+        if pages:
+            return pages
+    # Stream pages lazily so long documents don't sit in memory
+    return iter_file(filepath)
+
+def search_keyword_in_document(filepath: str, keyword: str, document_id: Optional[int] = None, db=None) -> Dict:
     """
     Search for a keyword in a document and return occurrences with context.
     
     Args:
         filepath: Path to the document file
         keyword: Keyword to search for
+        document_id: Database ID of the document, to read its text from the chunk store
+        db: SQLAlchemy session for the chunk store (not used with Supabase)
     
     Returns:
         Dictionary with search results including:
@@ -20,8 +32,7 @@ def search_keyword_in_document(filepath: str, keyword: str) -> Dict:
         - pages: Page numbers (for PDFs)
     """
     try:
-        # Load document
-        docs = load_file(filepath)
+        docs = _document_pages(filepath, document_id, db)
         
         keyword_lower = keyword.lower()
         occurrences = 0
@@ -87,19 +98,21 @@ def search_keyword_in_document(filepath: str, keyword: str) -> Dict:
             "error": str(e)
         }
 
-def search_multiple_keywords(filepath: str, keywords: List[str]) -> Dict:
+def search_multiple_keywords(filepath: str, keywords: List[str], document_id: Optional[int] = None, db=None) -> Dict:
     """
     Search for multiple keywords in a document.
     
     Args:
         filepath: Path to the document
         keywords: List of keywords to search
+        document_id: Database ID of the document, to read its text from the chunk store
+        db: SQLAlchemy session for the chunk store (not used with Supabase)
     
     Returns:
         Dictionary with results for each keyword
     """
     results = {}
     for keyword in keywords:
-        results[keyword] = search_keyword_in_document(filepath, keyword)
+        results[keyword] = search_keyword_in_document(filepath, keyword, document_id, db)
     
     return results
@@ -1,8 +1,10 @@
-from langchain_groq import ChatGroq  # type: ignore
-from langchain_ollama import OllamaLLM  # type: ignore
 import os
 
 def get_llm():
+    # LLM client libraries are imported here, not at module load, to keep startup fast
+    from langchain_groq import ChatGroq  # type: ignore
+    from langchain_ollama import OllamaLLM  # type: ignore
+    
     # Try Groq first if API key is available (fastest option)
     groq_api_key = os.getenv("GROQ_API_KEY")
     if groq_api_key:
@@ -1,29 +1,66 @@
-from langchain_community.document_loaders import PyPDFLoader, TextLoader, Docx2txtLoader  # type: ignore
+from langchain_core.documents import Document
+import io
 import os
 
-def load_file(path, original_filename=None):
+def _file_type_of(source, original_filename=None, file_type=None):
+    """Work out the file type from an explicit type, the filename or the path."""
+    if file_type:
+        return file_type.lower().lstrip(".")
+    name = source if isinstance(source, str) else (original_filename or "")
+    return os.path.splitext(name)[1].lower().lstrip(".")
+
+def _iter_buffer_pages(stream, file_type, filename):
+    """Parse an in-memory file (BytesIO or any binary file object) without a temp file."""
+    if file_type == "pdf":
+        from pypdf import PdfReader  # type: ignore
+        reader = PdfReader(stream)
+        total_pages = len(reader.pages)
+        for page_number, page in enumerate(reader.pages):
+            # Same metadata PyPDFLoader produces for files on disk
+            yield Document(
+                page_content=page.extract_text() or "",
+                metadata={"source": filename, "page": page_number, "total_pages": total_pages},
+            )
+    elif file_type == "txt":
+        yield Document(page_content=stream.read().decode("utf-8"), metadata={"source": filename})
+    elif file_type == "docx":
+        import docx2txt  # type: ignore
+        yield Document(page_content=docx2txt.process(stream), metadata={"source": filename})
+    else:
+        raise ValueError("Unsupported file")
+
+def iter_file(source, original_filename=None, file_type=None):
     """
-    Load file and ensure metadata includes source information for citations.
+    Lazily yield the pages of a file with source metadata for citations.
+    
+    PDFs are parsed one page at a time, so memory stays flat no matter how
+    long the document is. TXT and DOCX files are a single page anyway.
     
     Args:
-        path: File path (can be temp file path)
+        source: File path, raw bytes, or a binary file object (e.g. BytesIO)
         original_filename: Original filename from database (for proper citations)
+        file_type: pdf, txt or docx - needed for bytes/file objects unless
+            original_filename has the extension
     """
     # Use original filename if provided, otherwise use basename of path
     # This ensures citations show the correct filename, not temp file names
-    filename = original_filename if original_filename else os.path.basename(path)
+    is_path = isinstance(source, str)
+    filename = original_filename if original_filename else (os.path.basename(source) if is_path else "unknown")
+    file_type = _file_type_of(source, original_filename, file_type)
     
-    if path.endswith(".pdf"):
-        docs = PyPDFLoader(path).load()
-    elif path.endswith(".txt"):
-        docs = TextLoader(path).load()
-    elif path.endswith(".docx"):
-        docs = Docx2txtLoader(path).load()
+    if not is_path:
+        stream = io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else source
+        pages = _iter_buffer_pages(stream, file_type, filename)
+    elif file_type in ("pdf", "txt", "docx"):
+        # langchain_community is slow to import - load it on first use, not at startup
+        from langchain_community.document_loaders import PyPDFLoader, TextLoader, Docx2txtLoader  # type: ignore
+        loader_class = {"pdf": PyPDFLoader, "txt": TextLoader, "docx": Docx2txtLoader}[file_type]
+        pages = loader_class(source).lazy_load()
     else:
         raise ValueError("Unsupported file")
     
     # Add source metadata to all documents for citations
-    for doc in docs:
+    for doc in pages:
         if not hasattr(doc, 'metadata') or not doc.metadata:
             doc.metadata = {}
         
@@ -31,8 +68,19 @@ def load_file(path, original_filename=None):
         doc.metadata['source'] = filename
         
         # Ensure page number is set (for PDFs)
-        if 'page' not in doc.metadata and path.endswith(".pdf"):
+        if 'page' not in doc.metadata and file_type == "pdf":
             # PyPDFLoader usually adds page metadata, but ensure it exists
             doc.metadata['page'] = doc.metadata.get('page', 0)
+        
+        yield doc
+
+def load_file(source, original_filename=None, file_type=None):
+    """
+    Load file and ensure metadata includes source information for citations.
     
-    return docs
+    Args:
+        source: File path, raw bytes, or a binary file object (e.g. BytesIO)
+        original_filename: Original filename from database (for proper citations)
+        file_type: pdf, txt or docx (for bytes/file objects)
+    """
+    return list(iter_file(source, original_filename, file_type))
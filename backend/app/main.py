@@ -1,4 +1,4 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, Depends  # type: ignore
+from fastapi import FastAPI, UploadFile, File, HTTPException, Depends, Request  # type: ignore
 from fastapi.middleware.cors import CORSMiddleware  # type: ignore
 from fastapi.responses import FileResponse, StreamingResponse
 from pydantic import BaseModel  # type: ignore
@@ -7,6 +7,7 @@ import shutil
 import os
 import json
 import asyncio
+import hashlib
 import re
 from typing import AsyncIterator, List, Optional
 from dotenv import load_dotenv
@@ -14,8 +15,9 @@ from dotenv import load_dotenv
 # Load environment variables from .env file
 load_dotenv()
 
-from .loaders import load_file
+from .loaders import load_file, iter_file
 from .vectorstore import create_vectorstore
+from .chunking import chunk_documents
 from .rag import get_qa_chain
 from .generator import get_direct_generation_chain
 from .pdf_generator import generate_pdf_from_text
@@ -27,6 +29,13 @@ from .auth import (
 from fastapi.security import OAuth2PasswordRequestForm  # type: ignore
 from .keyword_search import search_keyword_in_document, search_multiple_keywords
 from .citations import extract_citations, format_citations_inline, get_citation_references
+from .db_helper import save_document_content
+from .ingestion import create_job, get_job, update_job, submit_job, report_progress, skip_stage
+from .uploads import (
+    spool_upload, spool_path_for, remove_spooled_file, create_resumable_upload, get_resumable_upload,
+    list_upload_parts, missing_upload_parts, save_upload_part, assemble_upload, remove_upload_parts, save_manifest,
+    max_part_number, UploadTooLarge
+)
 
 # Helper function to format keyword search response
 def format_keyword_search_response(search_result: dict, keyword: str) -> str:
@@ -68,6 +77,18 @@ async def startup_event():
         
         # SKIP all heavy operations during startup
         # Vectorstores will be loaded on-demand when needed
+        if os.getenv("EMBEDDING_WARMUP", "false").lower() == "true":
+            # Load the embedding model in the background so the first query doesn't pay for it
+            from .vectorstore import warm_up_embeddings
+            asyncio.create_task(asyncio.to_thread(warm_up_embeddings))
+            print("Embedding model warming up in the background")
+        from .reranker import RERANK_ENABLED
+        if RERANK_ENABLED:
+            # Retrieval keeps the dense order until the cross-encoder is loaded
+            from .reranker import warm_up_reranker
+            asyncio.create_task(asyncio.to_thread(warm_up_reranker))
+            print("Rerank model loading in the background")
+        
         print("=" * 50)
         print("FounderGPT API Ready - Port binding immediately")
         print("Database and vectorstores will be initialized on-demand")
@@ -137,10 +158,13 @@ async def root():
 @app.get("/health")
 async def health_check():
     """Health check endpoint for deployment verification."""
+    from .vectorstore import get_query_cache_stats
     return {
         "status": "ok",
         "message": "FounderGPT API is running",
-        "service": "backend"
+        "service": "backend",
+        # None until the embedding model has been loaded
+        "query_embedding_cache": get_query_cache_stats()
     }
 
 class ChatRequest(BaseModel):
@@ -161,6 +185,11 @@ class MultipleKeywordSearchRequest(BaseModel):
     keywords: List[str]
     document_id: Optional[int] = None
 
+class ResumableUploadRequest(BaseModel):
+    filename: str
+    file_size: Optional[int] = None  # Total size in bytes, checked when the upload completes
+    part_size: Optional[int] = None
+
 class UserRegister(BaseModel):
     username: str
     email: str
@@ -253,179 +282,602 @@ async def get_current_user_info(current_user = Depends(get_current_user)):
 async def upload_to_vault(file: UploadFile = File(...), current_user = Depends(get_current_user), db: Optional[Session] = Depends(get_db)):
     """Upload a file to user's vault."""
     try:
-        # Read file content
-        file_content = await file.read()
-        file_size = len(file_content)
-        
         # Get user ID
         user_id = getattr(current_user, 'id', None) or (current_user if isinstance(current_user, dict) else {}).get('id')
         
         # Check if using Supabase
         use_supabase = bool(os.getenv("SUPABASE_URL") and os.getenv("SUPABASE_KEY"))
+        # Client-supplied name - drop any directory part so it can't escape the upload directory
+        filename = os.path.basename(file.filename)
         
+        # Stream the upload to disk in chunks, hashing it on the way (never held in memory whole)
         if use_supabase:
-            # Upload to Supabase Storage
-            from .supabase_storage import upload_file_to_supabase
-            from .supabase_db import create_document
-            # Get original filename for display, but storage will use unique name
-            original_filename = file.filename
-            storage_path = upload_file_to_supabase(user_id, file_content, original_filename)
-            file_path = storage_path  # Store storage path
-            supabase_path = storage_path
-            # Extract the actual stored filename from storage_path
-            stored_filename = storage_path.split("/")[-1] if "/" in storage_path else storage_path
-            # Use original filename for database record (user sees original name)
-            display_filename = original_filename
+            # Spool locally until it is sent to Supabase Storage and parsed
+            staged_path = spool_path_for(filename)
         else:
-            # Fallback to local storage
-            user_upload_dir = f"uploads/user_{user_id}"
-            os.makedirs(user_upload_dir, exist_ok=True)
-            file_path = os.path.join(user_upload_dir, file.filename)
-            with open(file_path, "wb") as buffer:
-                buffer.write(file_content)
-            supabase_path = None
+            # Local storage - write straight to the user's upload directory
+            staged_path = os.path.join(f"uploads/user_{user_id}", filename)
+        file_size, content_hash = await spool_upload(file, staged_path)
         
-        file_type = "pdf" if file.filename.endswith(".pdf") else "txt" if file.filename.endswith(".txt") else "docx" if file.filename.endswith(".docx") else "unknown"
+        return await register_vault_upload(user_id, filename, staged_path, file_size, content_hash, db)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error uploading file: {str(e)}")
+
+def store_vault_upload(user_id: int, filename: str, staged_path: str, file_size: int,
+                       content_hash: str, db: Optional[Session] = None) -> dict:
+    """
+    Put an upload that has been written to disk into storage and create its document record.
+    
+    Args:
+        user_id: Owner of the file
+        filename: Original filename
+        staged_path: Local file with the upload (final location without Supabase,
+            a spooled copy that is removed after ingestion with Supabase)
+        file_size: Size in bytes
+        content_hash: SHA-256 of the content (for deduplication)
+        db: SQLAlchemy session (None with Supabase)
         
+    Returns:
+        Document info dict (id, filename, filepath, file_type, supabase_path, file_size,
+        spool_path - the local copy to parse and remove, None without Supabase)
+    """
+    use_supabase = bool(os.getenv("SUPABASE_URL") and os.getenv("SUPABASE_KEY"))
+    file_type = "pdf" if filename.endswith(".pdf") else "txt" if filename.endswith(".txt") else "docx" if filename.endswith(".docx") else "unknown"
+    
+    try:
         if use_supabase:
-            # Use original filename for display (user sees original name, not timestamped version)
-            filename_for_db = display_filename if 'display_filename' in locals() else file.filename
-            db_document = create_document(user_id, filename_for_db, file_path, file_type, file_size, supabase_path, False)
+            # Upload to Supabase Storage (streamed from the spooled file)
+            from .supabase_storage import upload_file_to_supabase
+            from .supabase_db import create_document
+            # Storage uses a unique name, the database record keeps the original filename (user sees original name)
+            storage_path = upload_file_to_supabase(user_id, staged_path, filename)
+            file_path = storage_path  # Store storage path
+            supabase_path = storage_path
+            db_document = create_document(user_id, filename, file_path, file_type, file_size, supabase_path, False, content_hash)
             document_id = db_document["id"] if db_document else None
-            # Store for later use in vectorstore rebuild
-            new_file_info = {
-                "id": document_id,
-                "filename": filename_for_db,
-                "filepath": file_path,
-                "file_type": file_type,
-                "supabase_path": supabase_path,
-                "processed": False
-            }
         else:
+            file_path = staged_path
+            supabase_path = None
             db_document = Document(
                 user_id=user_id, 
-                filename=file.filename, 
+                filename=filename, 
                 filepath=file_path, 
                 file_type=file_type, 
                 file_size=file_size, 
                 processed=False,
-                supabase_path=supabase_path
+                supabase_path=supabase_path,
+                content_hash=content_hash
             )
             db.add(db_document)
             db.commit()
             db.refresh(db_document)
             document_id = db_document.id
+    except Exception:
+        if use_supabase:
+            remove_spooled_file(staged_path)
+        raise
+    
+    # Store for later use in ingestion and vectorstore rebuilds
+    return {
+        "id": document_id,
+        "filename": filename,
+        "filepath": file_path,
+        "file_type": file_type,
+        "supabase_path": supabase_path,
+        "processed": False,
+        "file_size": file_size,
+        # With Supabase the spooled copy is parsed (no download) and removed afterwards
+        "spool_path": staged_path if use_supabase else None
+    }
+
+def find_duplicate_document(user_id: int, content_hash: str, db: Optional[Session] = None) -> Optional[int]:
+    """
+    Id of an already processed document of the user with byte-identical content.
+    
+    Looked up before the upload is stored, so a failing lookup leaves nothing behind.
+    
+    Args:
+        user_id: Owner of the file
+        content_hash: SHA-256 of the content
+        db: SQLAlchemy session (None with Supabase)
+        
+    Returns:
+        Document id, or None if the content is new
+    """
+    from .db_helper import get_document_by_hash
+    duplicate = get_document_by_hash(user_id, content_hash, db)
+    if not duplicate:
+        return None
+    return duplicate.get("id") if isinstance(duplicate, dict) else getattr(duplicate, 'id', None)
+
+def reuse_duplicate_upload(user_id: int, document: dict, duplicate_id: int, db: Optional[Session] = None) -> Optional[dict]:
+    """
+    Index a byte-identical re-upload by copying the chunks and vectors of the existing document.
+    
+    The caller removes the spooled copy once this returns a response (the
+    stored file is not parsed again).
+    
+    Args:
+        user_id: Owner of the file
+        document: Document info dict from store_vault_upload()
+        duplicate_id: Processed document with the same content (from find_duplicate_document())
+        db: SQLAlchemy session (None with Supabase)
+        
+    Returns:
+        Upload response if the document is now processed, else None (ingest it normally)
+    """
+    from .db_helper import set_document_processed
+    document_id = document["id"]
+    filename = document["filename"]
+    if duplicate_id == document_id:
+        return None
+    
+    from .vectorstore import copy_document_vectors, load_vectorstore
+    vectorstore = USER_VECTORSTORES.get(user_id) or load_vectorstore(user_id)
+    if vectorstore is None or copy_document_vectors(user_id, duplicate_id, document_id, filename, vectorstore) is None:
+        return None
+    
+    from .db_helper import copy_document_content
+    try:
+        copy_document_content(duplicate_id, document_id, filename, db)
+    except Exception as e:
+        print(f"Could not copy chunk store content of document {duplicate_id}: {e}")
+    set_document_processed(document_id, user_id, True, db)
+    USER_VECTORSTORES[user_id] = vectorstore
+    if user_id not in USER_QA_CHAINS:
+        USER_QA_CHAINS[user_id] = get_qa_chain(vectorstore, user_id)
+    print(f"Reused vectors of document {duplicate_id} for duplicate upload {filename}")
+    return {
+        "message": "File uploaded to vault successfully",
+        "document_id": document_id,
+        "filename": filename,
+        "file_size": document["file_size"],
+        "processed": True,
+        "duplicate_of": duplicate_id
+    }
+
+async def register_vault_upload(user_id: int, filename: str, staged_path: str, file_size: int,
+                                content_hash: str, db: Optional[Session] = None) -> dict:
+    """
+    Store an upload that has been written to disk and queue it for ingestion.
+    
+    Args:
+        user_id: Owner of the file
+        filename: Original filename
+        staged_path: Local file with the upload (see store_vault_upload)
+        file_size: Size in bytes
+        content_hash: SHA-256 of the content (for deduplication)
+        db: SQLAlchemy session (None with Supabase)
+        
+    Returns:
+        Upload response (document_id, processed, job_id or duplicate_of, ...)
+    """
+    # With Supabase the staged file is a spooled copy - removed here unless the ingestion job takes it
+    use_supabase = bool(os.getenv("SUPABASE_URL") and os.getenv("SUPABASE_KEY"))
+    spool_path = staged_path if use_supabase else None
+    try:
+        # Look for a byte-identical file first - nothing is stored yet if the lookup fails
+        duplicate_id = find_duplicate_document(user_id, content_hash, db)
+        new_file_info = store_vault_upload(user_id, filename, staged_path, file_size, content_hash, db)
+        
+        # Already indexed for this user - reuse its chunks and vectors
+        if duplicate_id is not None:
+            duplicate_response = reuse_duplicate_upload(user_id, new_file_info, duplicate_id, db)
+            if duplicate_response:
+                return duplicate_response
+        
+        # Hand parsing, chunking, embedding and upserting to the background ingestion worker
+        job = create_job(user_id, new_file_info["id"], filename)
+        await submit_job(job, lambda job: process_vault_document(job, user_id, new_file_info, new_file_info["spool_path"]))
+        # The ingestion job removes the spooled copy once it is parsed
+        spool_path = None
+    finally:
+        if spool_path:
+            remove_spooled_file(spool_path)
+    return {
+        "message": "File uploaded to vault successfully",
+        "document_id": new_file_info["id"],
+        "filename": filename,
+        "file_size": file_size,
+        "processed": False,
+        "job_id": job["id"],
+        "status": job["status"]
+    }
+
+@app.post("/vault/upload-batch")
+async def upload_batch_to_vault(files: List[UploadFile] = File(...), current_user = Depends(get_current_user), db: Optional[Session] = Depends(get_db)):
+    """
+    Upload many files to the user's vault at once.
+    
+    All new files are ingested by a single background job: parsed in parallel,
+    embedded together and written to the collection in one pass. Each file
+    gets the same response as /vault/upload, all sharing the batch job_id.
+    """
+    from .db_helper import get_user_id
+    user_id = get_user_id(current_user)
+    use_supabase = bool(os.getenv("SUPABASE_URL") and os.getenv("SUPABASE_KEY"))
+    
+    results = []
+    new_documents = []
+    for file in files:
+        # Client-supplied name - drop any directory part, same as /vault/upload
+        filename = os.path.basename(file.filename)
         try:
-            # For processing, we need the file content
-            if use_supabase:
-                # Use file_content directly for processing
-                import tempfile
-                with tempfile.NamedTemporaryFile(delete=False, suffix=f".{file_type}") as tmp_file:
-                    tmp_file.write(file_content)
-                    tmp_file_path = tmp_file.name
-                # Pass original filename for proper metadata
-                docs = load_file(tmp_file_path, original_filename=file.filename)
-                os.unlink(tmp_file_path)  # Clean up temp file
-            else:
-                docs = load_file(file_path, original_filename=file.filename)
-            if not docs or len(docs) == 0:
-                raise Exception("No content extracted from file")
-            
-            # Always rebuild vectorstore completely to ensure correct metadata and consistency
-            # This ensures deleted files are removed and new files have correct metadata
-            from .vectorstore import delete_vectorstore, create_vectorstore, save_vectorstore
-            from .file_loader_helper import load_document_content
-            from .db_helper import get_user_documents
-            
-            # Get ALL documents for user (both processed and new one)
-            # We need to include the new file even though it's not marked processed yet
-            all_user_docs = get_user_documents(user_id, db)
-            
-            # Filter to get only documents that can be loaded (have supabase_path or filepath)
-            all_docs_to_process = []
-            for doc in all_user_docs:
-                if isinstance(doc, dict):
-                    has_path = doc.get("supabase_path") or doc.get("filepath")
-                else:
-                    has_path = getattr(doc, 'supabase_path', None) or getattr(doc, 'filepath', None)
-                if has_path:
-                    all_docs_to_process.append(doc)
-            
-            # Also add the newly uploaded file explicitly (in case it's not in the list yet)
-            if use_supabase:
-                new_doc = {
-                    "id": document_id,
-                    "filename": filename_for_db,
-                    "filepath": file_path,
-                    "file_type": file_type,
-                    "supabase_path": supabase_path,
-                    "processed": False
-                }
-                # Check if new file is already in the list
-                new_file_in_list = any(
-                    (isinstance(d, dict) and d.get("id") == document_id) or 
-                    (not isinstance(d, dict) and getattr(d, 'id', None) == document_id)
-                    for d in all_docs_to_process
-                )
-                if not new_file_in_list:
-                    all_docs_to_process.append(new_doc)
-            else:
-                if db_document not in all_docs_to_process:
-                    all_docs_to_process.append(db_document)
-            
-            # Load all documents with correct metadata
-            all_docs = []
-            for doc in all_docs_to_process:
-                try:
-                    filename = doc.get("filename") if isinstance(doc, dict) else getattr(doc, 'filename', 'unknown')
-                    print(f"Loading document for vectorstore: {filename}")
-                    loaded_docs = load_document_content(doc)
-                    all_docs.extend(loaded_docs)
-                    print(f"Successfully loaded {len(loaded_docs)} chunks from {filename}")
-                except Exception as e:
-                    filename = doc.get("filename") if isinstance(doc, dict) else getattr(doc, 'filename', 'unknown')
-                    print(f"Error loading document {filename} during rebuild: {e}")
-                    import traceback
-                    traceback.print_exc()
-            
-            # Delete old vectorstore and create fresh one
-            if user_id in USER_VECTORSTORES:
-                del USER_VECTORSTORES[user_id]
-                del USER_QA_CHAINS[user_id]
-            delete_vectorstore(user_id)
-            
-            # Create fresh vectorstore with all documents (including new one)
-            if all_docs:
-                print(f"Creating vectorstore with {len(all_docs)} total chunks from {len(all_docs_to_process)} documents")
-                USER_VECTORSTORES[user_id] = create_vectorstore(all_docs, user_id)
-                USER_QA_CHAINS[user_id] = get_qa_chain(USER_VECTORSTORES[user_id])
-                save_vectorstore(USER_VECTORSTORES[user_id], user_id)
-                print(f"Successfully rebuilt vectorstore for user {user_id} with {len(all_docs_to_process)} documents ({len(all_docs)} chunks)")
-            else:
-                print(f"Warning: No documents loaded for vectorstore after upload. Tried to load {len(all_docs_to_process)} documents.")
+            # Stream each upload to disk in chunks, same as /vault/upload
+            staged_path = spool_path_for(filename) if use_supabase else os.path.join(f"uploads/user_{user_id}", filename)
+            file_size, content_hash = await spool_upload(file, staged_path)
+            spool_path = staged_path if use_supabase else None
+            try:
+                # Look for a byte-identical file first, same as /vault/upload
+                duplicate_id = find_duplicate_document(user_id, content_hash, db)
+                document = store_vault_upload(user_id, filename, staged_path, file_size, content_hash, db)
+                
+                # Already indexed for this user - reuse its chunks and vectors
+                duplicate_response = reuse_duplicate_upload(user_id, document, duplicate_id, db) if duplicate_id is not None else None
+                if not duplicate_response:
+                    # The batch ingestion job removes the spooled copy once it is parsed
+                    new_documents.append(document)
+                    spool_path = None
+            finally:
+                if spool_path:
+                    remove_spooled_file(spool_path)
+            if duplicate_response:
+                results.append(duplicate_response)
+                continue
+            results.append({
+                "message": "File uploaded to vault successfully",
+                "document_id": document["id"],
+                "filename": filename,
+                "file_size": file_size,
+                "processed": False
+            })
+        except Exception as e:
+            print(f"Error uploading {filename} in batch: {e}")
+            results.append({
+                "message": f"Error uploading file: {str(e)}",
+                "filename": filename,
+                "processed": False,
+                "error": str(e)
+            })
+    
+    job = None
+    if new_documents:
+        # One ingestion job for the whole batch - the collection is written once
+        job = create_job(user_id, None, f"{len(new_documents)} files")
+        job["document_ids"] = [document["id"] for document in new_documents]
+        await submit_job(job, lambda job: process_vault_batch(job, user_id, new_documents))
+        for result in results:
+            if result.get("document_id") in job["document_ids"]:
+                result["job_id"] = job["id"]
+                result["status"] = job["status"]
+    
+    return {
+        "message": f"Uploaded {sum(1 for result in results if 'error' not in result)} of {len(files)} files",
+        "job_id": job["id"] if job else None,
+        "files": results
+    }
+
+def process_vault_batch(job: dict, user_id: int, documents: List[dict]):
+    """
+    Ingest several uploaded vault documents together (runs in a background worker thread).
+    
+    Args:
+        job: Ingestion job record used for progress reporting
+        user_id: Owner of the documents
+        documents: Document info dicts from store_vault_upload()
+    """
+    from functools import partial
+    from .database import SessionLocal
+    from .db_helper import get_processed_documents, set_document_processed, delete_document_content
+    from .file_loader_helper import load_documents_parallel
+    from .vectorstore import index_chunks, load_vectorstore, create_vectorstore, save_vectorstore, delete_document_vectors
+    
+    progress = partial(report_progress, job)
+    document_ids = [document["id"] for document in documents]
+    indexed_ids = set()
+    # The request's session is closed by now - use a dedicated one (None with Supabase)
+    db = SessionLocal() if SessionLocal is not None else None
+    try:
+        # Parse spooled copies directly instead of downloading them back from storage
+        skip_stage(job, "download")
+        parse_infos = [
+            {**document, "filepath": document["spool_path"], "supabase_path": None} if document.get("spool_path") else document
+            for document in documents
+        ]
+        progress("parse", 0, len(documents))
+        chunks, successful_files, failed_files = load_documents_parallel(parse_infos, db=db)
+        progress("parse", len(documents), len(documents))
+        progress("chunk", len(chunks), len(chunks))
+        update_job(job, failed_files=failed_files)
+        if not chunks:
+            raise Exception("No content extracted from any file")
+        
+        indexed_ids = {chunk.metadata.get('document_id') for chunk in chunks}
+        vectorstore = USER_VECTORSTORES.get(user_id) or load_vectorstore(user_id)
+        previous_docs = get_processed_documents(user_id, db) if vectorstore is None else []
+        previous_docs = [
+            doc for doc in previous_docs
+            if (doc.get("id") if isinstance(doc, dict) else getattr(doc, 'id', None)) not in document_ids
+        ]
+        
+        if vectorstore is not None or not previous_docs:
+            # Embed all new chunks in large batches and upsert them in one pass
+            USER_VECTORSTORES[user_id] = index_chunks(chunks, user_id, vectorstore, progress)
+        else:
+            # No collection to extend (e.g. in-memory Qdrant after a restart) - rebuild from all documents
+            previous_chunks, _, _ = load_documents_parallel(previous_docs, db=db)
+            USER_VECTORSTORES[user_id] = create_vectorstore(chunks + previous_chunks, user_id)
+        USER_QA_CHAINS[user_id] = get_qa_chain(USER_VECTORSTORES[user_id], user_id)
+        save_vectorstore(USER_VECTORSTORES[user_id], user_id)
+        
+        for document_id in document_ids:
+            set_document_processed(document_id, user_id, document_id in indexed_ids, db)
+        print(f"Batch-indexed {len(indexed_ids)} of {len(documents)} documents ({len(chunks)} chunks) for user {user_id}")
+    except Exception as e:
+        print(f"Error processing upload batch: {e}")
+        for document_id in document_ids:
+            set_document_processed(document_id, user_id, False, db)
+            delete_document_content(document_id, db)
+        # Chunks already upserted would otherwise keep answering chat (and be duplicated on retry)
+        for document_id in indexed_ids:
+            try:
+                delete_document_vectors(user_id, document_id, USER_VECTORSTORES.get(user_id))
+            except Exception as cleanup_error:
+                print(f"Could not remove vectors of failed document {document_id}: {cleanup_error}")
+        raise
+    finally:
+        for document in documents:
+            if document.get("spool_path"):
+                remove_spooled_file(document["spool_path"])
+        if db is not None:
+            db.close()
+
+# Serialises completion of each resumable upload so ingestion is triggered once
+_upload_completion_locks = {}
+
+def _get_resumable_upload_for_user(upload_id: str, user_id: int) -> dict:
+    """Manifest of a resumable upload owned by the user, or 404."""
+    manifest = get_resumable_upload(upload_id)
+    if not manifest or manifest["user_id"] != user_id:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return manifest
+
+def _resumable_upload_status(manifest: dict) -> dict:
+    """Upload manifest plus the parts received and still missing."""
+    parts = list_upload_parts(manifest["upload_id"]) if manifest["status"] != "completed" else []
+    return {
+        **manifest,
+        "uploaded_parts": parts,
+        "uploaded_bytes": sum(part["size"] for part in parts),
+        "missing_parts": missing_upload_parts(manifest, parts) if manifest["status"] != "completed" else []
+    }
+
+@app.post("/vault/uploads")
+async def initiate_resumable_upload(request: ResumableUploadRequest, current_user = Depends(get_current_user)):
+    """Start a resumable upload; send the file as numbered parts, then complete it."""
+    from .db_helper import get_user_id
+    user_id = get_user_id(current_user)
+    try:
+        # Also removes stale uploads from disk - keep that off the event loop
+        manifest = await asyncio.to_thread(create_resumable_upload, user_id, os.path.basename(request.filename), request.file_size, request.part_size)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return _resumable_upload_status(manifest)
+
+@app.get("/vault/uploads/{upload_id}")
+async def get_resumable_upload_status(upload_id: str, current_user = Depends(get_current_user)):
+    """Parts received so far, so an interrupted client only re-sends the missing ones."""
+    from .db_helper import get_user_id
+    manifest = _get_resumable_upload_for_user(upload_id, get_user_id(current_user))
+    return _resumable_upload_status(manifest)
+
+@app.put("/vault/uploads/{upload_id}/parts/{part_number}")
+async def upload_resumable_part(upload_id: str, part_number: int, request: Request, current_user = Depends(get_current_user)):
+    """Store one part (raw request body). Re-sending a part replaces it."""
+    from .db_helper import get_user_id
+    manifest = _get_resumable_upload_for_user(upload_id, get_user_id(current_user))
+    if manifest["status"] == "completed":
+        raise HTTPException(status_code=409, detail="Upload already completed")
+    if not 1 <= part_number <= max_part_number(manifest):
+        raise HTTPException(status_code=400, detail=f"Part number must be between 1 and {max_part_number(manifest)}")
+    try:
+        return await save_upload_part(upload_id, part_number, request.stream(), manifest["part_size"])
+    except UploadTooLarge:
+        raise HTTPException(status_code=413, detail=f"Parts are limited to {manifest['part_size']} bytes")
+
+@app.post("/vault/uploads/{upload_id}/complete")
+async def complete_resumable_upload(upload_id: str, current_user = Depends(get_current_user), db: Optional[Session] = Depends(get_db)):
+    """
+    Assemble the parts and hand the file to the vault like a normal upload.
+    
+    Completing an upload again returns the original result without ingesting twice.
+    """
+    from .db_helper import get_user_id
+    user_id = get_user_id(current_user)
+    _get_resumable_upload_for_user(upload_id, user_id)
+    
+    lock = _upload_completion_locks.setdefault(upload_id, asyncio.Lock())
+    async with lock:
+        manifest = _get_resumable_upload_for_user(upload_id, user_id)
+        if manifest["status"] == "completed":
+            return manifest["result"]
+        
+        parts = list_upload_parts(upload_id)
+        missing = missing_upload_parts(manifest, parts)
+        if not parts or missing:
+            raise HTTPException(status_code=400, detail={"message": "Upload is missing parts", "missing_parts": missing or [1]})
+        
+        try:
+            use_supabase = bool(os.getenv("SUPABASE_URL") and os.getenv("SUPABASE_KEY"))
+            filename = manifest["filename"]
+            staged_path = spool_path_for(filename) if use_supabase else os.path.join(f"uploads/user_{user_id}", filename)
+            file_size, content_hash = await asyncio.to_thread(assemble_upload, upload_id, staged_path)
+            if manifest.get("file_size") and file_size != manifest["file_size"]:
+                remove_spooled_file(staged_path)
+                raise HTTPException(status_code=400, detail=f"Upload size {file_size} does not match the announced {manifest['file_size']} bytes")
             
-            # Update document as processed
-            if use_supabase:
-                from .supabase_db import update_document
-                update_document(document_id, user_id, processed=True)
-            else:
-                db_document.processed = True
-                db.commit()
-            print(f"Successfully processed document {file.filename} for user {user_id}")
+            result = await register_vault_upload(user_id, filename, staged_path, file_size, content_hash, db)
+        except HTTPException:
+            raise
         except Exception as e:
-            print(f"Error processing document: {e}")
-            if use_supabase:
-                from .supabase_db import update_document
-                if document_id:
-                    update_document(document_id, user_id, processed=False)
-            else:
-                db_document.processed = False
-                db.commit()
-            # Don't raise error, just mark as not processed
-        processed = True if use_supabase else db_document.processed
-        return {"message": "File uploaded to vault successfully", "document_id": document_id, "filename": file.filename, "file_size": file_size, "processed": processed}
+            raise HTTPException(status_code=500, detail=f"Error completing upload: {str(e)}")
+        
+        manifest["status"] = "completed"
+        manifest["result"] = result
+        await asyncio.to_thread(save_manifest, manifest)
+        await asyncio.to_thread(remove_upload_parts, upload_id)
+    _upload_completion_locks.pop(upload_id, None)
+    return result
+
+def process_vault_document(job: dict, user_id: int, document: dict, spool_path: Optional[str] = None):
+    """
+    Ingest one uploaded vault document (runs in a background worker thread).
+    
+    Args:
+        job: Ingestion job record used for progress reporting
+        user_id: Owner of the document
+        document: Document info dict (id, filename, filepath, file_type, supabase_path)
+        spool_path: Spooled local copy of the upload (removed when done), otherwise
+            the file is read from its local path or downloaded from storage
+    """
+    from functools import partial
+    from .database import SessionLocal
+    from .chunking import chunk_documents
+    from .db_helper import get_processed_documents, set_document_processed, save_document_content, delete_document_content
+    from .file_loader_helper import load_documents_parallel
+    from .vectorstore import index_document, load_vectorstore, create_vectorstore, save_vectorstore, delete_document_vectors
+    
+    document_id = document["id"]
+    filename = document["filename"]
+    progress = partial(report_progress, job)
+    # The request's session is closed by now - use a dedicated one (None with Supabase)
+    db = SessionLocal() if SessionLocal is not None else None
+    stream = None
+    stored_pages = 0
+    store_failed = False
+    
+    def store_batch(pages, chunks):
+        # Keep extracted text and chunks so rebuilds and keyword search don't re-parse the file
+        nonlocal stored_pages, store_failed
+        if store_failed:
+            return
+        try:
+            save_document_content(document_id, pages, chunks, stored_pages, db)
+            stored_pages += len(pages)
+        except Exception as e:
+            # Not fatal - the document is indexed either way, rebuilds just parse it again
+            print(f"Could not save {filename} to chunk store: {e}")
+            store_failed = True
+            if db is not None:
+                db.rollback()
+            delete_document_content(document_id, db)
+    
+    try:
+        # Drop content stored by an earlier attempt at this document
+        delete_document_content(document_id, db)
+        
+        # Download the file from storage only if there is no local copy
+        if spool_path is None and document.get("supabase_path"):
+            from .supabase_storage import download_file_from_supabase
+            progress("download", 0, 1)
+            source = download_file_from_supabase(document["supabase_path"])
+            progress("download", 1, 1)
+        else:
+            skip_stage(job, "download")
+            # The loader reads the spooled upload through a file handle, the local file by path
+            stream = open(spool_path, "rb") if spool_path else None
+            source = stream or document["filepath"]
+        
+        # Pages are parsed lazily and indexed in bounded batches
+        # Pass original filename for proper metadata
+        docs = iter_file(source, original_filename=filename, file_type=document["file_type"])
+        
+        # Index only the new document into the user's existing collection
+        vectorstore = USER_VECTORSTORES.get(user_id) or load_vectorstore(user_id)
+        previous_docs = get_processed_documents(user_id, db) if vectorstore is None else []
+        previous_docs = [
+            doc for doc in previous_docs
+            if (doc.get("id") if isinstance(doc, dict) else getattr(doc, 'id', None)) != document_id
+        ]
+        
+        if vectorstore is not None or not previous_docs:
+            # Incremental path: embed and upsert only the new document's chunks
+            USER_VECTORSTORES[user_id] = index_document(docs, user_id, document_id, vectorstore, progress, store_batch)
+            USER_QA_CHAINS[user_id] = get_qa_chain(USER_VECTORSTORES[user_id], user_id)
+            print(f"Incrementally indexed {filename} for user {user_id}")
+        else:
+            # No collection to extend (e.g. in-memory Qdrant after a restart) - rebuild from all documents
+            docs = list(docs)
+            if not docs:
+                raise Exception("No content extracted from file")
+            for doc in docs:
+                doc.metadata['document_id'] = document_id
+            chunks = chunk_documents(docs)
+            store_batch(docs, chunks)
+            previous_chunks, _, _ = load_documents_parallel(previous_docs, db=db)
+            all_docs = chunks + previous_chunks
+            
+            print(f"Creating vectorstore with {len(all_docs)} total chunks from {len(previous_docs) + 1} documents")
+            USER_VECTORSTORES[user_id] = create_vectorstore(all_docs, user_id)
+            USER_QA_CHAINS[user_id] = get_qa_chain(USER_VECTORSTORES[user_id], user_id)
+            print(f"Successfully rebuilt vectorstore for user {user_id} with {len(previous_docs) + 1} documents ({len(all_docs)} chunks)")
+        save_vectorstore(USER_VECTORSTORES[user_id], user_id)
+        
+        # Update document as processed
+        set_document_processed(document_id, user_id, True, db)
+        print(f"Successfully processed document {filename} for user {user_id}")
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error uploading file: {str(e)}")
+        print(f"Error processing document: {e}")
+        if document_id:
+            set_document_processed(document_id, user_id, False, db)
+            delete_document_content(document_id, db)
+            # Batches upserted before the failure would otherwise keep answering chat (and be duplicated on retry)
+            try:
+                delete_document_vectors(user_id, document_id, USER_VECTORSTORES.get(user_id))
+            except Exception as cleanup_error:
+                print(f"Could not remove vectors of failed document {document_id}: {cleanup_error}")
+        raise
+    finally:
+        if stream is not None:
+            stream.close()
+        if spool_path:
+            remove_spooled_file(spool_path)
+        if db is not None:
+            db.close()
+
+@app.get("/vault/jobs/{job_id}")
+async def get_vault_job(job_id: str, current_user = Depends(get_current_user)):
+    """Get status and per-stage progress of a background ingestion job."""
+    from .db_helper import get_user_id
+    user_id = get_user_id(current_user)
+    job = get_job(job_id)
+    
+    if not job or job["user_id"] != user_id:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    return job
+
+@app.get("/vault/files/{file_id}/chunks/{chunk_index}")
+async def get_vault_chunk(file_id: int, chunk_index: int, current_user = Depends(get_current_user), db: Optional[Session] = Depends(get_db)):
+    """Get the full text behind a citation (document_id + chunk_index) from the chunk store."""
+    from .db_helper import get_user_id, get_document_by_id, get_stored_chunk
+    user_id = get_user_id(current_user)
+    if not get_document_by_id(file_id, user_id, db):
+        raise HTTPException(status_code=404, detail="File not found")
+    
+    chunk = get_stored_chunk(file_id, chunk_index, db)
+    if chunk is None:
+        raise HTTPException(status_code=404, detail="Chunk not found")
+    
+    return {
+        "document_id": file_id,
+        "chunk_index": chunk_index,
+        "source": chunk.metadata.get("source"),
+        "page": chunk.metadata.get("page"),
+        "start_index": chunk.metadata.get("start_index"),
+        "end_index": chunk.metadata.get("end_index"),
+        "content": chunk.page_content
+    }
 
 @app.get("/vault/files")
 async def get_vault_files(current_user = Depends(get_current_user), db: Optional[Session] = Depends(get_db)):
@@ -490,6 +942,10 @@ async def delete_vault_file(file_id: int, current_user = Depends(get_current_use
         # Fallback to local file deletion
         os.remove(filepath)
     
+    # Delete stored pages and chunks, then the document itself
+    from .db_helper import delete_document_content
+    delete_document_content(file_id, db)
+    
     # Delete from database
     if use_supabase:
         from .supabase_db import delete_document
@@ -499,33 +955,41 @@ async def delete_vault_file(file_id: int, current_user = Depends(get_current_use
             db.delete(document)
             db.commit()
     
-    # Always rebuild vectorstore after deletion to ensure old chunks are removed
-    # Delete existing vectorstore first to remove all old data
+    # Remove only this document's chunks from the user's collection
+    from .vectorstore import delete_document_vectors, load_vectorstore, delete_vectorstore, create_vectorstore, save_vectorstore
+    vectorstore = USER_VECTORSTORES.get(user_id) or load_vectorstore(user_id)
+    deleted = delete_document_vectors(user_id, file_id, vectorstore) if vectorstore is not None else None
+    if deleted is not None:
+        if get_processed_documents(user_id, db):
+            USER_VECTORSTORES[user_id] = vectorstore
+            if user_id not in USER_QA_CHAINS:
+                USER_QA_CHAINS[user_id] = get_qa_chain(vectorstore, user_id)
+        else:
+            # Last document removed - drop the empty collection so chat falls back to generation
+            USER_VECTORSTORES.pop(user_id, None)
+            USER_QA_CHAINS.pop(user_id, None)
+            delete_vectorstore(user_id)
+            print(f"No remaining documents for user {user_id}, vectorstore deleted")
+        return {"message": "File deleted successfully"}
+    
+    # Targeted delete not possible - rebuild vectorstore from the remaining documents
     if user_id in USER_VECTORSTORES:
         del USER_VECTORSTORES[user_id]
         del USER_QA_CHAINS[user_id]
     
     # Delete collection from Qdrant to remove all old chunks
-    from .vectorstore import delete_vectorstore, create_vectorstore, save_vectorstore
     delete_vectorstore(user_id)
     
     # Rebuild vectorstore with only remaining documents
     remaining_docs = get_processed_documents(user_id, db)
     if remaining_docs:
-        all_docs = []
-        for doc in remaining_docs:
-            try:
-                from .file_loader_helper import load_document_content
-                docs = load_document_content(doc)
-                all_docs.extend(docs)
-            except Exception as e:
-                filename = doc.get("filename") if isinstance(doc, dict) else getattr(doc, 'filename', 'unknown')
-                print(f"Error loading document {filename} during rebuild: {e}")
+        from .file_loader_helper import load_documents_parallel
+        all_docs, _, _ = load_documents_parallel(remaining_docs, db=db)
         
         if all_docs:
             # Create fresh vectorstore with only remaining documents
             USER_VECTORSTORES[user_id] = create_vectorstore(all_docs, user_id)
-            USER_QA_CHAINS[user_id] = get_qa_chain(USER_VECTORSTORES[user_id])
+            USER_QA_CHAINS[user_id] = get_qa_chain(USER_VECTORSTORES[user_id], user_id)
             # Save to Qdrant Cloud
             save_vectorstore(USER_VECTORSTORES[user_id], user_id)
             print(f"Rebuilt vectorstore for user {user_id} with {len(remaining_docs)} documents")
@@ -535,86 +999,163 @@ async def delete_vault_file(file_id: int, current_user = Depends(get_current_use
         print(f"No remaining documents for user {user_id}, vectorstore deleted")
     return {"message": "File deleted successfully"}
 
+def rebuild_user_vectorstore(user_id: int, db: Optional[Session] = None, emit=None) -> dict:
+    """
+    Rebuild a user's vectorstore from all of their processed documents.
+    
+    Args:
+        user_id: Owner of the vault
+        db: SQLAlchemy session (None with Supabase)
+        emit: Optional callback emit(event) receiving progress event dicts as
+            documents are loaded and chunks are embedded and upserted
+        
+    Returns:
+        Summary of the rebuild (the /vault/rebuild-vectorstore response)
+    """
+    import time
+    from .db_helper import get_processed_documents
+    from .vectorstore import delete_vectorstore, index_chunks, save_vectorstore, get_embedding_cache_stats
+    from .file_loader_helper import load_documents_parallel
+    from .rag import get_qa_chain
+    
+    started = time.perf_counter()
+    stage_finished = {}
+    
+    def send(event, **data):
+        if emit:
+            emit({"event": event, **data, "elapsed": round(time.perf_counter() - started, 3), "done": False})
+    
+    # Delete existing vectorstore from Qdrant
+    try:
+        delete_vectorstore(user_id)
+        print(f"Deleted existing vectorstore for user {user_id}")
+    except Exception as e:
+        print(f"Note: Could not delete vectorstore (might not exist): {e}")
+    
+    # Get all processed documents for user
+    user_docs = get_processed_documents(user_id, db)
+    
+    if not user_docs:
+        return {"message": "No documents found to rebuild vectorstore", "documents_count": 0}
+    send("start", documents=len(user_docs))
+    
+    loaded = 0
+    def on_document(filename, chunks, error, from_store):
+        nonlocal loaded
+        loaded += 1
+        send("document", filename=filename, chunks=chunks, error=error,
+             source="chunk_store" if from_store else "parsed", completed=loaded, total=len(user_docs))
+    
+    # Rebuild vectorstore from the chunk store, parsing documents that are not in it in parallel
+    all_docs, successful_files, failed_files = load_documents_parallel(user_docs, db=db, on_document=on_document)
+    stage_finished["load"] = time.perf_counter()
+    send("stage", stage="chunk", completed=len(all_docs), total=len(all_docs))
+    
+    if not all_docs:
+        return {
+            "message": "No documents could be loaded",
+            "documents_processed": 0,
+            "documents_failed": len(failed_files),
+            "failed_files": failed_files
+        }
+    
+    def progress(stage, done, total):
+        stage_finished[stage] = time.perf_counter()
+        send("stage", stage=stage, completed=done, total=total)
+    
+    # Create new vectorstore with correct metadata
+    USER_VECTORSTORES[user_id] = index_chunks(all_docs, user_id, None, progress)
+    USER_QA_CHAINS[user_id] = get_qa_chain(USER_VECTORSTORES[user_id], user_id)
+    
+    # Save to Qdrant Cloud
+    save_vectorstore(USER_VECTORSTORES[user_id], user_id)
+    finished = time.perf_counter()
+    
+    # Seconds spent per stage (embedding starts when loading ends, upserting when embedding ends)
+    embed_finished = stage_finished.get("embed", stage_finished["load"])
+    timings = {
+        "load": round(stage_finished["load"] - started, 3),
+        "embed": round(embed_finished - stage_finished["load"], 3),
+        "upsert": round(stage_finished.get("upsert", embed_finished) - embed_finished, 3),
+        "total": round(finished - started, 3)
+    }
+    
+    return {
+        "message": "Vectorstore rebuilt successfully",
+        "documents_processed": len(successful_files),
+        "documents_failed": len(failed_files),
+        "total_chunks": len(all_docs),
+        "successful_files": successful_files,
+        "failed_files": failed_files,
+        "embedding_cache": get_embedding_cache_stats(),
+        "timings": timings
+    }
+
 @app.post("/vault/rebuild-vectorstore")
 async def rebuild_vectorstore(current_user = Depends(get_current_user), db: Optional[Session] = Depends(get_db)):
     """Rebuild vectorstore for current user with correct metadata."""
     try:
-        from .db_helper import get_user_id, get_processed_documents
-        from .vectorstore import delete_vectorstore, create_vectorstore, save_vectorstore
-        from .file_loader_helper import load_document_content
-        from .rag import get_qa_chain
-        
-        user_id = get_user_id(current_user)
-        
-        # Delete existing vectorstore from Qdrant
-        try:
-            delete_vectorstore(user_id)
-            print(f"Deleted existing vectorstore for user {user_id}")
-        except Exception as e:
-            print(f"Note: Could not delete vectorstore (might not exist): {e}")
-        
-        # Get all processed documents for user
-        user_docs = get_processed_documents(user_id, db)
-        
-        if not user_docs:
-            return {"message": "No documents found to rebuild vectorstore", "documents_count": 0}
-        
-        # Rebuild vectorstore from all documents
-        all_docs = []
-        successful_files = []
-        failed_files = []
-        
-        for doc in user_docs:
-            try:
-                docs = load_document_content(doc)
-                all_docs.extend(docs)
-                filename = doc.get("filename") if isinstance(doc, dict) else getattr(doc, 'filename', 'unknown')
-                successful_files.append(filename)
-            except Exception as e:
-                filename = doc.get("filename") if isinstance(doc, dict) else getattr(doc, 'filename', 'unknown')
-                failed_files.append({"filename": filename, "error": str(e)})
-                print(f"Error loading document {filename}: {e}")
-        
-        if all_docs:
-            # Create new vectorstore with correct metadata
-            USER_VECTORSTORES[user_id] = create_vectorstore(all_docs, user_id)
-            USER_QA_CHAINS[user_id] = get_qa_chain(USER_VECTORSTORES[user_id])
-            
-            # Save to Qdrant Cloud
-            save_vectorstore(USER_VECTORSTORES[user_id], user_id)
-            
-            return {
-                "message": "Vectorstore rebuilt successfully",
-                "documents_processed": len(successful_files),
-                "documents_failed": len(failed_files),
-                "total_chunks": len(all_docs),
-                "successful_files": successful_files,
-                "failed_files": failed_files
-            }
-        else:
-            return {
-                "message": "No documents could be loaded",
-                "documents_processed": 0,
-                "documents_failed": len(failed_files),
-                "failed_files": failed_files
-            }
+        from .db_helper import get_user_id
+        # Parsing and embedding block for seconds - keep them off the event loop
+        return await asyncio.to_thread(rebuild_user_vectorstore, get_user_id(current_user), db)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error rebuilding vectorstore: {str(e)}")
 
+@app.post("/vault/rebuild-vectorstore/stream")
+async def rebuild_vectorstore_stream(current_user = Depends(get_current_user)):
+    """
+    Rebuild vectorstore for current user, streaming progress as server-sent events.
+    
+    Each event is a JSON object (same framing as /chat): "start", one "document"
+    per loaded document, "stage" progress for chunk/embed/upsert, and a final
+    "complete" event with the rebuild summary and "done": true.
+    """
+    from .db_helper import get_user_id
+    user_id = get_user_id(current_user)
+    loop = asyncio.get_running_loop()
+    events = asyncio.Queue()
+    
+    def emit(event):
+        loop.call_soon_threadsafe(events.put_nowait, event)
+    
+    def run_rebuild():
+        from .database import SessionLocal
+        # The request's session is closed once streaming starts - use a dedicated one (None with Supabase)
+        db = SessionLocal() if SessionLocal is not None else None
+        try:
+            emit({"event": "complete", **rebuild_user_vectorstore(user_id, db, emit), "done": True})
+        except Exception as e:
+            print(f"Error rebuilding vectorstore for user {user_id}: {e}")
+            emit({"error": f"Error rebuilding vectorstore: {str(e)}", "done": True})
+        finally:
+            if db is not None:
+                db.close()
+    
+    async def event_stream():
+        rebuild = asyncio.create_task(asyncio.to_thread(run_rebuild))
+        while True:
+            event = await events.get()
+            yield f"data: {json.dumps(event)}\n\n"
+            if event.get("done"):
+                break
+        await rebuild
+    
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "Connection": "keep-alive", "X-Accel-Buffering": "no"})
+
 @app.post("/upload")
 async def upload_file(file: UploadFile = File(...), db: Session = Depends(get_db)):
     global VECTORSTORE, QA_CHAIN, CURRENT_DOCUMENT
-
+    
     try:
         path = f"uploads/{file.filename}"
         with open(path, "wb") as buffer:
             shutil.copyfileobj(file.file, buffer)
-
+        
         # Determine file type
         file_type = "pdf" if file.filename.endswith(".pdf") else \
                    "txt" if file.filename.endswith(".txt") else \
                    "docx" if file.filename.endswith(".docx") else "unknown"
-
+        
         # Save document info to database
         db_document = Document(
             filename=file.filename,
@@ -625,18 +1166,23 @@ async def upload_file(file: UploadFile = File(...), db: Session = Depends(get_db
         db.add(db_document)
         db.commit()
         db.refresh(db_document)
-
+        
         # Process document (legacy endpoint - use user_id 0 for non-user uploads)
         docs = load_file(path)
+        for doc in docs:
+            doc.metadata['document_id'] = db_document.id
+        chunks = chunk_documents(docs)
+        # Keep the extracted text so keyword search doesn't re-parse the file
+        save_document_content(db_document.id, docs, chunks, db=db)
         # Note: Legacy endpoint doesn't have user context, using user_id 0
-        VECTORSTORE = create_vectorstore(docs, 0)
+        VECTORSTORE = create_vectorstore(chunks, 0)
         QA_CHAIN = get_qa_chain(VECTORSTORE)
         CURRENT_DOCUMENT = db_document
-
+        
         # Update document as processed
         db_document.processed = True
         db.commit()
-
+        
         return {
             "message": "File processed successfully",
             "document_id": db_document.id,
@@ -645,14 +1191,19 @@ async def upload_file(file: UploadFile = File(...), db: Session = Depends(get_db
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-async def stream_chain_response(chain, query: str, use_rag: bool = False, user_id: int = None):
-    """Stream response from a LangChain chain - optimized for speed."""
+async def stream_chain_response(chain, query: str, use_rag: bool = False, user_id: int = None, retrieval=None):
+    """
+    Stream response from a LangChain chain - optimized for speed.
+    
+    With a RetrievalContext, the RAG chain and the citations use the chunks
+    retrieved once for the request instead of searching again.
+    """
     full_response = ""
     citations_data = []
     
     try:
         # Use astream() for async streaming with immediate flush
-        async for chunk in chain.astream(query):
+        async for chunk in chain.astream(retrieval if use_rag and retrieval is not None else query):
             if chunk:
                 chunk_str = str(chunk)
                 full_response += chunk_str
@@ -662,15 +1213,20 @@ async def stream_chain_response(chain, query: str, use_rag: bool = False, user_i
         # If RAG mode, get citations after streaming
         if use_rag and user_id and user_id in USER_VECTORSTORES:
             try:
-                user_vectorstore = USER_VECTORSTORES[user_id]
-                source_docs = user_vectorstore.similarity_search(query, k=3)
+                if retrieval is None:
+                    from .rag import RetrievalContext
+                    retrieval = RetrievalContext(USER_VECTORSTORES[user_id], query, user_id)
+                source_docs = retrieval.documents(3)
                 citations = extract_citations(source_docs, None)
                 citations_data = get_citation_references(citations)
             except Exception as e:
                 print(f"Error getting citations: {e}")
                 citations_data = []
         
-        yield f"data: {json.dumps({'chunk': '', 'done': True, 'full_response': full_response, 'citations': citations_data})}\n\n"
+        done_event = {'chunk': '', 'done': True, 'full_response': full_response, 'citations': citations_data}
+        if retrieval is not None and retrieval.stats:
+            done_event['rerank'] = retrieval.stats
+        yield f"data: {json.dumps(done_event)}\n\n"
     except Exception as e:
         error_msg = str(e)
         yield f"data: {json.dumps({'error': error_msg, 'done': True})}\n\n"
@@ -800,7 +1356,7 @@ async def chat(request: ChatRequest, current_user = Depends(get_current_user), d
             if keyword_match:
                 keyword = keyword_match.group(1)
                 # Perform keyword search
-                search_result = search_keyword_in_document(CURRENT_DOCUMENT.filepath, keyword)
+                search_result = search_keyword_in_document(CURRENT_DOCUMENT.filepath, keyword, CURRENT_DOCUMENT.id, db)
                 formatted_response = format_keyword_search_response(search_result, keyword)
                 
                 # Save to chat history
@@ -827,13 +1383,17 @@ async def chat(request: ChatRequest, current_user = Depends(get_current_user), d
         user_id = get_user_id(current_user)
         use_rag = request.use_rag
         has_documents = user_id in USER_VECTORSTORES
+        # Chunks are retrieved once and shared by mode detection, the prompt and the citations
+        retrieval = None
         
         if has_documents:
             # Check if query is about document content
             try:
+                from .rag import RetrievalContext
                 user_vectorstore = USER_VECTORSTORES[user_id]
-                # Quick check: search documents for relevance
-                test_docs = user_vectorstore.similarity_search(request.query, k=2)
+                retrieval = RetrievalContext(user_vectorstore, request.query, user_id)
+                # Quick check: search documents for relevance (keyword search finds exact names)
+                test_docs = retrieval.documents(2)
                 if test_docs and len(test_docs) > 0:
                     # Check if any document content is relevant to the query
                     doc_content = " ".join([doc.page_content[:200] for doc in test_docs]).lower()
@@ -911,25 +1471,18 @@ async def chat(request: ChatRequest, current_user = Depends(get_current_user), d
                     vectorstore = load_vectorstore(user_id)
                     if vectorstore:
                         USER_VECTORSTORES[user_id] = vectorstore
-                        USER_QA_CHAINS[user_id] = get_qa_chain(USER_VECTORSTORES[user_id])
+                        USER_QA_CHAINS[user_id] = get_qa_chain(USER_VECTORSTORES[user_id], user_id)
                         print(f"Loaded vectorstore from disk for user {user_id}")
                     else:
                         # Check if user has processed documents
                         user_docs = get_processed_documents(user_id, db)
                         if user_docs:
                             # Rebuild vectorstore from existing documents
-                            all_docs = []
-                            for doc in user_docs:
-                                try:
-                                    from .file_loader_helper import load_document_content
-                                    docs = load_document_content(doc)
-                                    all_docs.extend(docs)
-                                except Exception as e:
-                                    doc_name = doc.get("filename") if isinstance(doc, dict) else getattr(doc, 'filename', 'unknown')
-                                    print(f"Error loading document {doc_name}: {e}")
+                            from .file_loader_helper import load_documents_parallel
+                            all_docs, _, _ = load_documents_parallel(user_docs, db=db)
                             if all_docs:
                                 USER_VECTORSTORES[user_id] = create_vectorstore(all_docs, user_id)
-                                USER_QA_CHAINS[user_id] = get_qa_chain(USER_VECTORSTORES[user_id])
+                                USER_QA_CHAINS[user_id] = get_qa_chain(USER_VECTORSTORES[user_id], user_id)
                                 # Save to Qdrant Cloud
                                 save_vectorstore(USER_VECTORSTORES[user_id], user_id)
                                 print(f"Rebuilt and saved vectorstore for user {user_id} with {len(user_docs)} documents")
@@ -938,13 +1491,16 @@ async def chat(request: ChatRequest, current_user = Depends(get_current_user), d
                         else:
                             raise HTTPException(status_code=400, detail="Upload files to your vault first to use document-based chat")
                 chain = USER_QA_CHAINS[user_id]
+                if retrieval is None or retrieval.vectorstore is not USER_VECTORSTORES[user_id]:
+                    from .rag import RetrievalContext
+                    retrieval = RetrievalContext(USER_VECTORSTORES[user_id], request.query, user_id)
             else:
                 chain = get_direct_generation_chain()
             
             full_response_collector = []
             async def stream_and_collect():
                 nonlocal full_response_collector
-                async for chunk_data in stream_chain_response(chain, request.query, use_rag, user_id):
+                async for chunk_data in stream_chain_response(chain, request.query, use_rag, user_id, retrieval):
                     data = json.loads(chunk_data[6:])
                     if data.get("chunk"):
                         full_response_collector.append(data["chunk"])
@@ -959,6 +1515,7 @@ async def chat(request: ChatRequest, current_user = Depends(get_current_user), d
         # Non-streaming response (for PDF generation or when stream=False)
         citations = []
         citations_data = []
+        rerank_stats = None
         
         if use_rag:
             # Use RAG (document-based Q&A) with citations - search across all user's files
@@ -970,25 +1527,18 @@ async def chat(request: ChatRequest, current_user = Depends(get_current_user), d
                 vectorstore = load_vectorstore(user_id)
                 if vectorstore:
                     USER_VECTORSTORES[user_id] = vectorstore
-                    USER_QA_CHAINS[user_id] = get_qa_chain(USER_VECTORSTORES[user_id])
+                    USER_QA_CHAINS[user_id] = get_qa_chain(USER_VECTORSTORES[user_id], user_id)
                     print(f"Loaded vectorstore from disk for user {user_id}")
                 else:
                     # Check if user has processed documents
                     user_docs = get_processed_documents(user_id, db)
                     if user_docs:
                         # Rebuild vectorstore from existing documents
-                        all_docs = []
-                        for doc in user_docs:
-                            try:
-                                from .file_loader_helper import load_document_content
-                                docs = load_document_content(doc)
-                                all_docs.extend(docs)
-                            except Exception as e:
-                                doc_name = doc.get("filename") if isinstance(doc, dict) else getattr(doc, 'filename', 'unknown')
-                                print(f"Error loading document {doc_name}: {e}")
+                        from .file_loader_helper import load_documents_parallel
+                        all_docs, _, _ = load_documents_parallel(user_docs, db=db)
                         if all_docs:
                             USER_VECTORSTORES[user_id] = create_vectorstore(all_docs, user_id)
-                            USER_QA_CHAINS[user_id] = get_qa_chain(USER_VECTORSTORES[user_id])
+                            USER_QA_CHAINS[user_id] = get_qa_chain(USER_VECTORSTORES[user_id], user_id)
                             # Save to Qdrant Cloud
                             save_vectorstore(USER_VECTORSTORES[user_id], user_id)
                             print(f"Rebuilt and saved vectorstore for user {user_id}")
@@ -998,12 +1548,15 @@ async def chat(request: ChatRequest, current_user = Depends(get_current_user), d
                         raise HTTPException(status_code=400, detail="Upload files to your vault first to use document-based chat")
             
             user_vectorstore = USER_VECTORSTORES[user_id]
+            if retrieval is not None and retrieval.vectorstore is not user_vectorstore:
+                retrieval = None
             
-            # Get answer with sources for citations
+            # Get answer with sources for citations (reusing the mode-detection retrieval)
             from .rag import get_answer_with_sources
-            result_dict = get_answer_with_sources(user_vectorstore, request.query)
+            result_dict = get_answer_with_sources(user_vectorstore, request.query, user_id, retrieval)
             result = result_dict["answer"]
             source_docs = result_dict.get("sources", [])
+            rerank_stats = result_dict.get("rerank")
             
             # Extract citations from source documents
             citations = extract_citations(source_docs, None)  # Will use source metadata
@@ -1048,6 +1601,10 @@ async def chat(request: ChatRequest, current_user = Depends(get_current_user), d
         if citations_data:
             response_data["citations"] = citations_data
         
+        # Rerank time of this request (only when reranking is enabled)
+        if rerank_stats:
+            response_data["rerank"] = rerank_stats
+        
         if pdf_generated:
             response_data["pdf_url"] = pdf_url
             response_data["pdf_generated"] = True
@@ -1152,7 +1709,7 @@ async def search_keyword(request: KeywordSearchRequest, db: Session = Depends(ge
         raise HTTPException(status_code=400, detail="No document uploaded. Please upload a document first.")
     
     # Search for keyword
-    search_result = search_keyword_in_document(CURRENT_DOCUMENT.filepath, request.keyword)
+    search_result = search_keyword_in_document(CURRENT_DOCUMENT.filepath, request.keyword, CURRENT_DOCUMENT.id, db)
     
     # Format response for better display
     formatted_response = format_keyword_search_response(search_result, request.keyword)
@@ -1203,6 +1760,6 @@ async def search_keywords(request: MultipleKeywordSearchRequest, db: Session = D
         raise HTTPException(status_code=400, detail="No document uploaded. Please upload a document first.")
     
     # Search for all keywords
-    search_results = search_multiple_keywords(CURRENT_DOCUMENT.filepath, request.keywords)
+    search_results = search_multiple_keywords(CURRENT_DOCUMENT.filepath, request.keywords, CURRENT_DOCUMENT.id, db)
     
     return search_results
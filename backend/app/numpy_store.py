@@ -0,0 +1,326 @@
+"""
+In-process vector index backed by NumPy, persisted as memory-mapped files.
+
+Each user gets a directory with a float32 ``vectors.npy`` (rows normalized, so
+cosine similarity is a dot product) and a ``chunks.jsonl`` with the text and
+metadata of each row. Search is an exact, batched matrix-vector product over
+the memory-mapped matrix - no network hop, which beats a remote Qdrant for
+small and medium vaults.
+
+The matrix file is over-allocated and grown by doubling, so appending chunks
+writes only the new rows; the row count lives in ``index.json``.
+"""
+import json
+import os
+import shutil
+import threading
+import uuid
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np  # type: ignore
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+# Where the per-user index directories live
+VECTOR_INDEX_DIR = os.getenv("VECTOR_INDEX_DIR", "vector_index")
+
+# Rows scored per matrix-vector product, bounds temporary memory during a search
+SEARCH_BLOCK_ROWS = int(os.getenv("VECTOR_SEARCH_BLOCK_ROWS", "65536"))
+
+# Rows allocated when a matrix file is first created
+_INITIAL_CAPACITY = 1024
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    """Scale rows to unit length (zero rows stay zero)."""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+def _matches(metadata: Dict, filter: Optional[Dict]) -> bool:
+    """Exact-match metadata filter, e.g. {"document_id": 3}."""
+    if not filter:
+        return True
+    return all(metadata.get(key) == value for key, value in filter.items())
+
+class NumpyVectorStore(VectorStore):
+    """Exact cosine search over one user's memory-mapped vector matrix."""
+    
+    def __init__(self, directory: str, embeddings: Optional[Embeddings] = None):
+        """
+        Args:
+            directory: Index directory of the user (created on first write)
+            embeddings: Used to embed queries and added texts
+        """
+        self.directory = directory
+        self._embeddings = embeddings
+        self._lock = threading.RLock()
+        self._vectors = None  # memory-mapped (capacity, dim) float32 matrix
+        self._chunks: List[Dict] = []
+        self._count = 0
+        self._load()
+    
+    @property
+    def embeddings(self) -> Optional[Embeddings]:
+        return self._embeddings
+    
+    # --- persistence -------------------------------------------------------
+    
+    @property
+    def _vectors_path(self) -> str:
+        return os.path.join(self.directory, "vectors.npy")
+    
+    @property
+    def _chunks_path(self) -> str:
+        return os.path.join(self.directory, "chunks.jsonl")
+    
+    @property
+    def _index_path(self) -> str:
+        return os.path.join(self.directory, "index.json")
+    
+    def _load(self):
+        """Open an existing index (a missing directory is an empty index)."""
+        if not os.path.exists(self._index_path):
+            return
+        with open(self._index_path) as f:
+            count = json.load(f)["count"]
+        chunks = []
+        with open(self._chunks_path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    chunks.append(json.loads(line))
+        # An interrupted write can leave extra lines behind - index.json is the source of truth
+        self._count = min(count, len(chunks))
+        self._chunks = chunks[:self._count]
+        self._vectors = np.load(self._vectors_path, mmap_mode="r+")
+    
+    def _save_count(self):
+        """Write index.json atomically after the rows and chunks are on disk."""
+        tmp_path = f"{self._index_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"count": self._count, "dim": int(self._vectors.shape[1])}, f)
+        os.replace(tmp_path, self._index_path)
+    
+    def _write_matrix(self, rows: np.ndarray, capacity: int):
+        """Replace the matrix file with the given rows, allocated for capacity rows."""
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = f"{self._vectors_path}.tmp"
+        matrix = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.float32, shape=(capacity, rows.shape[1]))
+        matrix[:len(rows)] = rows
+        matrix.flush()
+        del matrix
+        # Drop the old mapping first - Windows can't replace a mapped file
+        self._vectors = None
+        os.replace(tmp_path, self._vectors_path)
+        self._vectors = np.load(self._vectors_path, mmap_mode="r+")
+    
+    def _rewrite_chunks(self, chunks: List[Dict]):
+        """Replace chunks.jsonl (used when rows are removed)."""
+        tmp_path = f"{self._chunks_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for chunk in chunks:
+                f.write(json.dumps(chunk) + "\n")
+        os.replace(tmp_path, self._chunks_path)
+    
+    # --- writes ------------------------------------------------------------
+    
+    def add_embeddings(self, texts: List[str], vectors, metadatas: Optional[List[Dict]] = None,
+                       ids: Optional[List[str]] = None) -> List[str]:
+        """
+        Append already embedded texts.
+        
+        Args:
+            texts: Chunk texts
+            vectors: One embedding per text
+            metadatas: Metadata per text
+            ids: Row ids (generated when not given)
+        
+        Returns:
+            The ids of the added rows
+        """
+        if not texts:
+            return []
+        rows = _normalize(np.asarray(vectors, dtype=np.float32))
+        metadatas = metadatas or [{} for _ in texts]
+        ids = ids or [uuid.uuid4().hex for _ in texts]
+        chunks = [
+            {"id": id_, "page_content": text, "metadata": dict(metadata or {})}
+            for id_, text, metadata in zip(ids, texts, metadatas)
+        ]
+        
+        with self._lock:
+            needed = self._count + len(rows)
+            if self._vectors is None:
+                self._write_matrix(rows[:0], max(_INITIAL_CAPACITY, needed))
+            elif self._vectors.shape[1] != rows.shape[1]:
+                raise ValueError(f"Vector size {rows.shape[1]} does not match the index ({self._vectors.shape[1]})")
+            elif needed > self._vectors.shape[0]:
+                # Grow by doubling so appends stay amortized O(new rows)
+                self._write_matrix(np.array(self._vectors[:self._count]), max(needed, 2 * self._vectors.shape[0]))
+            
+            self._vectors[self._count:needed] = rows
+            self._vectors.flush()
+            with open(self._chunks_path, "a", encoding="utf-8") as f:
+                for chunk in chunks:
+                    f.write(json.dumps(chunk) + "\n")
+            self._chunks.extend(chunks)
+            self._count = needed
+            self._save_count()
+        return ids
+    
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[Dict]] = None,
+                  ids: Optional[List[str]] = None, **kwargs: Any) -> List[str]:
+        texts = list(texts)
+        return self.add_embeddings(texts, self._embeddings.embed_documents(texts), metadatas, ids)
+    
+    def _retain(self, keep) -> int:
+        """Compact the index down to the given rows; returns the number of rows removed."""
+        removed = self._count - len(keep)
+        if removed:
+            rows = self._vectors[keep] if keep else np.zeros((0, self._vectors.shape[1]), dtype=np.float32)
+            self._write_matrix(rows, max(_INITIAL_CAPACITY, len(keep)))
+            self._chunks = [self._chunks[i] for i in keep]
+            self._rewrite_chunks(self._chunks)
+            self._count = len(keep)
+            self._save_count()
+        return removed
+    
+    def remove_where(self, filter: Dict) -> int:
+        """
+        Remove every row whose metadata matches the filter.
+        
+        Returns:
+            Number of rows removed
+        """
+        with self._lock:
+            return self._retain([i for i, chunk in enumerate(self._chunks) if not _matches(chunk["metadata"], filter)])
+    
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        if not ids:
+            return False
+        id_set = set(ids)
+        with self._lock:
+            return self._retain([i for i, chunk in enumerate(self._chunks) if chunk["id"] not in id_set]) > 0
+    
+    def copy_where(self, filter: Dict, metadata_updates: Dict) -> int:
+        """
+        Duplicate the rows matching the filter with updated metadata (no re-embedding).
+        
+        Returns:
+            Number of rows copied
+        """
+        with self._lock:
+            selected = [i for i, chunk in enumerate(self._chunks) if _matches(chunk["metadata"], filter)]
+            if not selected:
+                return 0
+            rows = np.array(self._vectors[selected])
+            texts = [self._chunks[i]["page_content"] for i in selected]
+            metadatas = [{**self._chunks[i]["metadata"], **metadata_updates} for i in selected]
+            self.add_embeddings(texts, rows, metadatas)
+        return len(selected)
+    
+    def count(self, filter: Optional[Dict] = None) -> int:
+        """Number of rows (matching the filter, if given)."""
+        with self._lock:
+            if not filter:
+                return self._count
+            return sum(1 for chunk in self._chunks if _matches(chunk["metadata"], filter))
+    
+    def destroy(self):
+        """Delete the index from disk."""
+        with self._lock:
+            self._vectors = None
+            self._chunks = []
+            self._count = 0
+            shutil.rmtree(self.directory, ignore_errors=True)
+    
+    # --- search ------------------------------------------------------------
+    
+    def similarity_search_with_score_by_vector(self, embedding: List[float], k: int = 4,
+                                               filter: Optional[Dict] = None, **kwargs: Any) -> List[Tuple[Document, float]]:
+        """The k most similar chunks with their cosine similarity, best first."""
+        # Rows below count are never modified in place (removal writes a new file),
+        # so a snapshot can be searched without holding the lock
+        with self._lock:
+            vectors, chunks, count = self._vectors, self._chunks, self._count
+        if not count or k <= 0:
+            return []
+        query = _normalize(np.asarray(embedding, dtype=np.float32).reshape(1, -1))[0]
+        mask = None
+        if filter:
+            mask = np.fromiter((_matches(chunk["metadata"], filter) for chunk in chunks[:count]), dtype=bool, count=count)
+        
+        best_rows = np.empty(0, dtype=np.int64)
+        best_scores = np.empty(0, dtype=np.float32)
+        for start in range(0, count, SEARCH_BLOCK_ROWS):
+            end = min(start + SEARCH_BLOCK_ROWS, count)
+            scores = vectors[start:end] @ query
+            if mask is not None:
+                scores = np.where(mask[start:end], scores, -np.inf)
+            # Keep only the block's k best before merging with the running top k
+            top = np.argpartition(-scores, k - 1)[:k] if len(scores) > k else np.arange(len(scores))
+            best_rows = np.concatenate([best_rows, top + start])
+            best_scores = np.concatenate([best_scores, scores[top]])
+            if len(best_scores) > k:
+                keep = np.argpartition(-best_scores, k - 1)[:k]
+                best_rows, best_scores = best_rows[keep], best_scores[keep]
+        
+        results = []
+        for i in np.argsort(-best_scores):
+            if not np.isfinite(best_scores[i]):
+                continue
+            chunk = chunks[int(best_rows[i])]
+            doc = Document(page_content=chunk["page_content"], metadata={**chunk["metadata"], "_id": chunk["id"]})
+            results.append((doc, float(best_scores[i])))
+        return results
+    
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4,
+                                    filter: Optional[Dict] = None, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k, filter)]
+    
+    def similarity_search_with_score(self, query: str, k: int = 4,
+                                     filter: Optional[Dict] = None, **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.similarity_search_with_score_by_vector(self._embeddings.embed_query(query), k, filter)
+    
+    def similarity_search(self, query: str, k: int = 4, filter: Optional[Dict] = None, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, filter)]
+    
+    def _select_relevance_score_fn(self):
+        # Cosine similarity in [-1, 1] -> relevance in [0, 1]
+        return lambda score: (score + 1.0) / 2.0
+    
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings, metadatas: Optional[List[Dict]] = None,
+                   directory: Optional[str] = None, **kwargs: Any) -> "NumpyVectorStore":
+        store = cls(directory or os.path.join(VECTOR_INDEX_DIR, uuid.uuid4().hex), embedding)
+        store.add_texts(texts, metadatas)
+        return store
+
+_stores: Dict[int, NumpyVectorStore] = {}
+_stores_lock = threading.Lock()
+
+def user_index_dir(user_id: int) -> str:
+    """Index directory of one user."""
+    return os.path.join(VECTOR_INDEX_DIR, f"user_{user_id}")
+
+def get_numpy_store(user_id: int, embeddings: Optional[Embeddings] = None) -> NumpyVectorStore:
+    """The user's index, opened once per process and shared (like the Qdrant client)."""
+    with _stores_lock:
+        store = _stores.get(user_id)
+        if store is None:
+            store = NumpyVectorStore(user_index_dir(user_id), embeddings)
+            _stores[user_id] = store
+        elif embeddings is not None:
+            store._embeddings = embeddings
+        return store
+
+def drop_numpy_store(user_id: int) -> bool:
+    """Delete the user's index from disk; returns False if there was none."""
+    with _stores_lock:
+        store = _stores.pop(user_id, None)
+    existed = os.path.isdir(user_index_dir(user_id))
+    if store is not None:
+        store.destroy()
+    else:
+        shutil.rmtree(user_index_dir(user_id), ignore_errors=True)
+    return existed
@@ -0,0 +1,149 @@
+"""
+ONNX Runtime CPU backend for sentence-transformers embedding models.
+
+The model is exported to ONNX once, quantized to int8 with dynamic
+quantization, and cached on disk. Inference runs through ONNX Runtime with
+mean pooling and L2 normalization, matching the sentence-transformers
+pipeline of all-MiniLM-L6-v2.
+
+Optional dependencies: onnxruntime and onnx (only needed when
+EMBEDDING_BACKEND=onnx). Exporting the model additionally needs torch and
+transformers, which sentence-transformers already installs.
+"""
+import os
+import threading
+from typing import List
+
+from langchain_core.embeddings import Embeddings
+
+ONNX_MODEL_DIR = os.getenv("ONNX_MODEL_DIR", "onnx_models")
+ONNX_BATCH_SIZE = int(os.getenv("ONNX_BATCH_SIZE", "32"))
+ONNX_NUM_THREADS = int(os.getenv("ONNX_NUM_THREADS", "0"))  # 0 = let ONNX Runtime decide
+ONNX_QUANTIZE = os.getenv("ONNX_QUANTIZE", "true").lower() == "true"
+
+# all-MiniLM-L6-v2 truncates input at 256 word pieces
+MAX_SEQ_LENGTH = 256
+
+class OnnxEmbeddings(Embeddings):
+    """Batched (optionally int8-quantized) ONNX Runtime embeddings on CPU."""
+
+    def __init__(self, model_name: str, model_dir: str = ONNX_MODEL_DIR, batch_size: int = ONNX_BATCH_SIZE,
+                 num_threads: int = ONNX_NUM_THREADS, quantize: bool = ONNX_QUANTIZE,
+                 max_seq_length: int = MAX_SEQ_LENGTH):
+        """
+        Args:
+            model_name: Hugging Face model id of the sentence-transformers model
+            model_dir: Directory where exported ONNX models are cached
+            batch_size: Texts per inference call
+            num_threads: Intra-op threads for ONNX Runtime (0 = default)
+            quantize: Use the int8 dynamically quantized model
+            max_seq_length: Token limit per text
+        """
+        self.model_name = model_name
+        self.model_dir = os.path.join(model_dir, model_name.replace("/", "__"))
+        self.batch_size = batch_size
+        self.num_threads = num_threads
+        self.quantize = quantize
+        self.max_seq_length = max_seq_length
+        self._session = None
+        self._tokenizer = None
+        self._input_names = []
+        self._lock = threading.Lock()
+
+    @property
+    def variant(self) -> str:
+        """Short name of the model variant, used to keep cached vectors apart."""
+        return "onnx-int8" if self.quantize else "onnx-fp32"
+
+    def _export(self, path: str):
+        """Export the transformer to ONNX with dynamic batch and sequence axes."""
+        import torch  # type: ignore
+        from transformers import AutoModel  # type: ignore
+
+        print(f"Exporting {self.model_name} to ONNX: {path}")
+        model = AutoModel.from_pretrained(self.model_name)
+        model.eval()
+        sample = self._tokenizer(["export"], return_tensors="pt")
+        input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+        dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+        dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+        export_kwargs = dict(
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=14,
+        )
+        with torch.no_grad():
+            args = tuple(sample[name] for name in input_names)
+            try:
+                torch.onnx.export(model, args, path, dynamo=False, **export_kwargs)
+            except TypeError:
+                # Older torch versions have no dynamo switch
+                torch.onnx.export(model, args, path, **export_kwargs)
+
+    def _load(self):
+        """Export, quantize and open the model on first use."""
+        with self._lock:
+            if self._session is not None:
+                return
+            import onnxruntime as ort  # type: ignore
+            from transformers import AutoTokenizer  # type: ignore
+
+            self._tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+            os.makedirs(self.model_dir, exist_ok=True)
+            fp32_path = os.path.join(self.model_dir, "model.onnx")
+            int8_path = os.path.join(self.model_dir, "model.int8.onnx")
+            if not os.path.exists(fp32_path):
+                self._export(fp32_path)
+            model_path = fp32_path
+            if self.quantize:
+                if not os.path.exists(int8_path):
+                    from onnxruntime.quantization import quantize_dynamic, QuantType  # type: ignore
+                    print(f"Quantizing {self.model_name} to int8: {int8_path}")
+                    quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+                model_path = int8_path
+
+            options = ort.SessionOptions()
+            if self.num_threads:
+                options.intra_op_num_threads = self.num_threads
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            self._session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+            self._input_names = [model_input.name for model_input in self._session.get_inputs()]
+            print(f"Loaded ONNX embedding model ({self.variant}): {model_path}")
+
+    def _embed(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts in batches, sorted by length to minimise padding."""
+        import numpy as np  # type: ignore
+
+        self._load()
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        results: List[List[float]] = [None] * len(texts)
+        for start in range(0, len(order), self.batch_size):
+            batch_indices = order[start:start + self.batch_size]
+            encoded = self._tokenizer(
+                [texts[i] for i in batch_indices],
+                padding=True,
+                truncation=True,
+                max_length=self.max_seq_length,
+                return_tensors="np",
+            )
+            feeds = {name: encoded[name].astype(np.int64) for name in self._input_names if name in encoded}
+            hidden = self._session.run(None, feeds)[0]
+
+            # Mean pooling over real tokens, then L2 normalization (same as sentence-transformers)
+            mask = encoded["attention_mask"][..., None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            for i, vector in zip(batch_indices, pooled):
+                results[i] = vector.tolist()
+        return results
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed a list of documents."""
+        if not texts:
+            return []
+        return self._embed(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a single query."""
+        return self._embed([text])[0]
@@ -1,10 +1,3 @@
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak
-from reportlab.lib.enums import TA_JUSTIFY, TA_LEFT
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
 import os
 from datetime import datetime
 
@@ -19,6 +12,13 @@ def generate_pdf_from_text(content: str, filename: str = None) -> str:
     Returns:
         str: Path to the generated PDF file
     """
+    # reportlab is only needed here - importing it lazily keeps API startup fast
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib.units import inch
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+    from reportlab.lib.enums import TA_JUSTIFY, TA_LEFT
+    
     # Create output directory if it doesn't exist
     output_dir = "generated_pdfs"
     os.makedirs(output_dir, exist_ok=True)
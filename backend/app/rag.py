@@ -1,14 +1,95 @@
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.runnables import RunnablePassthrough
-from langchain_core.output_parsers import StrOutputParser
+import threading
+
 from .llm import get_llm
 
-def get_qa_chain(vectorstore):
+def retrieve_documents(vectorstore, question: str, k: int = 3, user_id: int = None, stats: dict = None):
+    """
+    Chunks for the prompt: dense + BM25 keyword search fused with RRF when
+    hybrid search is enabled and the user is known, dense search otherwise.
+    With reranking enabled, RERANK_CANDIDATES chunks are retrieved and the
+    cross-encoder picks the best k.
+    
+    Args:
+        vectorstore: The user's vector store
+        question: User's question
+        k: Number of chunks
+        user_id: Owner of the vault (needed for the keyword index)
+        stats: Optional dict that receives the rerank stats (rerank_ms, reranked, ...)
+    """
+    from .hybrid_search import HYBRID_CANDIDATES, HYBRID_SEARCH_ENABLED, hybrid_search
+    from .reranker import RERANK_CANDIDATES, RERANK_ENABLED, rerank
+    fetch = max(k, RERANK_CANDIDATES) if RERANK_ENABLED else k
+    docs = None
+    if HYBRID_SEARCH_ENABLED and user_id is not None:
+        try:
+            docs = hybrid_search(vectorstore, user_id, question, fetch, max(fetch, HYBRID_CANDIDATES))
+        except Exception as e:
+            print(f"Hybrid search failed, using dense search: {e}")
+    if docs is None:
+        docs = vectorstore.similarity_search(question, k=fetch)
+    if not RERANK_ENABLED:
+        return docs
+    docs, rerank_stats = rerank(question, docs, k)
+    if stats is not None:
+        stats.update(rerank_stats)
+    return docs
+
+class RetrievalContext:
+    """
+    Retrieval for one chat request: the query is embedded and searched once,
+    and mode detection, the prompt and the citations all read the same chunks.
+    """
+    
+    def __init__(self, vectorstore, question: str, user_id: int = None, k: int = 3):
+        """
+        Args:
+            vectorstore: The user's vector store
+            question: User's question
+            user_id: Owner of the vault (enables hybrid keyword + vector retrieval)
+            k: Chunks retrieved - callers asking for fewer get the top of this list
+        """
+        self.vectorstore = vectorstore
+        self.question = question
+        self.user_id = user_id
+        self.k = k
+        self.stats = {}
+        self._docs = None
+        self._lock = threading.Lock()
+    
+    def documents(self, k: int = None):
+        """The top k chunks for the question (retrieved on the first call)."""
+        k = k or self.k
+        with self._lock:
+            if self._docs is None or k > self.k:
+                self.k = max(k, self.k)
+                self._docs = retrieve_documents(self.vectorstore, self.question, self.k, self.user_id, stats=self.stats)
+            return self._docs[:k]
+
+def get_qa_chain(vectorstore, user_id: int = None):
+    """
+    RAG chain over the user's documents.
+    
+    The chain is invoked with the question, or with a RetrievalContext to
+    reuse chunks already retrieved for the request.
+    """
+    # langchain_core prompts/parsers pull in tracing on import - load them on first chain build
+    from langchain_core.prompts import ChatPromptTemplate
+    from langchain_core.runnables import RunnableLambda
+    from langchain_core.output_parsers import StrOutputParser
     llm = get_llm()
-    # Optimize retriever for speed: fewer docs, shorter chunks
-    retriever = vectorstore.as_retriever(
-        search_kwargs={"k": 3}  # Only retrieve top 3 most relevant chunks (faster)
-    )
+    
+    def retrieve(query):
+        if isinstance(query, RetrievalContext):
+            return query.documents(3)
+        if user_id is not None:
+            # Hybrid retrieval needs the user's keyword index
+            return retrieve_documents(vectorstore, query, 3, user_id)
+        # Optimize retriever for speed: fewer docs, shorter chunks
+        return vectorstore.similarity_search(query, k=3)  # Only retrieve top 3 most relevant chunks (faster)
+    
+    def question_text(query):
+        return query.question if isinstance(query, RetrievalContext) else query
+    retriever = RunnableLambda(retrieve)
     
     # Prompt with citation instructions (ChatGPT style)
     prompt = ChatPromptTemplate.from_template(
@@ -35,7 +116,7 @@ Answer:"""
         return "\n\n".join(formatted)
     
     chain = (
-        {"context": retriever | format_docs, "question": RunnablePassthrough()}
+        {"context": retriever | format_docs, "question": RunnableLambda(question_text)}
         | prompt
         | llm
         | StrOutputParser()
@@ -43,23 +124,28 @@ Answer:"""
     
     return chain
 
-def get_answer_with_sources(vectorstore, question: str):
+def get_answer_with_sources(vectorstore, question: str, user_id: int = None, retrieval: RetrievalContext = None):
     """
     Get answer with source documents for citations (ChatGPT-style inline citations).
     
     Args:
         vectorstore: The vector store
         question: User's question
+        user_id: Owner of the vault (enables hybrid keyword + vector retrieval)
+        retrieval: Chunks already retrieved for this request (searched here if None)
     
     Returns:
-        Dictionary with 'answer' and 'sources'
+        Dictionary with 'answer', 'sources' and 'rerank' (rerank stats, None when reranking is off)
     """
+    from langchain_core.prompts import ChatPromptTemplate
+    from langchain_core.output_parsers import StrOutputParser
     llm = get_llm()
     
     # Get relevant documents directly from vectorstore (more reliable)
+    retrieval = retrieval or RetrievalContext(vectorstore, question, user_id)
     try:
-        # Use similarity_search directly from vectorstore
-        source_docs = vectorstore.similarity_search(question, k=3)
+        # Use similarity_search directly from vectorstore (fused with keyword search when enabled)
+        source_docs = retrieval.documents(3)
     except Exception as e1:
         try:
             # Fallback: use retriever with invoke()
@@ -104,5 +190,6 @@ Answer:"""
     
     return {
         "answer": answer_text,
-        "sources": source_docs
+        "sources": source_docs,
+        "rerank": retrieval.stats or None
     }
@@ -0,0 +1,143 @@
+"""
+Optional cross-encoder reranking of retrieved chunks.
+
+Retrieval fetches a wider candidate set (RERANK_CANDIDATES), a small CPU
+cross-encoder scores each (question, chunk) pair in batches, and only the
+best k chunks go into the prompt. Raising recall this way costs no extra
+prompt tokens.
+
+Reranking has a hard latency budget (RERANK_BUDGET_MS): when the deadline
+passes, or the model is not loaded yet, the candidates keep their retrieval
+order. The model is loaded in the background on first use, so no request
+waits for it.
+"""
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "false").lower() == "true"
+RERANK_MODEL_NAME = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+# Chunks retrieved for reranking (only the top k reach the prompt)
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "20"))
+RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", "8"))
+RERANK_BUDGET_MS = float(os.getenv("RERANK_BUDGET_MS", "300"))
+# Cross-encoders are trained on passages, so long chunks are truncated before scoring
+RERANK_MAX_CHARS = int(os.getenv("RERANK_MAX_CHARS", "1000"))
+
+_model = None
+_model_lock = threading.Lock()
+_loading = False
+
+def _load_model():
+    """Load the cross-encoder (sentence-transformers/torch imported on first use)."""
+    global _model, _loading
+    try:
+        start = time.perf_counter()
+        from sentence_transformers import CrossEncoder  # type: ignore
+        model = CrossEncoder(RERANK_MODEL_NAME, device="cpu")
+        with _model_lock:
+            _model = model
+        print(f"Rerank model {RERANK_MODEL_NAME} loaded in {time.perf_counter() - start:.1f}s")
+    except Exception as e:
+        print(f"Warning: Could not load rerank model {RERANK_MODEL_NAME}: {e}")
+    finally:
+        with _model_lock:
+            _loading = False
+
+def get_cross_encoder(wait: bool = False):
+    """
+    The shared cross-encoder, or None while it is still loading.
+    
+    Args:
+        wait: Load the model in this thread instead of in the background
+    """
+    global _loading
+    with _model_lock:
+        if _model is not None:
+            return _model
+        start_loading = not _loading
+        if start_loading:
+            _loading = True
+    if wait:
+        if start_loading:
+            _load_model()
+        else:
+            while _loading:
+                time.sleep(0.05)
+        return _model
+    if start_loading:
+        threading.Thread(target=_load_model, name="rerank-model-loader", daemon=True).start()
+    return None
+
+def warm_up_reranker():
+    """Load the cross-encoder and score one pair so the first real request doesn't pay for it."""
+    model = get_cross_encoder(wait=True)
+    if model is not None:
+        try:
+            model.predict([("warm up", "warm up")])
+        except Exception as e:
+            print(f"Warning: Rerank model warm-up failed: {e}")
+
+def rerank(query: str, docs: List[Document], k: int, budget_ms: Optional[float] = None,
+           batch_size: Optional[int] = None, model=None) -> Tuple[List[Document], Dict]:
+    """
+    Reorder retrieved chunks by cross-encoder relevance and keep the best k.
+    
+    Batches are scored until the budget runs out; a batch already running is
+    allowed to finish, so the overrun is at most one batch. If not every
+    candidate was scored, the retrieval order is kept.
+    
+    Args:
+        query: User's question
+        docs: Candidates in retrieval order
+        k: Chunks to return
+        budget_ms: Latency budget (defaults to RERANK_BUDGET_MS)
+        batch_size: Pairs scored per model call (defaults to RERANK_BATCH_SIZE)
+        model: Cross-encoder to use instead of the shared one
+    
+    Returns:
+        (top k chunks, stats) - stats has rerank_ms, candidates, scored and
+        reranked (False when the retrieval order was used, with a reason)
+    """
+    budget_ms = RERANK_BUDGET_MS if budget_ms is None else budget_ms
+    batch_size = batch_size or RERANK_BATCH_SIZE
+    start = time.perf_counter()
+    stats = {"rerank_ms": 0.0, "candidates": len(docs), "scored": 0, "reranked": False}
+    
+    if len(docs) <= 1:
+        stats["reason"] = "too few candidates"
+        return docs[:k], stats
+    model = model or get_cross_encoder()
+    if model is None:
+        stats["reason"] = "model loading"
+        return docs[:k], stats
+    
+    deadline = start + budget_ms / 1000
+    scores = []
+    failed = False
+    try:
+        for offset in range(0, len(docs), batch_size):
+            if time.perf_counter() >= deadline:
+                break
+            batch = docs[offset:offset + batch_size]
+            pairs = [(query, doc.page_content[:RERANK_MAX_CHARS]) for doc in batch]
+            scores.extend(float(score) for score in model.predict(pairs, batch_size=len(pairs)))
+    except Exception as e:
+        print(f"Error reranking chunks: {e}")
+        failed = True
+    
+    stats["scored"] = len(scores)
+    stats["rerank_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    if len(scores) < len(docs):
+        stats["reason"] = "error" if failed else "over budget"
+        print(f"Rerank fell back to retrieval order after {stats['rerank_ms']} ms ({len(scores)}/{len(docs)} scored)")
+        return docs[:k], stats
+    
+    # sorted() is stable, so equal scores keep retrieval order
+    order = sorted(range(len(docs)), key=lambda i: scores[i], reverse=True)
+    stats["reranked"] = True
+    print(f"Reranked {len(docs)} chunks in {stats['rerank_ms']} ms")
+    return [docs[i] for i in order[:k]], stats
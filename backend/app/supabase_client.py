@@ -1,16 +1,20 @@
 """Supabase client configuration."""
-from supabase import create_client, Client  # type: ignore
 import os
+from typing import TYPE_CHECKING
 from dotenv import load_dotenv
 
+if TYPE_CHECKING:
+    from supabase import Client  # type: ignore
+
 load_dotenv()
 
 SUPABASE_URL = os.getenv("SUPABASE_URL", "")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY", "")
 SUPABASE_SERVICE_KEY = os.getenv("SUPABASE_SERVICE_KEY", "")  # Service role key for admin operations
 
-def get_supabase_client() -> Client:
+def get_supabase_client() -> "Client":
     """Get Supabase client instance (uses anon key by default)."""
+    from supabase import create_client  # type: ignore
     if not SUPABASE_URL or not SUPABASE_KEY:
         raise ValueError(
             "SUPABASE_URL and SUPABASE_KEY must be set in environment variables. "
@@ -18,8 +22,9 @@ def get_supabase_client() -> Client:
         )
     return create_client(SUPABASE_URL, SUPABASE_KEY)
 
-def get_supabase_admin_client() -> Client:
+def get_supabase_admin_client() -> "Client":
     """Get Supabase admin client instance (uses service role key for admin operations like bucket creation)."""
+    from supabase import create_client  # type: ignore
     if not SUPABASE_URL:
         raise ValueError("SUPABASE_URL must be set in environment variables.")
     
@@ -118,7 +118,7 @@ def get_chat_history(user_id: int, limit: int = 50) -> List[Dict]:
 
 def create_document(user_id: int, filename: str, filepath: str, file_type: str,
                    file_size: int = 0, supabase_path: Optional[str] = None,
-                   processed: bool = False) -> Optional[Dict]:
+                   processed: bool = False, content_hash: Optional[str] = None) -> Optional[Dict]:
     """Create document entry using Supabase."""
     try:
         supabase = get_supabase_client()
@@ -135,6 +135,9 @@ def create_document(user_id: int, filename: str, filepath: str, file_type: str,
         # Only add supabase_path if column exists and value is provided
         if supabase_path is not None:
             insert_data["supabase_path"] = supabase_path
+        # Only add content_hash if provided (column added for upload deduplication)
+        if content_hash is not None:
+            insert_data["content_hash"] = content_hash
         
         result = supabase.table("documents").insert(insert_data).execute()
         
@@ -167,6 +170,18 @@ def get_document_by_id(document_id: int, user_id: int) -> Optional[Dict]:
         print(f"Error getting document: {e}")
         return None
 
+def get_document_by_hash(user_id: int, content_hash: str) -> Optional[Dict]:
+    """Get a processed document of the user with the given content hash using Supabase."""
+    try:
+        supabase = get_supabase_client()
+        result = supabase.table("documents").select("*").eq("user_id", user_id).eq("content_hash", content_hash).eq("processed", True).limit(1).execute()
+        if result.data and len(result.data) > 0:
+            return result.data[0]
+        return None
+    except Exception as e:
+        print(f"Error getting document by hash: {e}")
+        return None
+
 def update_document(document_id: int, user_id: int, **kwargs) -> Optional[Dict]:
     """Update document using Supabase."""
     try:
@@ -199,6 +214,59 @@ def get_processed_documents(user_id: int) -> List[Dict]:
         print(f"Error getting processed documents: {e}")
         return []
 
+# Rows per insert request and per page of results (PostgREST returns at most 1000 rows)
+CONTENT_BATCH_SIZE = 500
+
+def insert_document_content(table: str, rows: List[Dict]) -> None:
+    """Insert document_pages / document_chunks rows using Supabase."""
+    try:
+        supabase = get_supabase_client()
+        for start in range(0, len(rows), CONTENT_BATCH_SIZE):
+            supabase.table(table).insert(rows[start:start + CONTENT_BATCH_SIZE]).execute()
+    except Exception as e:
+        print(f"Error inserting {table}: {e}")
+        raise
+
+def get_document_content(table: str, document_ids: List[int], order_by: str) -> List[Dict]:
+    """Get document_pages / document_chunks rows of the given documents using Supabase."""
+    try:
+        supabase = get_supabase_client()
+        rows = []
+        start = 0
+        while True:
+            result = supabase.table(table).select("*").in_("document_id", document_ids).order("document_id").order(order_by).range(start, start + CONTENT_BATCH_SIZE - 1).execute()
+            batch = result.data or []
+            rows.extend(batch)
+            if len(batch) < CONTENT_BATCH_SIZE:
+                return rows
+            start += CONTENT_BATCH_SIZE
+    except Exception as e:
+        print(f"Error getting {table}: {e}")
+        return []
+
+def get_document_chunk(document_id: int, chunk_index: int) -> Optional[Dict]:
+    """Get a single document_chunks row using Supabase."""
+    try:
+        supabase = get_supabase_client()
+        result = supabase.table("document_chunks").select("*").eq("document_id", document_id).eq("chunk_index", chunk_index).limit(1).execute()
+        if result.data and len(result.data) > 0:
+            return result.data[0]
+        return None
+    except Exception as e:
+        print(f"Error getting document chunk: {e}")
+        return None
+
+def delete_document_content(document_id: int) -> bool:
+    """Delete stored pages and chunks of a document using Supabase."""
+    try:
+        supabase = get_supabase_client()
+        supabase.table("document_chunks").delete().eq("document_id", document_id).execute()
+        supabase.table("document_pages").delete().eq("document_id", document_id).execute()
+        return True
+    except Exception as e:
+        print(f"Error deleting document content: {e}")
+        return False
+
 def check_password_hash(password_hash: str, password: str) -> bool:
     """Check if password matches hash."""
     try:
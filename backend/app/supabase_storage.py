@@ -1,15 +1,15 @@
 """Supabase Storage helper functions for file operations."""
 import os
-from typing import Optional, BinaryIO
+from typing import Optional, BinaryIO, Union
 from .supabase_client import get_supabase_client, get_supabase_admin_client, get_storage_bucket_name
 
-def upload_file_to_supabase(user_id: int, file_content: bytes, filename: str) -> str:
+def upload_file_to_supabase(user_id: int, file_content: Union[bytes, str], filename: str) -> str:
     """
     Upload file to Supabase Storage.
     
     Args:
         user_id: User ID
-        file_content: File content as bytes
+        file_content: File content as bytes, or the path of a local file (streamed from disk)
         filename: Original filename
         
     Returns:
@@ -0,0 +1,288 @@
+"""
+Streaming upload helpers for the vault.
+
+Uploads are copied to disk in fixed-size chunks and hashed on the fly, so the
+memory used per upload stays at one chunk no matter how large the file is.
+Disk writes run in worker threads, so a slow disk never blocks the event loop.
+
+Resumable uploads keep each numbered part in its own file next to a JSON
+manifest, so a client that loses its connection only re-sends the parts that
+are missing.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+# Bytes read from the request per step
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+
+# Uploads waiting to be sent to Supabase Storage / parsed by the ingestion worker
+UPLOAD_SPOOL_DIR = os.getenv("UPLOAD_SPOOL_DIR", "uploads/spool")
+
+# Resumable uploads: part files and manifests, and how long unfinished ones are kept
+RESUMABLE_UPLOAD_DIR = os.getenv("RESUMABLE_UPLOAD_DIR", "uploads/resumable")
+RESUMABLE_PART_SIZE = int(os.getenv("RESUMABLE_PART_SIZE", str(8 * 1024 * 1024)))
+RESUMABLE_UPLOAD_TTL_HOURS = float(os.getenv("RESUMABLE_UPLOAD_TTL_HOURS", "24"))
+# Limits that keep a client from filling the disk or announcing absurd part numbers
+RESUMABLE_MAX_PART_SIZE = int(os.getenv("RESUMABLE_MAX_PART_SIZE", str(64 * 1024 * 1024)))
+RESUMABLE_MAX_PARTS = int(os.getenv("RESUMABLE_MAX_PARTS", "10000"))
+
+class UploadTooLarge(ValueError):
+    """An upload (or one part of it) exceeded its size limit."""
+
+async def _read_upload(file) -> AsyncIterator[bytes]:
+    """Read an UploadFile in UPLOAD_CHUNK_SIZE pieces."""
+    while True:
+        chunk = await file.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+        yield chunk
+
+async def spool_upload(file, path: str) -> Tuple[int, str]:
+    """
+    Stream an UploadFile to disk chunk by chunk.
+    
+    Args:
+        file: FastAPI UploadFile (anything with an async read(size))
+        path: Destination file path
+    
+    Returns:
+        Tuple of (file size in bytes, SHA-256 hex digest of the content)
+    """
+    return await spool_stream(_read_upload(file), path)
+
+async def spool_stream(chunks: AsyncIterator[bytes], path: str, max_size: Optional[int] = None) -> Tuple[int, str]:
+    """
+    Write an async stream of byte chunks to disk, hashing it on the way.
+    
+    Args:
+        chunks: Async iterator of bytes (e.g. Request.stream())
+        path: Destination file path
+        max_size: Abort with UploadTooLarge (removing the file) once more bytes arrive
+    
+    Returns:
+        Tuple of (file size in bytes, SHA-256 hex digest of the content)
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        await asyncio.to_thread(os.makedirs, directory, exist_ok=True)
+    
+    sha256 = hashlib.sha256()
+    size = 0
+    buffer = await asyncio.to_thread(open, path, "wb")
+    try:
+        # Request streams arrive in small pieces - write them in UPLOAD_CHUNK_SIZE blocks
+        pending = bytearray()
+        async for chunk in chunks:
+            if not chunk:
+                continue
+            size += len(chunk)
+            if max_size is not None and size > max_size:
+                raise UploadTooLarge(f"Upload exceeds the limit of {max_size} bytes")
+            sha256.update(chunk)
+            pending += chunk
+            if len(pending) >= UPLOAD_CHUNK_SIZE:
+                await asyncio.to_thread(buffer.write, bytes(pending))
+                pending.clear()
+        if pending:
+            await asyncio.to_thread(buffer.write, bytes(pending))
+        await asyncio.to_thread(buffer.close)
+    except BaseException:
+        # Don't leave a truncated file behind (also when the client disconnects)
+        await asyncio.to_thread(_discard_file, buffer, path)
+        raise
+    return size, sha256.hexdigest()
+
+def _discard_file(buffer, path: str):
+    """Close and delete a partially written file."""
+    buffer.close()
+    if os.path.exists(path):
+        os.remove(path)
+
+def spool_path_for(filename: str) -> str:
+    """Unique path in the spool directory, keeping the file extension."""
+    extension = os.path.splitext(filename or "")[1]
+    return os.path.join(UPLOAD_SPOOL_DIR, f"{uuid.uuid4().hex}{extension}")
+
+def remove_spooled_file(path: str):
+    """Delete a spooled upload once it is no longer needed."""
+    try:
+        if path and os.path.exists(path):
+            os.remove(path)
+    except OSError as e:
+        print(f"Could not remove spooled upload {path}: {e}")
+
+def _upload_dir(upload_id: str) -> str:
+    """Directory holding the parts and manifest of a resumable upload."""
+    # Upload ids are generated hex strings - reject anything that could escape the directory
+    if not upload_id or not all(c in "0123456789abcdef" for c in upload_id):
+        raise ValueError("Invalid upload id")
+    return os.path.join(RESUMABLE_UPLOAD_DIR, upload_id)
+
+def _part_path(upload_id: str, part_number: int) -> str:
+    """File holding one numbered part of a resumable upload."""
+    return os.path.join(_upload_dir(upload_id), f"part_{part_number:06d}")
+
+def save_manifest(manifest: Dict):
+    """Write a resumable upload manifest atomically."""
+    path = os.path.join(_upload_dir(manifest["upload_id"]), "manifest.json")
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, path)
+
+def create_resumable_upload(user_id: int, filename: str, file_size: Optional[int] = None,
+                            part_size: Optional[int] = None) -> Dict:
+    """
+    Start a resumable upload.
+    
+    Args:
+        user_id: Owner of the upload
+        filename: Original filename
+        file_size: Expected total size in bytes (checked on completion when given)
+        part_size: Part size for the client - also the largest part accepted
+    
+    Returns:
+        The upload manifest
+    
+    Raises:
+        ValueError: part_size or file_size outside the resumable upload limits
+    """
+    part_size = part_size or RESUMABLE_PART_SIZE
+    if not 0 < part_size <= RESUMABLE_MAX_PART_SIZE:
+        raise ValueError(f"part_size must be between 1 and {RESUMABLE_MAX_PART_SIZE} bytes")
+    if file_size is not None:
+        if file_size < 0:
+            raise ValueError("file_size must not be negative")
+        if -(-file_size // part_size) > RESUMABLE_MAX_PARTS:
+            raise ValueError(f"Uploads are limited to {RESUMABLE_MAX_PARTS} parts of {part_size} bytes")
+    cleanup_stale_uploads()
+    upload_id = uuid.uuid4().hex
+    os.makedirs(_upload_dir(upload_id), exist_ok=True)
+    manifest = {
+        "upload_id": upload_id,
+        "user_id": user_id,
+        "filename": filename,
+        "file_size": file_size,
+        "part_size": part_size,
+        "status": "uploading",
+        "result": None,
+        "created_at": time.time(),
+    }
+    save_manifest(manifest)
+    return manifest
+
+def get_resumable_upload(upload_id: str) -> Optional[Dict]:
+    """Load the manifest of a resumable upload (None if unknown)."""
+    try:
+        path = os.path.join(_upload_dir(upload_id), "manifest.json")
+    except ValueError:
+        return None
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+def list_upload_parts(upload_id: str) -> List[Dict]:
+    """Parts received so far as {"part_number", "size"} dicts, in order."""
+    parts = []
+    directory = _upload_dir(upload_id)
+    for name in sorted(os.listdir(directory)):
+        if name.startswith("part_") and name[5:].isdigit():
+            parts.append({"part_number": int(name[5:]), "size": os.path.getsize(os.path.join(directory, name))})
+    # Numeric order - file names are zero-padded to a fixed width only
+    parts.sort(key=lambda part: part["part_number"])
+    return parts
+
+async def save_upload_part(upload_id: str, part_number: int, chunks: AsyncIterator[bytes],
+                           max_size: Optional[int] = None) -> Dict:
+    """
+    Store one numbered part. Re-sending a part replaces it, so retries are safe.
+    
+    Args:
+        upload_id: Resumable upload the part belongs to
+        part_number: 1-based part number (check it with max_part_number() first)
+        chunks: Async iterator of the part's bytes
+        max_size: Largest part accepted (the upload's part_size)
+    
+    Returns:
+        {"part_number", "size", "sha256"} of the stored part
+    
+    Raises:
+        UploadTooLarge: The part is larger than max_size (nothing is stored)
+    """
+    path = _part_path(upload_id, part_number)
+    # Write under a temporary name so an interrupted part never counts as received
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    size, digest = await spool_stream(chunks, tmp_path, max_size)
+    await asyncio.to_thread(os.replace, tmp_path, path)
+    return {"part_number": part_number, "size": size, "sha256": digest}
+
+def max_part_number(manifest: Dict) -> int:
+    """Highest part number accepted for an upload (from its announced size, else the hard cap)."""
+    if manifest.get("file_size"):
+        return min(-(-manifest["file_size"] // manifest["part_size"]), RESUMABLE_MAX_PARTS)
+    return RESUMABLE_MAX_PARTS
+
+def missing_upload_parts(manifest: Dict, parts: List[Dict]) -> List[int]:
+    """Part numbers that still have to be sent before the upload can complete."""
+    numbers = [part["part_number"] for part in parts]
+    expected = max(numbers) if numbers else 0
+    if manifest.get("file_size"):
+        expected = max(expected, -(-manifest["file_size"] // manifest["part_size"]))
+    return sorted(set(range(1, expected + 1)) - set(numbers))
+
+def assemble_upload(upload_id: str, path: str) -> Tuple[int, str]:
+    """
+    Concatenate the parts of an upload into one file, hashing it on the way.
+    
+    Returns:
+        Tuple of (file size in bytes, SHA-256 hex digest of the content)
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    
+    sha256 = hashlib.sha256()
+    size = 0
+    try:
+        with open(path, "wb") as out:
+            for part in list_upload_parts(upload_id):
+                with open(_part_path(upload_id, part["part_number"]), "rb") as f:
+                    while True:
+                        chunk = f.read(UPLOAD_CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        sha256.update(chunk)
+                        size += len(chunk)
+                        out.write(chunk)
+    except Exception:
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+    return size, sha256.hexdigest()
+
+def remove_upload_parts(upload_id: str):
+    """Delete the part files of a finished upload, keeping its manifest."""
+    directory = _upload_dir(upload_id)
+    for name in os.listdir(directory):
+        if name.startswith("part_"):
+            os.remove(os.path.join(directory, name))
+
+def cleanup_stale_uploads():
+    """Remove resumable uploads that saw no activity for RESUMABLE_UPLOAD_TTL_HOURS."""
+    if not os.path.isdir(RESUMABLE_UPLOAD_DIR):
+        return
+    cutoff = time.time() - RESUMABLE_UPLOAD_TTL_HOURS * 3600
+    for name in os.listdir(RESUMABLE_UPLOAD_DIR):
+        directory = os.path.join(RESUMABLE_UPLOAD_DIR, name)
+        try:
+            if os.path.isdir(directory) and os.path.getmtime(directory) < cutoff:
+                shutil.rmtree(directory, ignore_errors=True)
+        except OSError:
+            pass
@@ -1,121 +1,569 @@
-from langchain_huggingface import HuggingFaceEmbeddings  # type: ignore
-try:
-    from langchain_qdrant import QdrantVectorStore  # type: ignore
-    # Use Qdrant as alias for backward compatibility
-    Qdrant = QdrantVectorStore
-    USING_NEW_QDRANT = True
-except ImportError:
-    # Fallback to deprecated version
-    from langchain_community.vectorstores import Qdrant  # type: ignore
-    USING_NEW_QDRANT = False
-    print("Warning: Using deprecated langchain_community.vectorstores.Qdrant. Install langchain-qdrant for better compatibility.")
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from qdrant_client import QdrantClient  # type: ignore
-from qdrant_client.http import models  # type: ignore
 import os
+import threading
+import time
 from dotenv import load_dotenv  # type: ignore
 
 # Load environment variables from .env file
 load_dotenv()
 
-# Use fast, lightweight embeddings
-embeddings = HuggingFaceEmbeddings(
-    model_name="sentence-transformers/all-MiniLM-L6-v2",
-    model_kwargs={'device': 'cpu'},  # Faster on CPU for small models
-    encode_kwargs={'normalize_embeddings': False}  # Skip normalization for speed
-)
+# sentence-transformers/torch, qdrant-client and LangChain's Qdrant integration are
+# imported on first use, so importing this module (and app.main) stays fast and the
+# server can bind its port before any model is loaded.
+USING_NEW_QDRANT = None
+
+def get_vectorstore_class():
+    """LangChain's Qdrant vectorstore class (imported on first use)."""
+    global USING_NEW_QDRANT
+    try:
+        from langchain_qdrant import QdrantVectorStore  # type: ignore
+        USING_NEW_QDRANT = True
+        return QdrantVectorStore
+    except ImportError:
+        # Fallback to deprecated version
+        from langchain_community.vectorstores import Qdrant  # type: ignore
+        if USING_NEW_QDRANT is None:
+            print("Warning: Using deprecated langchain_community.vectorstores.Qdrant. Install langchain-qdrant for better compatibility.")
+        USING_NEW_QDRANT = False
+        return Qdrant
+
+EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+
+# "huggingface" (sentence-transformers on torch) or "onnx" (ONNX Runtime, int8 quantized)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "huggingface").lower()
+
+def create_base_embeddings(backend: str = EMBEDDING_BACKEND):
+    """Create the embedding model for the selected backend."""
+    if backend == "onnx":
+        from .onnx_embeddings import OnnxEmbeddings
+        return OnnxEmbeddings(EMBEDDING_MODEL_NAME)
+    from langchain_huggingface import HuggingFaceEmbeddings  # type: ignore
+    # Use fast, lightweight embeddings
+    return HuggingFaceEmbeddings(
+        model_name=EMBEDDING_MODEL_NAME,
+        model_kwargs={'device': 'cpu'},  # Faster on CPU for small models
+        encode_kwargs={'normalize_embeddings': False}  # Skip normalization for speed
+    )
+
+_embeddings = None
+_embeddings_lock = threading.Lock()
+
+def get_embeddings():
+    """Get the shared embedding model, loading it on first use."""
+    global _embeddings
+    if _embeddings is None:
+        with _embeddings_lock:
+            if _embeddings is None:
+                embeddings = create_base_embeddings()
+                # Serve previously embedded chunks from the on-disk cache so rebuilds only embed new text
+                if os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true":
+                    from .embedding_cache import CachedEmbeddings
+                    # Quantized vectors differ slightly, so each backend variant gets its own cache key
+                    cache_key = f"{EMBEDDING_MODEL_NAME}:{getattr(embeddings, 'variant', 'torch')}"
+                    embeddings = CachedEmbeddings(embeddings, cache_key)
+                # Repeated questions reuse their vector instead of running the model again
+                from .embedding_cache import QUERY_EMBEDDING_CACHE_SIZE, QueryCachedEmbeddings
+                if QUERY_EMBEDDING_CACHE_SIZE > 0:
+                    embeddings = QueryCachedEmbeddings(embeddings, QUERY_EMBEDDING_CACHE_SIZE)
+                _embeddings = embeddings
+    return _embeddings
+
+def warm_up_embeddings():
+    """Load the embedding model and embed one query so the first real request doesn't pay for it."""
+    try:
+        start = time.perf_counter()
+        get_embeddings().embed_query("warm up")
+        print(f"Embedding model warmed up in {time.perf_counter() - start:.1f}s")
+    except Exception as e:
+        print(f"Warning: Embedding model warm-up failed: {e}")
+
+def get_embedding_cache_stats():
+    """Hit/miss counts of the embedding cache, or None when it is disabled or not loaded yet."""
+    if hasattr(_embeddings, "stats"):
+        try:
+            return _embeddings.stats()
+        except Exception as e:
+            print(f"Error reading embedding cache stats: {e}")
+    return None
+
+def get_query_cache_stats():
+    """Hit/miss counts of the query embedding cache, or None when it is disabled or not loaded yet."""
+    if hasattr(_embeddings, "query_cache_stats"):
+        return _embeddings.query_cache_stats()
+    return None
+
+# "qdrant" (Qdrant Cloud / embedded Qdrant) or "numpy" (in-process exact search over
+# memory-mapped per-user matrices, see numpy_store.py - no network hop for small vaults)
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "qdrant").lower()
+
+def is_numpy_backend() -> bool:
+    """True when vectors are kept in the in-process NumPy index instead of Qdrant."""
+    return VECTOR_BACKEND == "numpy"
 
 # Qdrant Cloud Configuration
 QDRANT_URL = os.getenv("QDRANT_URL", "")  # Your Qdrant Cloud URL
 QDRANT_API_KEY = os.getenv("QDRANT_API_KEY", "")  # Your Qdrant Cloud API Key
 
+# Without Qdrant Cloud: directory of the embedded on-disk Qdrant (":memory:" = nothing persisted)
+QDRANT_LOCAL_PATH = os.getenv("QDRANT_LOCAL_PATH", "qdrant_data")
+
+def is_qdrant_in_memory() -> bool:
+    """True when vectors live only in the client object and are lost with it."""
+    return not (QDRANT_URL and QDRANT_API_KEY) and QDRANT_LOCAL_PATH == ":memory:"
+
 # Debug: Print if credentials are loaded
-if QDRANT_URL and QDRANT_API_KEY:
+if is_numpy_backend():
+    print("Vector backend: in-process NumPy index (Qdrant is not used)")
+elif QDRANT_URL and QDRANT_API_KEY:
     print(f"Qdrant Cloud configured: URL={QDRANT_URL[:50]}...")
+elif is_qdrant_in_memory():
+    print("Warning: QDRANT_URL and QDRANT_API_KEY not found in environment variables. Using in-memory Qdrant.")
 else:
-    print("Warning: QDRANT_URL and QDRANT_API_KEY not found in environment variables. Using local Qdrant.")
+    print(f"Qdrant Cloud not configured - using local on-disk Qdrant at: {QDRANT_LOCAL_PATH}")
+
+# Optional connection settings for Qdrant Cloud (unset = qdrant-client defaults)
+QDRANT_TIMEOUT = os.getenv("QDRANT_TIMEOUT")  # seconds per request
+QDRANT_POOL_SIZE = os.getenv("QDRANT_POOL_SIZE")  # max pooled keep-alive connections
+
+# How long a collection exists / doesn't exist answer is trusted without asking Qdrant again
+COLLECTION_CACHE_TTL = float(os.getenv("QDRANT_COLLECTION_CACHE_TTL", "300"))
+
+_qdrant_client = None
+_qdrant_client_lock = threading.Lock()
+
+# collection name -> (exists, checked_at), only for the shared client
+_collection_cache = {}
+# Collections known to have the document_id index and only document_id-tagged points,
+# so deletes by document skip the index and untagged-points checks (shared client only)
+_targeted_delete_ready = set()
+_collection_cache_lock = threading.Lock()
+
+# Embedded Qdrant (QdrantLocal) does no locking of its own - concurrent upserts, searches and
+# deletes corrupt its in-memory segments - so every call on an embedded client holds this lock
+_embedded_qdrant_lock = threading.RLock()
+_embedded_client_class = None
+
+def _create_embedded_client(**kwargs):
+    """Embedded (on-disk or in-memory) QdrantClient whose calls are serialized."""
+    global _embedded_client_class
+    if _embedded_client_class is None:
+        from qdrant_client import QdrantClient  # type: ignore
+        
+        class SerializedQdrantClient(QdrantClient):
+            """QdrantClient that runs one public method at a time (LangChain needs a QdrantClient instance)."""
+            
+            def __getattribute__(self, name):
+                attribute = super().__getattribute__(name)
+                if name.startswith("_") or not callable(attribute):
+                    return attribute
+                
+                def serialized(*args, **kwargs):
+                    with _embedded_qdrant_lock:
+                        return attribute(*args, **kwargs)
+                return serialized
+        
+        _embedded_client_class = SerializedQdrantClient
+    return _embedded_client_class(**kwargs)
 
 def get_qdrant_client():
-    """Get Qdrant client (cloud or local)."""
-    if QDRANT_URL and QDRANT_API_KEY:
-        # Use Qdrant Cloud
-        return QdrantClient(
-            url=QDRANT_URL,
-            api_key=QDRANT_API_KEY,
-        )
-    else:
-        # Fallback to local Qdrant (for development)
-        print("Warning: QDRANT_URL and QDRANT_API_KEY not set. Using local Qdrant.")
-        return QdrantClient(location=":memory:")
+    """
+    Get Qdrant client (cloud or local).
+    
+    The Qdrant Cloud client is created once per process and shared, so its
+    HTTP connections are kept alive and reused across requests. The local
+    on-disk client is shared too - embedded Qdrant locks its directory, so
+    only one client (and one server process) can open it. In-memory clients
+    are created per call: their data lives inside the client object, and a
+    fresh one keeps rebuilds from stacking duplicates.
+    
+    Embedded clients (on-disk and in-memory) are shared by ingestion workers,
+    the hybrid-search executor and request threads, so their calls are
+    serialized behind one lock. The on-disk directory can be opened by one
+    process only: run a single uvicorn worker, and stop the server before
+    running scripts such as migrate_to_shared_collection.py against it.
+    """
+    global _qdrant_client
+    from qdrant_client import QdrantClient  # type: ignore
+    if is_qdrant_in_memory():
+        print("Warning: QDRANT_URL and QDRANT_API_KEY not set. Using in-memory Qdrant.")
+        return _create_embedded_client(location=":memory:")
+    
+    if _qdrant_client is None:
+        with _qdrant_client_lock:
+            if _qdrant_client is None:
+                if QDRANT_URL and QDRANT_API_KEY:
+                    # Use Qdrant Cloud
+                    options = {}
+                    if QDRANT_TIMEOUT:
+                        options["timeout"] = int(QDRANT_TIMEOUT)
+                    if QDRANT_POOL_SIZE:
+                        options["pool_size"] = int(QDRANT_POOL_SIZE)
+                    _qdrant_client = QdrantClient(
+                        url=QDRANT_URL,
+                        api_key=QDRANT_API_KEY,
+                        **options,
+                    )
+                else:
+                    # Embedded Qdrant persisted to disk (self-hosted / development)
+                    os.makedirs(QDRANT_LOCAL_PATH, exist_ok=True)
+                    # Ingestion workers and request threads share the client (calls serialized, see above)
+                    _qdrant_client = _create_embedded_client(path=QDRANT_LOCAL_PATH, force_disable_check_same_thread=True)
+                    # Flush and release the storage lock before the interpreter tears down
+                    import atexit
+                    atexit.register(close_qdrant_client)
+    return _qdrant_client
+
+def close_qdrant_client():
+    """Close the shared Qdrant client (the next get_qdrant_client() opens a new one)."""
+    global _qdrant_client
+    with _qdrant_client_lock:
+        client, _qdrant_client = _qdrant_client, None
+    invalidate_collection_cache()
+    if client is not None:
+        try:
+            client.close()
+        except Exception as e:
+            print(f"Warning: Error closing Qdrant client: {e}")
+
+def _set_collection_cached(client, collection_name: str, exists: bool):
+    """Record whether a collection exists (only the shared client's answers are cached)."""
+    if client is not None and client is _qdrant_client:
+        with _collection_cache_lock:
+            _collection_cache[collection_name] = (exists, time.monotonic())
+
+def invalidate_collection_cache(collection_name: str = None):
+    """Forget cached collection state (one collection, or all when no name is given)."""
+    with _collection_cache_lock:
+        if collection_name is None:
+            _collection_cache.clear()
+            _targeted_delete_ready.clear()
+        else:
+            _collection_cache.pop(collection_name, None)
+            _targeted_delete_ready.discard(collection_name)
+
+def _set_targeted_delete_ready(client, collection_name: str):
+    """Remember that a collection is indexed and fully tagged by document_id (shared client only)."""
+    if client is not None and client is _qdrant_client:
+        with _collection_cache_lock:
+            _targeted_delete_ready.add(collection_name)
+
+def _is_targeted_delete_ready(client, collection_name: str) -> bool:
+    if client is not _qdrant_client:
+        return False
+    with _collection_cache_lock:
+        return collection_name in _targeted_delete_ready
+
+def collection_exists(client, collection_name: str) -> bool:
+    """
+    Check whether a collection exists, answering from the in-memory cache when possible.
+    
+    Args:
+        client: Qdrant client
+        collection_name: Collection to look for
+        
+    Returns:
+        True if the collection exists
+    """
+    if client is _qdrant_client:
+        with _collection_cache_lock:
+            cached = _collection_cache.get(collection_name)
+        if cached and time.monotonic() - cached[1] < COLLECTION_CACHE_TTL:
+            return cached[0]
+    
+    try:
+        exists = client.collection_exists(collection_name)
+    except AttributeError:
+        # Older qdrant-client without collection_exists: scan the collection list
+        collections = client.get_collections().collections
+        exists = any(col.name == collection_name for col in collections)
+    _set_collection_cached(client, collection_name, exists)
+    return exists
+
+# Storage layout: "per_user" (one collection per user) or "shared" (one collection
+# for everyone, each point tagged with its user_id and every query filtered on it)
+QDRANT_LAYOUT = os.getenv("QDRANT_LAYOUT", "per_user").lower()
+QDRANT_SHARED_COLLECTION = os.getenv("QDRANT_SHARED_COLLECTION", "documents")
+
+def is_shared_layout() -> bool:
+    """True when all users share one collection."""
+    return QDRANT_LAYOUT == "shared"
 
 def get_collection_name(user_id: int) -> str:
     """Get collection name for user."""
+    if is_shared_layout():
+        return QDRANT_SHARED_COLLECTION
     return f"user_{user_id}_documents"
 
-def create_vectorstore(docs, user_id: int):
-    """Create a new vectorstore from documents using Qdrant Cloud."""
-    # Use smaller chunks for faster retrieval
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=500,  # Smaller chunks = faster processing
-        chunk_overlap=50,
-        length_function=len,
-    )
+# LangChain stores chunk metadata under the "metadata" payload key
+DOCUMENT_ID_PAYLOAD_KEY = "metadata.document_id"
+USER_ID_PAYLOAD_KEY = "metadata.user_id"
+
+def ensure_user_id_index(client, collection_name: str):
+    """Create the payload index on user_id that every query in the shared layout filters on."""
+    from qdrant_client.http import models  # type: ignore
+    try:
+        try:
+            # user_id is only matched exactly, so skip the range structures
+            schema = models.IntegerIndexParams(type=models.IntegerIndexType.INTEGER, lookup=True, range=False)
+        except (AttributeError, TypeError, ValueError):
+            # Older qdrant-client without parameterized integer indexes
+            schema = models.PayloadSchemaType.INTEGER
+        client.create_payload_index(
+            collection_name=collection_name,
+            field_name=USER_ID_PAYLOAD_KEY,
+            field_schema=schema,
+        )
+    except Exception as e:
+        print(f"Warning: Could not create user_id payload index on {collection_name}: {e}")
+
+def user_filter(user_id: int, extra=None):
+    """
+    Qdrant filter restricting a query to one user's points.
     
-    # Split documents into smaller chunks
-    split_docs = text_splitter.split_documents(docs)
+    Args:
+        user_id: Owner of the points
+        extra: Optional filter (Filter or condition) that must match as well
+    """
+    from qdrant_client.http import models  # type: ignore
+    must = [models.FieldCondition(key=USER_ID_PAYLOAD_KEY, match=models.MatchValue(value=user_id))]
+    if extra is not None:
+        must.append(extra)
+    return models.Filter(must=must)
+
+class ScopedVectorStore:
+    """
+    A user's view of a Qdrant collection.
     
-    # Ensure metadata includes source and page information for citations
-    for i, doc in enumerate(split_docs):
-        if not hasattr(doc, 'metadata') or not doc.metadata:
-            doc.metadata = {}
-        
-        # Preserve source information
-        if 'source' not in doc.metadata:
-            # Try to extract from original metadata or use index
-            doc.metadata['source'] = doc.metadata.get('source', f'Document_{i+1}')
+    Wraps LangChain's Qdrant vectorstore. In the shared layout, documents
+    added through it are tagged with the user's id and every search
+    (including retrievers made with as_retriever) is filtered on it. When
+    search parameters are configured (HNSW ef, quantization rescoring) they
+    are passed to every search. Everything else is passed through.
+    """
+    
+    def __init__(self, vectorstore, user_id: int = None, search_params=None):
+        """
+        Args:
+            vectorstore: LangChain Qdrant vectorstore to wrap
+            user_id: Tenant to tag and filter on (None = no tenant filter)
+            search_params: Qdrant SearchParams used by default for every search
+        """
+        self._vectorstore = vectorstore
+        self.user_id = user_id
+        self.search_params = search_params
+    
+    def __getattr__(self, name):
+        return getattr(self._vectorstore, name)
+    
+    def _search_kwargs(self, filter, kwargs):
+        if self.user_id is not None:
+            filter = user_filter(self.user_id, filter)
+        if self.search_params is not None:
+            kwargs.setdefault("search_params", self.search_params)
+        return {**kwargs, "filter": filter}
+    
+    def _tag(self, metadatas):
+        if self.user_id is not None:
+            for metadata in metadatas:
+                metadata['user_id'] = self.user_id
+    
+    def add_documents(self, documents, **kwargs):
+        self._tag([doc.metadata for doc in documents])
+        return self._vectorstore.add_documents(documents, **kwargs)
+    
+    def add_texts(self, texts, metadatas=None, **kwargs):
+        texts = list(texts)
+        metadatas = [dict(m or {}) for m in metadatas] if metadatas else [{} for _ in texts]
+        self._tag(metadatas)
+        return self._vectorstore.add_texts(texts, metadatas=metadatas, **kwargs)
+    
+    def similarity_search(self, query, k=4, filter=None, **kwargs):
+        return self._vectorstore.similarity_search(query, k=k, **self._search_kwargs(filter, kwargs))
+    
+    def similarity_search_with_score(self, query, k=4, filter=None, **kwargs):
+        return self._vectorstore.similarity_search_with_score(query, k=k, **self._search_kwargs(filter, kwargs))
+    
+    def similarity_search_by_vector(self, embedding, k=4, filter=None, **kwargs):
+        return self._vectorstore.similarity_search_by_vector(embedding, k=k, **self._search_kwargs(filter, kwargs))
+    
+    def max_marginal_relevance_search(self, query, k=4, fetch_k=20, lambda_mult=0.5, filter=None, **kwargs):
+        return self._vectorstore.max_marginal_relevance_search(
+            query, k=k, fetch_k=fetch_k, lambda_mult=lambda_mult, **self._search_kwargs(filter, kwargs)
+        )
+    
+    def as_retriever(self, **kwargs):
+        # The retriever searches the wrapped store directly, so filter and params go into its search kwargs
+        search_kwargs = dict(kwargs.pop("search_kwargs", None) or {})
+        search_kwargs = self._search_kwargs(search_kwargs.pop("filter", None), search_kwargs)
+        return self._vectorstore.as_retriever(search_kwargs=search_kwargs, **kwargs)
+
+def open_vectorstore(client, user_id: int):
+    """LangChain vectorstore over the user's collection (scoped to the user in the shared layout)."""
+    vectorstore = get_vectorstore_class()(client, get_collection_name(user_id), get_embeddings())
+    # Embedded Qdrant always searches exactly and ignores search params
+    search_params = get_search_params() if QDRANT_URL and QDRANT_API_KEY else None
+    if is_shared_layout() or search_params is not None:
+        return ScopedVectorStore(vectorstore, user_id if is_shared_layout() else None, search_params)
+    return vectorstore
+
+def ensure_document_id_index(client, collection_name: str):
+    """Create the payload index used to find a document's points."""
+    from qdrant_client.http import models  # type: ignore
+    if _embedded_client_class is not None and isinstance(client, _embedded_client_class):
+        # Embedded Qdrant has no payload indexes (it filters by scanning)
+        return
+    try:
+        client.create_payload_index(
+            collection_name=collection_name,
+            field_name=DOCUMENT_ID_PAYLOAD_KEY,
+            field_schema=models.PayloadSchemaType.INTEGER,
+        )
+    except Exception as e:
+        # Index creation is idempotent on Qdrant Cloud; don't fail indexing over it
+        print(f"Warning: Could not create document_id payload index on {collection_name}: {e}")
+
+def document_filter(document_id: int, user_id: int = None):
+    """Qdrant filter matching every point of one document (of one user in the shared layout)."""
+    from qdrant_client.http import models  # type: ignore
+    must = [
+        models.FieldCondition(
+            key=DOCUMENT_ID_PAYLOAD_KEY,
+            match=models.MatchValue(value=document_id),
+        )
+    ]
+    if user_id is not None and is_shared_layout():
+        must.append(models.FieldCondition(key=USER_ID_PAYLOAD_KEY, match=models.MatchValue(value=user_id)))
+    return models.Filter(must=must)
+
+# Index tuning for new collections (unset = Qdrant defaults: m=16, ef_construct=100)
+QDRANT_HNSW_M = os.getenv("QDRANT_HNSW_M")
+QDRANT_HNSW_EF_CONSTRUCT = os.getenv("QDRANT_HNSW_EF_CONSTRUCT")
+# Search-time HNSW beam width (higher = better recall, slower)
+QDRANT_SEARCH_EF = os.getenv("QDRANT_SEARCH_EF")
+# "int8" keeps a scalar-quantized copy of the vectors in RAM (4x smaller), "none" disables it
+QDRANT_QUANTIZATION = os.getenv("QDRANT_QUANTIZATION", "none").lower()
+QDRANT_QUANTIZATION_QUANTILE = float(os.getenv("QDRANT_QUANTIZATION_QUANTILE", "0.99"))
+# Re-rank quantized candidates with the original vectors; oversampling fetches extra candidates for it
+QDRANT_RESCORE = os.getenv("QDRANT_RESCORE", "true").lower() == "true"
+QDRANT_OVERSAMPLING = float(os.getenv("QDRANT_OVERSAMPLING", "2.0"))
+# Keep the original float32 vectors on disk (with int8 quantization only the quantized copy stays in RAM)
+QDRANT_ON_DISK_VECTORS = os.getenv("QDRANT_ON_DISK_VECTORS", "false").lower() == "true"
+
+def get_collection_config(vector_size: int, hnsw_m=None, hnsw_ef_construct=None,
+                          quantization: str = None, on_disk: bool = None) -> dict:
+    """
+    Keyword arguments for client.create_collection from the index settings.
+    
+    Args:
+        vector_size: Embedding dimension
+        hnsw_m, hnsw_ef_construct, quantization, on_disk: Override the
+            QDRANT_* settings (used by the benchmark)
+    """
+    from qdrant_client.http import models  # type: ignore
+    hnsw_m = hnsw_m if hnsw_m is not None else QDRANT_HNSW_M
+    hnsw_ef_construct = hnsw_ef_construct if hnsw_ef_construct is not None else QDRANT_HNSW_EF_CONSTRUCT
+    quantization = quantization if quantization is not None else QDRANT_QUANTIZATION
+    on_disk = on_disk if on_disk is not None else QDRANT_ON_DISK_VECTORS
+    
+    config = {
+        "vectors_config": models.VectorParams(
+            size=vector_size,
+            distance=models.Distance.COSINE,
+            on_disk=on_disk or None,
+        )
+    }
+    if hnsw_m or hnsw_ef_construct:
+        config["hnsw_config"] = models.HnswConfigDiff(
+            m=int(hnsw_m) if hnsw_m else None,
+            ef_construct=int(hnsw_ef_construct) if hnsw_ef_construct else None,
+        )
+    if quantization == "int8":
+        config["quantization_config"] = models.ScalarQuantization(
+            scalar=models.ScalarQuantizationConfig(
+                type=models.ScalarType.INT8,
+                quantile=QDRANT_QUANTIZATION_QUANTILE,
+                always_ram=True,
+            )
+        )
+    return config
+
+def get_search_params(ef=None, quantization: str = None, rescore: bool = None, oversampling: float = None):
+    """
+    Qdrant SearchParams from the search settings, or None when Qdrant's defaults apply.
+    
+    Args:
+        ef, quantization, rescore, oversampling: Override the QDRANT_* settings
+    """
+    ef = ef if ef is not None else QDRANT_SEARCH_EF
+    quantization = quantization if quantization is not None else QDRANT_QUANTIZATION
+    rescore = rescore if rescore is not None else QDRANT_RESCORE
+    oversampling = oversampling if oversampling is not None else QDRANT_OVERSAMPLING
+    if not ef and quantization != "int8":
+        return None
+    
+    from qdrant_client.http import models  # type: ignore
+    quantization_params = None
+    if quantization == "int8":
+        quantization_params = models.QuantizationSearchParams(
+            rescore=rescore,
+            oversampling=oversampling if rescore else None,
+        )
+    return models.SearchParams(hnsw_ef=int(ef) if ef else None, quantization=quantization_params)
+
+def ensure_collection(client, collection_name: str):
+    """Create the Qdrant collection if it does not exist yet."""
+    if not collection_exists(client, collection_name):
+        # Create collection manually
+        # Get embedding dimension (all-MiniLM-L6-v2 has 384 dimensions)
+        # Test with first document to get embedding size
+        test_embedding = get_embeddings().embed_query("test")
+        vector_size = len(test_embedding)
         
-        # Ensure page number is preserved
-        if 'page' not in doc.metadata and hasattr(doc, 'metadata'):
-            # Try to get from original docs
-            for orig_doc in docs:
-                if hasattr(orig_doc, 'metadata') and orig_doc.metadata.get('page'):
-                    doc.metadata['page'] = orig_doc.metadata.get('page')
-                    break
+        try:
+            # HNSW, quantization and on-disk settings only apply to newly created collections
+            client.create_collection(
+                collection_name=collection_name,
+                **get_collection_config(vector_size),
+            )
+            print(f"Created Qdrant collection: {collection_name}")
+        except Exception as e:
+            # Collection might have been created by another process
+            if "already exists" not in str(e).lower():
+                print(f"Warning: Error creating collection (might already exist): {e}")
+                invalidate_collection_cache(collection_name)
+                return
+        if is_shared_layout():
+            # Every query filters on user_id
+            ensure_user_id_index(client, collection_name)
+        # Deletes and copies filter on document_id
+        ensure_document_id_index(client, collection_name)
+        _set_collection_cached(client, collection_name, True)
+        # A new collection only ever receives document_id-tagged points
+        _set_targeted_delete_ready(client, collection_name)
+
+def _vectors_changed(user_id: int):
+    """Drop indexes derived from the user's chunks (the BM25 keyword index) after a write."""
+    from .hybrid_search import invalidate_keyword_index
+    invalidate_keyword_index(user_id)
+
+def get_or_create_vectorstore(user_id: int):
+    """The user's vectorstore, creating its collection (or NumPy index) if needed."""
+    if is_numpy_backend():
+        from .numpy_store import get_numpy_store
+        return get_numpy_store(user_id, get_embeddings())
+    client = get_qdrant_client()
+    ensure_collection(client, get_collection_name(user_id))
+    return open_vectorstore(client, user_id)
+
+def create_vectorstore(docs, user_id: int):
+    """Create a new vectorstore from documents using Qdrant Cloud."""
+    from .chunking import chunk_documents
+    split_docs = chunk_documents(docs)
     
-    # Create Qdrant vectorstore
     collection_name = get_collection_name(user_id)
-    client = get_qdrant_client()
     
     # Create vectorstore manually to avoid from_documents init_from parameter issue
     try:
-        # Check if collection exists
-        collections = client.get_collections().collections
-        collection_exists = any(col.name == collection_name for col in collections)
-        
-        if not collection_exists:
-            # Create collection manually
-            from qdrant_client.http import models as rest
-            # Get embedding dimension (all-MiniLM-L6-v2 has 384 dimensions)
-            # Test with first document to get embedding size
-            test_embedding = embeddings.embed_query("test")
-            vector_size = len(test_embedding)
-            
-            try:
-                client.create_collection(
-                    collection_name=collection_name,
-                    vectors_config=rest.VectorParams(
-                        size=vector_size,
-                        distance=rest.Distance.COSINE
-                    )
-                )
-                print(f"Created Qdrant collection: {collection_name}")
-            except Exception as e:
-                # Collection might have been created by another process
-                if "already exists" not in str(e).lower():
-                    print(f"Warning: Error creating collection (might already exist): {e}")
-        
-        # Create Qdrant instance with existing client
-        vectorstore = Qdrant(client, collection_name, embeddings)
+        vectorstore = get_or_create_vectorstore(user_id)
         
         # Add documents to the vectorstore
         vectorstore.add_documents(split_docs)
@@ -124,37 +572,206 @@ def create_vectorstore(docs, user_id: int):
         print(f"Error creating Qdrant vectorstore: {e}")
         raise
     
+    _vectors_changed(user_id)
     print(f"Created Qdrant vectorstore for user {user_id} in collection: {collection_name}")
+    print(f"Embedding cache: {get_embedding_cache_stats()}")
     return vectorstore
 
+# Chunks embedded per model call and points written per Qdrant request
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+UPSERT_BATCH_SIZE = int(os.getenv("UPSERT_BATCH_SIZE", "256"))
+
+def add_chunks(vectorstore, split_docs, progress=None):
+    """
+    Embed already-split chunks and upsert them into the vectorstore's collection.
+    
+    Embedding and upserting run as separate batched passes so callers can
+    report progress for each stage.
+    
+    Args:
+        vectorstore: Qdrant vectorstore (or NumpyVectorStore) to write to
+        split_docs: Chunks to index
+        progress: Optional callback progress(stage, done, total)
+    """
+    import uuid
+    if isinstance(vectorstore, ScopedVectorStore) and vectorstore.user_id is not None:
+        # Shared collection: the user_id payload is what keeps tenants apart
+        for doc in split_docs:
+            doc.metadata['user_id'] = vectorstore.user_id
+    texts = [doc.page_content for doc in split_docs]
+    
+    vectors = []
+    for start in range(0, len(texts), EMBED_BATCH_SIZE):
+        vectors.extend(get_embeddings().embed_documents(texts[start:start + EMBED_BATCH_SIZE]))
+        if progress:
+            progress("embed", len(vectors), len(texts))
+    
+    if hasattr(vectorstore, "add_embeddings"):
+        # NumPy index: rows are appended to the memory-mapped matrix
+        for start in range(0, len(texts), UPSERT_BATCH_SIZE):
+            end = start + UPSERT_BATCH_SIZE
+            vectorstore.add_embeddings(texts[start:end], vectors[start:end], [doc.metadata for doc in split_docs[start:end]])
+            if progress:
+                progress("upsert", min(end, len(texts)), len(texts))
+        return
+    
+    from qdrant_client.http import models  # type: ignore
+    # Same payload layout LangChain's Qdrant integration reads back
+    points = [
+        models.PointStruct(
+            id=uuid.uuid4().hex,
+            vector=vector,
+            payload={"page_content": doc.page_content, "metadata": doc.metadata},
+        )
+        for doc, vector in zip(split_docs, vectors)
+    ]
+    for start in range(0, len(points), UPSERT_BATCH_SIZE):
+        vectorstore.client.upsert(
+            collection_name=vectorstore.collection_name,
+            points=points[start:start + UPSERT_BATCH_SIZE],
+            wait=True,
+        )
+        if progress:
+            progress("upsert", min(start + UPSERT_BATCH_SIZE, len(points)), len(points))
+
+# Pages split and embedded together when indexing a page stream
+INDEX_BATCH_PAGES = int(os.getenv("INDEX_BATCH_PAGES", "32"))
+
+def index_document(docs, user_id: int, document_id: int, vectorstore=None, progress=None, on_batch=None):
+    """
+    Incrementally index a single document into the user's existing collection.
+    
+    Only the given document is split and embedded; the rest of the vault is
+    left untouched. Every chunk is tagged with a ``document_id`` payload so the
+    document's points can be found again later.
+    
+    Args:
+        docs: Pages of the document - a list, or a lazy iterator such as loaders.iter_file()
+        user_id: Owner of the collection
+        document_id: Database ID of the document being indexed
+        vectorstore: Already loaded vectorstore for the user (optional)
+        progress: Optional callback progress(stage, done, total) for parse/chunk/embed/upsert
+        on_batch: Optional callback on_batch(pages, chunks) after each batch is indexed
+            (used to fill the chunk store)
+        
+    Returns:
+        The vectorstore the chunks were added to
+    """
+    from .chunking import chunk_documents
+    collection_name = get_collection_name(user_id)
+    pages_total = len(docs) if isinstance(docs, list) else None
+    pages_done = 0
+    chunks_done = 0
+    chunk_ordinals = {}  # chunk_index keeps counting across page batches
+    
+    def batch_progress(stage, done, total):
+        # Counts run across batches; stage totals are only known at the end
+        if progress:
+            progress(stage, chunks_done + done, None)
+    
+    def flush(batch):
+        nonlocal pages_done, chunks_done
+        split_docs = chunk_documents(batch, chunk_ordinals)
+        pages_done += len(batch)
+        if progress:
+            progress("parse", pages_done, pages_total)
+            progress("chunk", pages_done, pages_total)
+        add_chunks(vectorstore, split_docs, batch_progress)
+        chunks_done += len(split_docs)
+        if on_batch:
+            on_batch(batch, split_docs)
+    
+    try:
+        if vectorstore is None:
+            vectorstore = get_or_create_vectorstore(user_id)
+        
+        # Split and embed a bounded batch of pages at a time so peak memory stays flat
+        batch = []
+        for doc in docs:
+            doc.metadata['document_id'] = document_id
+            batch.append(doc)
+            if len(batch) >= INDEX_BATCH_PAGES:
+                flush(batch)
+                batch = []
+        if batch:
+            flush(batch)
+    except Exception as e:
+        print(f"Error indexing document {document_id} for user {user_id}: {e}")
+        raise
+    
+    _vectors_changed(user_id)
+    if progress:
+        for stage, done in (("parse", pages_done), ("chunk", pages_done), ("embed", chunks_done), ("upsert", chunks_done)):
+            progress(stage, done, done)
+    if not pages_done:
+        raise Exception("No content extracted from file")
+    print(f"Indexed {chunks_done} chunks from {pages_done} pages of document {document_id} into collection: {collection_name}")
+    print(f"Embedding cache: {get_embedding_cache_stats()}")
+    return vectorstore
+
+def index_chunks(split_docs, user_id: int, vectorstore=None, progress=None):
+    """
+    Add already split chunks (e.g. of several documents at once) to the user's collection.
+    
+    Embedding and upserting run in one pass over all chunks, in batches of
+    EMBED_BATCH_SIZE and UPSERT_BATCH_SIZE.
+    
+    Args:
+        split_docs: Chunks from chunking.chunk_documents(), tagged with document_id
+        user_id: Owner of the collection
+        vectorstore: Already loaded vectorstore for the user (optional)
+        progress: Optional callback progress(stage, done, total) for embed/upsert
+        
+    Returns:
+        The vectorstore the chunks were added to
+    """
+    collection_name = get_collection_name(user_id)
+    if vectorstore is None:
+        vectorstore = get_or_create_vectorstore(user_id)
+    
+    add_chunks(vectorstore, split_docs, progress)
+    _vectors_changed(user_id)
+    print(f"Indexed {len(split_docs)} chunks into collection: {collection_name}")
+    print(f"Embedding cache: {get_embedding_cache_stats()}")
+    return vectorstore
+
+def user_has_points(client, user_id: int) -> bool:
+    """Whether the shared collection holds any points of the user."""
+    # Exact: an estimate can undercount to 0 and make load_vectorstore report an empty vault
+    count = client.count(
+        collection_name=get_collection_name(user_id),
+        count_filter=user_filter(user_id),
+        exact=True,
+    ).count
+    return count > 0
+
 def load_vectorstore(user_id: int):
     """Load vectorstore from Qdrant Cloud or local."""
     try:
         collection_name = get_collection_name(user_id)
         
-        if QDRANT_URL and QDRANT_API_KEY:
-            # Load from Qdrant Cloud
+        if is_numpy_backend():
+            from .numpy_store import get_numpy_store
+            vectorstore = get_numpy_store(user_id, get_embeddings())
+            if not vectorstore.count():
+                print(f"No vector index found for user {user_id}")
+                return None
+            print(f"Loaded NumPy vector index for user {user_id} ({vectorstore.count()} chunks)")
+            return vectorstore
+        elif not is_qdrant_in_memory():
+            # Load from Qdrant Cloud or the local on-disk Qdrant
             client = get_qdrant_client()
-            # Check if collection exists
-            collections = client.get_collections().collections
-            collection_exists = any(col.name == collection_name for col in collections)
-            
-            if collection_exists:
+            if collection_exists(client, collection_name) and (not is_shared_layout() or user_has_points(client, user_id)):
                 # Load existing collection
-                # Qdrant __init__ takes positional args: (client, collection_name, embeddings)
-                vectorstore = Qdrant(
-                    client,
-                    collection_name,
-                    embeddings,
-                )
+                vectorstore = open_vectorstore(client, user_id)
                 print(f"Loaded Qdrant vectorstore for user {user_id} from collection: {collection_name}")
                 return vectorstore
             else:
                 print(f"No Qdrant collection found for user {user_id}")
                 return None
         else:
-            # Local Qdrant (in-memory) - collections don't persist, return None to rebuild
-            print(f"Local Qdrant mode - collections are in-memory only, will rebuild")
+            # In-memory Qdrant - collections don't persist, return None to rebuild
+            print(f"In-memory Qdrant mode - collections are not persisted, will rebuild")
             return None
     except Exception as e:
         print(f"Error loading Qdrant vectorstore for user {user_id}: {e}")
@@ -174,15 +791,31 @@ def save_vectorstore(vectorstore, user_id: int):
 def delete_vectorstore(user_id: int):
     """Delete vectorstore from Qdrant Cloud."""
     try:
+        if is_numpy_backend():
+            from .numpy_store import drop_numpy_store
+            deleted = drop_numpy_store(user_id)
+            _vectors_changed(user_id)
+            print(f"Deleted NumPy vector index for user {user_id}" if deleted else f"No vector index found for user {user_id}")
+            return deleted
+        
         collection_name = get_collection_name(user_id)
         client = get_qdrant_client()
         
-        # Check if collection exists
-        collections = client.get_collections().collections
-        collection_exists = any(col.name == collection_name for col in collections)
-        
-        if collection_exists:
+        if is_shared_layout() and collection_exists(client, collection_name):
+            # The collection belongs to everyone - only remove this user's points
+            from qdrant_client.http import models  # type: ignore
+            client.delete(
+                collection_name=collection_name,
+                points_selector=models.FilterSelector(filter=user_filter(user_id)),
+                wait=True,
+            )
+            _vectors_changed(user_id)
+            print(f"Deleted Qdrant points of user {user_id} from shared collection: {collection_name}")
+            return True
+        if collection_exists(client, collection_name):
             client.delete_collection(collection_name)
+            invalidate_collection_cache(collection_name)
+            _vectors_changed(user_id)
             print(f"Deleted Qdrant collection for user {user_id}: {collection_name}")
             return True
         else:
@@ -192,26 +825,173 @@ def delete_vectorstore(user_id: int):
         print(f"Error deleting Qdrant vectorstore for user {user_id}: {e}")
         return False
 
-def add_documents_to_vectorstore(vectorstore, docs, user_id: int):
-    """Add new documents to existing Qdrant vectorstore."""
+def _delete_document_rows(user_id: int, document_id: int):
+    """NumPy backend counterpart of delete_document_vectors."""
+    from .numpy_store import get_numpy_store
+    try:
+        store = get_numpy_store(user_id)
+        if not store.count():
+            print(f"No vector index found for user {user_id}")
+            return None
+        if store.count({"document_id": None}):
+            print(f"Vector index of user {user_id} has untagged chunks, targeted delete not possible")
+            return None
+        deleted = store.remove_where({"document_id": document_id})
+        _vectors_changed(user_id)
+        print(f"Deleted {deleted} chunks of document {document_id} from the vector index of user {user_id}")
+        return deleted
+    except Exception as e:
+        print(f"Error deleting vectors of document {document_id} for user {user_id}: {e}")
+        return None
+
+def _copy_document_rows(user_id: int, source_document_id: int, document_id: int, source: str):
+    """NumPy backend counterpart of copy_document_vectors."""
+    from .numpy_store import get_numpy_store
     try:
-        # Split documents
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=500,
-            chunk_overlap=50,
-            length_function=len,
+        copied = get_numpy_store(user_id).copy_where(
+            {"document_id": source_document_id},
+            {"document_id": document_id, "source": source},
+        )
+        if not copied:
+            print(f"No chunks found for document {source_document_id} in the vector index of user {user_id}")
+            return None
+        _vectors_changed(user_id)
+        print(f"Copied {copied} chunks of document {source_document_id} to document {document_id} for user {user_id}")
+        return copied
+    except Exception as e:
+        print(f"Error copying vectors of document {source_document_id} for user {user_id}: {e}")
+        return None
+
+def delete_document_vectors(user_id: int, document_id: int, vectorstore=None):
+    """
+    Delete one document's points from the user's collection by payload filter.
+    
+    Args:
+        user_id: Owner of the collection
+        document_id: Database ID of the deleted document
+        vectorstore: Already loaded vectorstore for the user (optional)
+        
+    Returns:
+        Number of points deleted, or None if a targeted delete is not possible
+        (no collection, or points indexed before document_id tagging existed)
+        and the caller has to rebuild instead.
+    """
+    if is_numpy_backend():
+        return _delete_document_rows(user_id, document_id)
+    
+    from qdrant_client.http import models  # type: ignore
+    try:
+        collection_name = get_collection_name(user_id)
+        client = vectorstore.client if vectorstore is not None else get_qdrant_client()
+        
+        if not collection_exists(client, collection_name):
+            print(f"Collection {collection_name} does not exist for user {user_id}")
+            return None
+        
+        if not _is_targeted_delete_ready(client, collection_name):
+            # Points from before document_id tagging can't be targeted
+            untagged_filter = models.Filter(
+                must=[models.IsEmptyCondition(is_empty=models.PayloadField(key=DOCUMENT_ID_PAYLOAD_KEY))]
+            )
+            if is_shared_layout():
+                untagged_filter = user_filter(user_id, untagged_filter)
+            untagged = client.count(
+                collection_name=collection_name,
+                count_filter=untagged_filter,
+                exact=True,
+            ).count
+            if untagged:
+                print(f"Collection {collection_name} has {untagged} untagged points, targeted delete not possible")
+                return None
+            # Collections created before the index existed get it once; new points are always tagged
+            ensure_document_id_index(client, collection_name)
+            if not is_shared_layout():
+                _set_targeted_delete_ready(client, collection_name)
+        
+        points_filter = document_filter(document_id, user_id)
+        deleted = client.count(collection_name=collection_name, count_filter=points_filter, exact=True).count
+        client.delete(
+            collection_name=collection_name,
+            points_selector=models.FilterSelector(filter=points_filter),
+            wait=True,
         )
-        split_docs = text_splitter.split_documents(docs)
+        _vectors_changed(user_id)
+        print(f"Deleted {deleted} points of document {document_id} from collection: {collection_name}")
+        return deleted
+    except Exception as e:
+        print(f"Error deleting vectors of document {document_id} for user {user_id}: {e}")
+        return None
+
+def copy_document_vectors(user_id: int, source_document_id: int, document_id: int, source: str, vectorstore=None):
+    """
+    Reuse an already indexed document's chunks and vectors for a new document.
+    
+    Used when a byte-identical file is uploaded again: the existing points are
+    copied with the new document_id and filename, so nothing is parsed or embedded.
+    
+    Args:
+        user_id: Owner of the collection
+        source_document_id: Document whose points are copied
+        document_id: Database ID of the new (duplicate) document
+        source: Filename shown in citations for the new document
+        vectorstore: Already loaded vectorstore for the user (optional)
+        
+    Returns:
+        Number of points copied, or None if there was nothing to copy
+    """
+    if is_numpy_backend():
+        return _copy_document_rows(user_id, source_document_id, document_id, source)
+    
+    from qdrant_client.http import models  # type: ignore
+    import uuid
+    try:
+        collection_name = get_collection_name(user_id)
+        client = vectorstore.client if vectorstore is not None else get_qdrant_client()
         
-        # Ensure metadata
-        for i, doc in enumerate(split_docs):
-            if not hasattr(doc, 'metadata') or not doc.metadata:
-                doc.metadata = {}
-            if 'source' not in doc.metadata:
-                doc.metadata['source'] = doc.metadata.get('source', f'Document_{i+1}')
+        copied = 0
+        offset = None
+        while True:
+            records, offset = client.scroll(
+                collection_name=collection_name,
+                scroll_filter=document_filter(source_document_id, user_id),
+                limit=UPSERT_BATCH_SIZE,
+                offset=offset,
+                with_payload=True,
+                with_vectors=True,
+            )
+            if records:
+                points = []
+                for record in records:
+                    payload = dict(record.payload or {})
+                    metadata = dict(payload.get("metadata") or {})
+                    metadata["document_id"] = document_id
+                    metadata["source"] = source
+                    payload["metadata"] = metadata
+                    points.append(models.PointStruct(id=uuid.uuid4().hex, vector=record.vector, payload=payload))
+                client.upsert(collection_name=collection_name, points=points, wait=True)
+                copied += len(points)
+            if offset is None:
+                break
+        
+        if not copied:
+            print(f"No points found for document {source_document_id} in collection: {collection_name}")
+            return None
+        _vectors_changed(user_id)
+        print(f"Copied {copied} points of document {source_document_id} to document {document_id} in collection: {collection_name}")
+        return copied
+    except Exception as e:
+        print(f"Error copying vectors of document {source_document_id} for user {user_id}: {e}")
+        return None
+
+def add_documents_to_vectorstore(vectorstore, docs, user_id: int):
+    """Add new documents to existing Qdrant vectorstore."""
+    from .chunking import chunk_documents
+    try:
+        split_docs = chunk_documents(docs)
         
         # Add documents to existing vectorstore
         vectorstore.add_documents(split_docs)
+        _vectors_changed(user_id)
         print(f"Added documents to Qdrant vectorstore for user {user_id}")
         return True
     except Exception as e:
@@ -0,0 +1,87 @@
+"""
+Benchmark the embedding backends against each other.
+
+Compares throughput of the sentence-transformers (torch) backend and the
+ONNX Runtime backend, and reports how closely the ONNX vectors agree with
+the torch vectors (cosine similarity per text).
+
+Usage (from the backend directory):
+    python -m benchmarks.embedding_backends --texts 512 --batch-size 32 --threads 4
+    python -m benchmarks.embedding_backends --file sample.txt --no-quantize
+"""
+import argparse
+import random
+import time
+
+import numpy as np  # type: ignore
+
+from app.vectorstore import EMBEDDING_MODEL_NAME, create_base_embeddings
+from app.onnx_embeddings import OnnxEmbeddings
+
+WORDS = (
+    "agreement party shall payment term notice invoice revenue founder equity investor "
+    "vesting board meeting quarter report customer contract liability clause section "
+    "schedule amount company product market growth hiring runway budget forecast"
+).split()
+
+def synthetic_texts(count: int, seed: int = 42):
+    """Chunk-sized pseudo sentences of varying length."""
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(WORDS) for _ in range(rng.randint(10, 90))) for _ in range(count)]
+
+def load_texts(path: str):
+    """One text per non-empty line."""
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()]
+
+def measure(embeddings, texts, repeats: int):
+    """Return (vectors, texts per second) after one warm-up call."""
+    embeddings.embed_documents(texts[:8])
+    best = None
+    vectors = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        vectors = embeddings.embed_documents(texts)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return np.asarray(vectors, dtype=np.float32), len(texts) / best
+
+def cosine_rows(a, b):
+    """Cosine similarity of matching rows."""
+    a = a / np.linalg.norm(a, axis=1, keepdims=True)
+    b = b / np.linalg.norm(b, axis=1, keepdims=True)
+    return (a * b).sum(axis=1)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--texts", type=int, default=512, help="number of synthetic texts")
+    parser.add_argument("--file", help="text file with one chunk per line (overrides --texts)")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--threads", type=int, default=0, help="ONNX Runtime intra-op threads (0 = default)")
+    parser.add_argument("--no-quantize", action="store_true", help="benchmark the fp32 ONNX model")
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    texts = load_texts(args.file) if args.file else synthetic_texts(args.texts)
+    print(f"Model: {EMBEDDING_MODEL_NAME}, texts: {len(texts)}")
+
+    torch_vectors, torch_rate = measure(create_base_embeddings("huggingface"), texts, args.repeats)
+    onnx_embeddings = OnnxEmbeddings(
+        EMBEDDING_MODEL_NAME,
+        batch_size=args.batch_size,
+        num_threads=args.threads,
+        quantize=not args.no_quantize,
+    )
+    onnx_vectors, onnx_rate = measure(onnx_embeddings, texts, args.repeats)
+
+    agreement = cosine_rows(torch_vectors, onnx_vectors)
+    print(f"{'backend':<20}{'texts/s':>12}")
+    print(f"{'huggingface':<20}{torch_rate:>12.1f}")
+    print(f"{onnx_embeddings.variant:<20}{onnx_rate:>12.1f}  ({onnx_rate / torch_rate:.2f}x)")
+    print(
+        f"cosine agreement: mean={agreement.mean():.4f} "
+        f"p5={np.percentile(agreement, 5):.4f} min={agreement.min():.4f}"
+    )
+
+if __name__ == "__main__":
+    main()
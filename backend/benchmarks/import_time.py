@@ -0,0 +1,85 @@
+"""
+Measure the cold-start import time of the API.
+
+Imports app.main in a fresh interpreter (so nothing is cached), reports the
+wall time, and checks that the heavy modules - the embedding model, PDF
+rendering, Supabase and Qdrant clients, document loaders - are not imported
+until they are first used. Exits non-zero when the import is over budget or
+a heavy module was loaded eagerly, so it can run in CI.
+
+Usage (from the backend directory):
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --budget 1.5 --repeats 5
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# Modules that must only be imported on first use
+HEAVY_MODULES = (
+    "torch",
+    "sentence_transformers",
+    "langchain_huggingface",
+    "onnxruntime",
+    "reportlab",
+    "supabase",
+    "langchain_community.document_loaders",
+    "qdrant_client",
+    "langchain_qdrant",
+    "langchain_groq",
+    "langchain_ollama",
+)
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - start
+print(json.dumps({"seconds": elapsed, "loaded": [m for m in %r if m in sys.modules]}))
+""" % (HEAVY_MODULES,)
+
+def measure_once():
+    """Import app.main in a new interpreter; return (seconds, eagerly loaded heavy modules)."""
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    # app.main prints startup messages - the measurement is the last line
+    data = json.loads(result.stdout.strip().splitlines()[-1])
+    return data["seconds"], data["loaded"]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget", type=float, default=float(os.getenv("IMPORT_TIME_BUDGET", "2.0")),
+                        help="maximum allowed import time in seconds (best of --repeats)")
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    timings = []
+    loaded = set()
+    for _ in range(args.repeats):
+        seconds, eager = measure_once()
+        timings.append(seconds)
+        loaded.update(eager)
+
+    best = min(timings)
+    print(f"import app.main: best={best:.2f}s worst={max(timings):.2f}s budget={args.budget:.2f}s")
+
+    failed = False
+    if best > args.budget:
+        print(f"FAIL: import time over budget by {best - args.budget:.2f}s")
+        failed = True
+    if loaded:
+        print(f"FAIL: heavy modules imported at startup: {', '.join(sorted(loaded))}")
+        failed = True
+    if not failed:
+        print("OK")
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Benchmark Qdrant collection settings: HNSW m/ef_construct, search ef,
+int8 scalar quantization (with and without rescoring) and on-disk vectors.
+
+For each configuration it creates a collection with app.vectorstore's
+get_collection_config(), loads the same random 384-dimensional vectors,
+waits for indexing, then reports:
+  - estimated RAM per collection (vectors kept in RAM + HNSW links)
+  - recall@k against exact brute-force results computed with NumPy
+  - p50/p95 search latency
+
+Needs a Qdrant server - embedded Qdrant searches exactly and ignores all of
+these settings. Defaults to QDRANT_URL / QDRANT_API_KEY from the environment.
+
+Usage (from the backend directory):
+    python -m benchmarks.qdrant_configs --points 50000 --queries 200
+    python -m benchmarks.qdrant_configs --qdrant-url http://localhost:6333
+"""
+import argparse
+import os
+import time
+import uuid
+
+import numpy as np  # type: ignore
+from qdrant_client import QdrantClient  # type: ignore
+from qdrant_client.http import models  # type: ignore
+
+from app.vectorstore import get_collection_config, get_search_params
+
+DIMENSION = 384
+QDRANT_DEFAULT_M = 16
+
+# name, collection settings, search settings
+CONFIGS = [
+    ("default", {}, {}),
+    ("m=32 ef_construct=200", {"hnsw_m": 32, "hnsw_ef_construct": 200}, {}),
+    ("search ef=128", {}, {"ef": 128}),
+    ("int8 + rescore", {"quantization": "int8"}, {"quantization": "int8", "rescore": True}),
+    ("int8 no rescore", {"quantization": "int8"}, {"quantization": "int8", "rescore": False}),
+    ("int8 + rescore, on_disk", {"quantization": "int8", "on_disk": True}, {"quantization": "int8", "rescore": True}),
+]
+
+def synthetic_vectors(count: int, rng, clusters: int = 50):
+    """Vectors around a few centers, closer to real embeddings than uniform noise."""
+    centers = rng.standard_normal((clusters, DIMENSION)).astype(np.float32)
+    labels = rng.integers(0, clusters, size=count)
+    return centers[labels] + 0.5 * rng.standard_normal((count, DIMENSION)).astype(np.float32)
+
+def exact_top_k(vectors, queries, k: int):
+    """Ground truth ids by cosine similarity."""
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    scores = (queries / np.linalg.norm(queries, axis=1, keepdims=True)) @ normalized.T
+    return [set(np.argsort(-row)[:k].tolist()) for row in scores]
+
+def estimated_ram_mb(points: int, settings: dict) -> float:
+    """Vectors kept in RAM plus HNSW level-0 links (2*m neighbours, 4 bytes each) per point."""
+    m = settings.get("hnsw_m") or QDRANT_DEFAULT_M
+    per_point = 2 * m * 4
+    if not settings.get("on_disk"):
+        per_point += DIMENSION * 4
+    if settings.get("quantization") == "int8":
+        per_point += DIMENSION
+    return points * per_point / 1024 / 1024
+
+def wait_for_index(client, collection_name: str, timeout: float = 600):
+    """Block until the optimizer has built the HNSW index."""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if client.get_collection(collection_name).status == models.CollectionStatus.GREEN:
+            return
+        time.sleep(1)
+    print(f"Warning: {collection_name} still indexing after {timeout}s")
+
+def run_config(client, vectors, queries, truth, k: int, settings: dict, search: dict):
+    collection_name = f"bench_{uuid.uuid4().hex[:8]}"
+    client.create_collection(
+        collection_name=collection_name,
+        # Build the HNSW index even for small benchmark collections
+        optimizers_config=models.OptimizersConfigDiff(indexing_threshold=1000),
+        **get_collection_config(DIMENSION, **settings),
+    )
+    try:
+        for offset in range(0, len(vectors), 256):
+            batch = vectors[offset:offset + 256]
+            client.upsert(
+                collection_name=collection_name,
+                points=[models.PointStruct(id=offset + i, vector=vector.tolist()) for i, vector in enumerate(batch)],
+                wait=True,
+            )
+        wait_for_index(client, collection_name)
+
+        # search={} means "Qdrant defaults", not the QDRANT_* environment settings
+        search_params = get_search_params(**{"ef": 0, "quantization": "none", **search})
+        timings, recalls = [], []
+        for query, expected in zip(queries, truth):
+            start = time.perf_counter()
+            hits = client.query_points(
+                collection_name=collection_name,
+                query=query.tolist(),
+                limit=k,
+                search_params=search_params,
+            ).points
+            timings.append(time.perf_counter() - start)
+            recalls.append(len({hit.id for hit in hits} & expected) / k)
+        ms = np.asarray(timings) * 1000
+        return float(np.mean(recalls)), float(np.percentile(ms, 50)), float(np.percentile(ms, 95))
+    finally:
+        client.delete_collection(collection_name)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--points", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--qdrant-url", default=os.getenv("QDRANT_URL"))
+    parser.add_argument("--qdrant-api-key", default=os.getenv("QDRANT_API_KEY"))
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    if not args.qdrant_url:
+        parser.error("a Qdrant server is required (--qdrant-url or QDRANT_URL)")
+    client = QdrantClient(url=args.qdrant_url, api_key=args.qdrant_api_key or None)
+
+    rng = np.random.default_rng(args.seed)
+    vectors = synthetic_vectors(args.points, rng)
+    queries = synthetic_vectors(args.queries, rng)
+    truth = exact_top_k(vectors, queries, args.k)
+
+    print(f"{args.points} points, {args.queries} queries, k={args.k}")
+    print(f"{'config':<26}{'RAM MB':>9}{'recall':>9}{'p50 ms':>9}{'p95 ms':>9}")
+    for name, settings, search in CONFIGS:
+        recall, p50, p95 = run_config(client, vectors, queries, truth, args.k, settings, search)
+        print(f"{name:<26}{estimated_ram_mb(args.points, settings):>9.1f}{recall:>9.3f}{p50:>9.2f}{p95:>9.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Benchmark the cross-encoder rerank stage on CPU.
+
+Scores RERANK_CANDIDATES synthetic chunks per query at several batch sizes
+and reports p50/p95 rerank time, and how often the latency budget forced a
+fallback to the retrieval order. Use it to pick RERANK_CANDIDATES,
+RERANK_BATCH_SIZE and RERANK_BUDGET_MS for the target machine.
+
+Usage (from the backend directory):
+    python -m benchmarks.rerank_latency --candidates 20 --batch-sizes 4 8 20 --budget-ms 300
+"""
+import argparse
+import random
+
+import numpy as np  # type: ignore
+from langchain_core.documents import Document
+
+from app.reranker import RERANK_BUDGET_MS, RERANK_CANDIDATES, get_cross_encoder, rerank
+
+WORDS = ("revenue growth customer churn pricing seed round investor pitch deck market size "
+         "hiring plan runway burn rate product roadmap retention cohort valuation term sheet").split()
+
+def synthetic_chunk(rng, words: int = 120) -> str:
+    """Chunk-sized text (about the size the chunker produces)."""
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--candidates", type=int, default=RERANK_CANDIDATES)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[4, 8, 20])
+    parser.add_argument("--budget-ms", type=float, default=RERANK_BUDGET_MS)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    
+    rng = random.Random(args.seed)
+    model = get_cross_encoder(wait=True)
+    if model is None:
+        parser.error("the rerank model could not be loaded")
+    # First call allocates buffers - keep it out of the timings
+    model.predict([("warm up", "warm up")])
+    
+    print(f"{args.candidates} candidates per query, budget {args.budget_ms:.0f} ms, {args.queries} queries")
+    print(f"{'batch':>6}{'p50 ms':>9}{'p95 ms':>9}{'fallback':>10}")
+    for batch_size in args.batch_sizes:
+        timings, fallbacks = [], 0
+        for _ in range(args.queries):
+            query = " ".join(rng.choice(WORDS) for _ in range(8))
+            docs = [Document(page_content=synthetic_chunk(rng)) for _ in range(args.candidates)]
+            _, stats = rerank(query, docs, 3, budget_ms=args.budget_ms, batch_size=batch_size, model=model)
+            timings.append(stats["rerank_ms"])
+            fallbacks += not stats["reranked"]
+        print(f"{batch_size:>6}{np.percentile(timings, 50):>9.1f}{np.percentile(timings, 95):>9.1f}"
+              f"{fallbacks / args.queries:>10.0%}")
+
+if __name__ == "__main__":
+    main()
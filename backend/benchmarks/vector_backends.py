@@ -0,0 +1,116 @@
+"""
+Benchmark the NumPy vector index against Qdrant at different vault sizes.
+
+Uses random (clustered) 384-dimensional vectors, so no embedding model is
+needed. For each vault size it reports index build time and search latency
+(p50/p95) of the in-process NumPy index and of Qdrant, plus Qdrant's
+recall@k against the exact NumPy results.
+
+Qdrant is the embedded in-memory client by default; pass --qdrant-url (and
+--qdrant-api-key) to include the network hop to a real server.
+
+Usage (from the backend directory):
+    python -m benchmarks.vector_backends --sizes 1000 10000 100000 --queries 200
+    python -m benchmarks.vector_backends --qdrant-url https://xyz.qdrant.io --qdrant-api-key KEY
+"""
+import argparse
+import tempfile
+import time
+import uuid
+
+import numpy as np  # type: ignore
+from qdrant_client import QdrantClient  # type: ignore
+from qdrant_client.http import models  # type: ignore
+
+from app.numpy_store import NumpyVectorStore
+
+DIMENSION = 384
+
+def synthetic_vectors(count: int, rng, clusters: int = 50):
+    """Vectors around a few centers, closer to real embeddings than uniform noise."""
+    centers = rng.standard_normal((clusters, DIMENSION)).astype(np.float32)
+    labels = rng.integers(0, clusters, size=count)
+    return centers[labels] + 0.5 * rng.standard_normal((count, DIMENSION)).astype(np.float32)
+
+def percentiles(timings):
+    """p50 and p95 in milliseconds."""
+    ms = np.asarray(timings) * 1000
+    return np.percentile(ms, 50), np.percentile(ms, 95)
+
+def bench_numpy(vectors, queries, k: int, directory: str):
+    store = NumpyVectorStore(directory)
+    start = time.perf_counter()
+    for offset in range(0, len(vectors), 256):
+        batch = vectors[offset:offset + 256]
+        store.add_embeddings([""] * len(batch), batch, [{"row": offset + i} for i in range(len(batch))])
+    build = time.perf_counter() - start
+
+    timings, results = [], []
+    for query in queries:
+        start = time.perf_counter()
+        hits = store.similarity_search_with_score_by_vector(query, k=k)
+        timings.append(time.perf_counter() - start)
+        results.append({doc.metadata["row"] for doc, _ in hits})
+    return build, timings, results
+
+def bench_qdrant(client, vectors, queries, k: int):
+    collection_name = f"bench_{uuid.uuid4().hex[:8]}"
+    client.create_collection(
+        collection_name=collection_name,
+        vectors_config=models.VectorParams(size=DIMENSION, distance=models.Distance.COSINE),
+    )
+    try:
+        start = time.perf_counter()
+        for offset in range(0, len(vectors), 256):
+            batch = vectors[offset:offset + 256]
+            client.upsert(
+                collection_name=collection_name,
+                points=[
+                    models.PointStruct(id=offset + i, vector=vector.tolist(), payload={"row": offset + i})
+                    for i, vector in enumerate(batch)
+                ],
+                wait=True,
+            )
+        build = time.perf_counter() - start
+
+        timings, results = [], []
+        for query in queries:
+            start = time.perf_counter()
+            hits = client.query_points(collection_name=collection_name, query=query.tolist(), limit=k).points
+            timings.append(time.perf_counter() - start)
+            results.append({hit.id for hit in hits})
+        return build, timings, results
+    finally:
+        client.delete_collection(collection_name)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000], help="vault sizes in chunks")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=3, help="results per query (rag.py uses 3)")
+    parser.add_argument("--qdrant-url", help="benchmark a Qdrant server instead of the embedded client")
+    parser.add_argument("--qdrant-api-key")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    client = QdrantClient(url=args.qdrant_url, api_key=args.qdrant_api_key) if args.qdrant_url else QdrantClient(location=":memory:")
+    qdrant_label = "qdrant (server)" if args.qdrant_url else "qdrant (embedded)"
+
+    print(f"{'chunks':>8}  {'backend':<18}{'build s':>9}{'p50 ms':>9}{'p95 ms':>9}{'recall@k':>10}")
+    for size in args.sizes:
+        vectors = synthetic_vectors(size, rng)
+        queries = synthetic_vectors(args.queries, rng)
+
+        with tempfile.TemporaryDirectory() as directory:
+            numpy_build, numpy_timings, exact = bench_numpy(vectors, queries, args.k, directory)
+        qdrant_build, qdrant_timings, approximate = bench_qdrant(client, vectors, queries, args.k)
+        recall = np.mean([len(a & e) / max(1, len(e)) for a, e in zip(approximate, exact)])
+
+        p50, p95 = percentiles(numpy_timings)
+        print(f"{size:>8}  {'numpy':<18}{numpy_build:>9.2f}{p50:>9.2f}{p95:>9.2f}{1.0:>10.3f}")
+        p50, p95 = percentiles(qdrant_timings)
+        print(f"{size:>8}  {qdrant_label:<18}{qdrant_build:>9.2f}{p50:>9.2f}{p95:>9.2f}{recall:>10.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Migration script to move per-user Qdrant collections into the shared collection.
+
+Copies every point of each `user_{id}_documents` collection into
+QDRANT_SHARED_COLLECTION (vectors and payloads unchanged, plus a user_id
+payload), then checks the counts. Point ids are kept, so running it again
+is safe. Set QDRANT_LAYOUT=shared once it has finished.
+
+With embedded on-disk Qdrant (no QDRANT_URL), stop the server first: only one
+process can open QDRANT_LOCAL_PATH.
+
+Usage (from the backend directory):
+    python migrate_to_shared_collection.py --dry-run
+    python migrate_to_shared_collection.py
+    python migrate_to_shared_collection.py --delete-source   # drop the per-user collections afterwards
+"""
+import argparse
+import re
+import sys
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from qdrant_client.http import models  # type: ignore
+
+from app.vectorstore import (
+    QDRANT_SHARED_COLLECTION,
+    UPSERT_BATCH_SIZE,
+    USER_ID_PAYLOAD_KEY,
+    collection_exists,
+    ensure_document_id_index,
+    ensure_user_id_index,
+    get_qdrant_client,
+    invalidate_collection_cache,
+    user_filter,
+)
+
+PER_USER_COLLECTION = re.compile(r"^user_(\d+)_documents$")
+
+def ensure_shared_collection(client, vectors_config):
+    """Create the shared collection with the same vector settings as the per-user ones."""
+    if not collection_exists(client, QDRANT_SHARED_COLLECTION):
+        client.create_collection(collection_name=QDRANT_SHARED_COLLECTION, vectors_config=vectors_config)
+        invalidate_collection_cache(QDRANT_SHARED_COLLECTION)
+        print(f"Created shared collection: {QDRANT_SHARED_COLLECTION}")
+    ensure_user_id_index(client, QDRANT_SHARED_COLLECTION)
+    ensure_document_id_index(client, QDRANT_SHARED_COLLECTION)
+
+def migrate_collection(client, collection_name: str, user_id: int) -> int:
+    """Copy one user's collection into the shared collection; returns the number of points copied."""
+    copied = 0
+    offset = None
+    while True:
+        records, offset = client.scroll(
+            collection_name=collection_name,
+            limit=UPSERT_BATCH_SIZE,
+            offset=offset,
+            with_payload=True,
+            with_vectors=True,
+        )
+        if records:
+            points = []
+            for record in records:
+                payload = dict(record.payload or {})
+                metadata = dict(payload.get("metadata") or {})
+                metadata["user_id"] = user_id
+                payload["metadata"] = metadata
+                points.append(models.PointStruct(id=record.id, vector=record.vector, payload=payload))
+            client.upsert(collection_name=QDRANT_SHARED_COLLECTION, points=points, wait=True)
+            copied += len(points)
+        if offset is None:
+            break
+    return copied
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="only list what would be migrated")
+    parser.add_argument("--delete-source", action="store_true",
+                        help="delete each per-user collection once its points are verified in the shared one")
+    args = parser.parse_args()
+    
+    client = get_qdrant_client()
+    sources = []
+    for collection in client.get_collections().collections:
+        match = PER_USER_COLLECTION.match(collection.name)
+        if match:
+            sources.append((collection.name, int(match.group(1))))
+    
+    print(f"Found {len(sources)} per-user collections to migrate into '{QDRANT_SHARED_COLLECTION}'")
+    if not sources:
+        return 0
+    
+    for collection_name, user_id in sources:
+        points = client.count(collection_name=collection_name, exact=True).count
+        print(f"  {collection_name}: {points} points (user {user_id})")
+    if args.dry_run:
+        return 0
+    
+    vectors_config = client.get_collection(sources[0][0]).config.params.vectors
+    ensure_shared_collection(client, vectors_config)
+    
+    failed = 0
+    for collection_name, user_id in sources:
+        try:
+            copied = migrate_collection(client, collection_name, user_id)
+            expected = client.count(collection_name=collection_name, exact=True).count
+            migrated = client.count(
+                collection_name=QDRANT_SHARED_COLLECTION,
+                count_filter=user_filter(user_id),
+                exact=True,
+            ).count
+            if migrated < expected:
+                print(f"  ✗ {collection_name}: only {migrated} of {expected} points found under {USER_ID_PAYLOAD_KEY}={user_id}")
+                failed += 1
+                continue
+            print(f"  ✓ Migrated {copied} points of user {user_id}")
+            if args.delete_source:
+                client.delete_collection(collection_name)
+                invalidate_collection_cache(collection_name)
+                print(f"    Deleted {collection_name}")
+        except Exception as e:
+            print(f"  ✗ Error migrating {collection_name}: {e}")
+            failed += 1
+    
+    if failed:
+        print(f"\n{failed} collection(s) failed - fix the errors and run the script again")
+        return 1
+    print("\nMigration complete. Set QDRANT_LAYOUT=shared to use the shared collection.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,5 @@
 import { useState, useEffect } from 'react';
-import { uploadToVault, getVaultFiles, deleteVaultFile } from '../services/api';
+import { uploadToVault, uploadBatchToVault, getVaultFiles, deleteVaultFile, waitForIngestionJob } from '../services/api';
 import './Vault.css';
 
 const Vault = ({ onFileUploaded }) => {
@@ -25,13 +25,13 @@ const Vault = ({ onFileUploaded }) => {
   };
 
   const handleFileUpload = async (e) => {
-    const file = e.target.files[0];
-    if (!file) return;
+    const selected = Array.from(e.target.files);
+    if (selected.length === 0) return;
 
     // Check file type
     const allowedTypes = ['.pdf', '.txt', '.docx'];
-    const fileExtension = '.' + file.name.split('.').pop().toLowerCase();
-    if (!allowedTypes.includes(fileExtension)) {
+    const invalid = selected.find((file) => !allowedTypes.includes('.' + file.name.split('.').pop().toLowerCase()));
+    if (invalid) {
       setError('Only PDF, TXT, and DOCX files are allowed');
       return;
     }
@@ -39,8 +39,20 @@ const Vault = ({ onFileUploaded }) => {
     try {
       setUploading(true);
       setError('');
-      await uploadToVault(file);
+      // Several files go up in one request and are indexed together
+      const result = selected.length === 1 ? await uploadToVault(selected[0]) : await uploadBatchToVault(selected);
+      const label = selected.length === 1 ? selected[0].name : `${selected.length} files`;
       await loadFiles();
+      if (result.job_id) {
+        // Processing runs in the background - refresh once the files are indexed
+        const job = await waitForIngestionJob(result.job_id);
+        if (job.status === 'failed') {
+          setError(`Failed to process ${label}: ${job.error}`);
+        } else if (job.failed_files && job.failed_files.length > 0) {
+          setError(`Failed to process ${job.failed_files.map((f) => f.filename).join(', ')}`);
+        }
+        await loadFiles();
+      }
       if (onFileUploaded) {
         onFileUploaded();
       }
@@ -96,6 +108,7 @@ const Vault = ({ onFileUploaded }) => {
           <input
             type="file"
             accept=".pdf,.txt,.docx"
+            multiple
             onChange={handleFileUpload}
             disabled={uploading}
             style={{ display: 'none' }}
@@ -95,6 +95,37 @@ export const uploadToVault = async (file) => {
   return response.data;
 };
 
+// Vault - Upload several files at once (indexed together by one background job)
+export const uploadBatchToVault = async (files) => {
+  const formData = new FormData();
+  files.forEach((file) => formData.append('files', file));
+  
+  const response = await api.post('/vault/upload-batch', formData, {
+    headers: {
+      'Content-Type': 'multipart/form-data',
+    },
+  });
+  
+  return response.data;
+};
+
+// Vault - Get background ingestion job status
+export const getIngestionJob = async (jobId) => {
+  const response = await api.get(`/vault/jobs/${jobId}`);
+  return response.data;
+};
+
+// Vault - Poll an ingestion job until it completes or fails
+export const waitForIngestionJob = async (jobId, intervalMs = 1000) => {
+  while (true) {
+    const job = await getIngestionJob(jobId);
+    if (job.status === 'completed' || job.status === 'failed') {
+      return job;
+    }
+    await new Promise((resolve) => setTimeout(resolve, intervalMs));
+  }
+};
+
 // Vault - Get all files
 export const getVaultFiles = async () => {
   const response = await api.get('/vault/files');